@@ -0,0 +1,287 @@
+import hashlib
+import logging
+import marshal
+import sys
+import threading
+import time
+import zlib
+
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.utils.functional import Promise
+from drf_yasg import openapi
+from rest_framework_json_api.settings import json_api_settings
+
+from drf_yasg_json_api.utils import get_fingerprint_value
+from drf_yasg_json_api.utils import get_library_version
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'FragmentCache',
+    'SchemaCoalescer',
+]
+
+
+class _Flight:
+    """Single in-process generation that other threads asking for the same key can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class SchemaCoalescer:
+    """
+    Coalesce concurrent generations of the same schema document into a single one.
+
+    Generated documents are stored in Django cache together with their generation time:
+     - a fresh document (younger than `fresh_timeout`) is served straight from cache
+     - when a document gets stale, the first caller regenerates it while all other callers are served the previous
+       (stale) document, which is kept in cache for `stale_timeout`
+     - when there is no document at all, concurrent callers wait up to `wait_timeout` for the one generating it
+
+    Callers within one process are coalesced with a thread event, callers from different processes with a lock entry
+    added to the cache (`lock_timeout` protects against processes that died while holding it).
+    """
+
+    def __init__(self, cache_alias='default', key_prefix='drf_yasg_json_api.schema', fresh_timeout=60,
+                 stale_timeout=24 * 60 * 60, lock_timeout=60, wait_timeout=30, poll_interval=0.1):
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.fresh_timeout = fresh_timeout
+        self.stale_timeout = stale_timeout
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def make_key(self, *parts):
+        # Parts (e.g. request path) may contain characters or be longer than some cache backends accept
+        digest = hashlib.sha1(repr(get_fingerprint_value(parts)).encode('utf-8')).hexdigest()
+        return '{prefix}:{digest}'.format(prefix=self.key_prefix, digest=digest)
+
+    def get_or_generate(self, key, generate):
+        """
+        Return document stored under `key` or generate it using `generate` callable, see class docs for details.
+        """
+        entry = self.cache.get(key)
+        if entry is not None and self._is_fresh(entry):
+            return entry[1]
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._flights[key] = _Flight()
+
+        if not is_leader:
+            return self._follow(key, flight, entry, generate)
+
+        try:
+            flight.result = self._lead(key, entry, generate)
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def _follow(self, key, flight, entry, generate):
+        # Stale while revalidate, someone is already regenerating it
+        if entry is not None:
+            return entry[1]
+
+        if flight.done.wait(self.wait_timeout) and flight.result is not None:
+            return flight.result
+
+        logger.warning('Timed out waiting for schema generation of {key}, generating it separately'.format(key=key))
+        return generate()
+
+    def _lead(self, key, entry, generate):
+        lock_key = self.make_key(key, 'lock')
+        is_locked = self.cache.add(lock_key, True, self.lock_timeout)
+        if not is_locked:
+            # Other process is generating the document
+            if entry is not None:
+                return entry[1]
+            document = self._wait_for_other_process(key)
+            if document is not None:
+                return document
+            logger.warning('Timed out waiting for schema generation of {key} in other process, '
+                           'generating it separately'.format(key=key))
+
+        try:
+            document = generate()
+            self.cache.set(key, (time.time(), document), self.stale_timeout)
+        finally:
+            # Lock of other process is kept, so that other callers keep waiting for it instead of generating too
+            if is_locked:
+                self.cache.delete(lock_key)
+        return document
+
+    def _wait_for_other_process(self, key):
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            entry = self.cache.get(key)
+            if entry is not None:
+                return entry[1]
+        return None
+
+    def _is_fresh(self, entry):
+        generated_at, document = entry
+        return time.time() - generated_at < self.fresh_timeout
+
+
+class FragmentCache:
+    """
+    Cache of generated schema fragments (e.g. serializer schemas or whole operations) shared between processes
+    through Django cache backend.
+
+    Keys are built from fingerprints of everything the fragment is generated from, library and python version.
+    Values are compressed `marshal` dumps of plain dicts, turned back into `openapi` objects when read.
+    Fragments referencing definitions (`$ref`) are not cached, definitions are generated per whole document.
+
+    Bump `version` when fragments may change without fingerprinted objects changing, e.g. on deploy.
+    """
+
+    def __init__(self, cache_alias='default', key_prefix='drf_yasg_json_api.fragment', timeout=None, version=''):
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+        self.version = version
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def make_key(self, *parts):
+        key_parts = [
+            self.version,
+            get_library_version(),
+            sys.version_info[:2],
+            getattr(json_api_settings, 'FORMAT_FIELD_NAMES', None),
+            getattr(json_api_settings, 'FORMAT_TYPES', None),
+            getattr(json_api_settings, 'PLURALIZE_TYPES', None),
+            get_fingerprint_value(parts),
+        ]
+        digest = hashlib.sha1(repr(key_parts).encode('utf-8')).hexdigest()
+        return '{prefix}:{digest}'.format(prefix=self.key_prefix, digest=digest)
+
+    def get_or_build(self, get_key_parts, build, swagger_type):
+        """
+        Return fragment cached under key built from result of `get_key_parts` callable or build it using `build`
+        callable and cache it.
+        """
+        key = self.make_key(*get_key_parts())
+        fragment = self.get(key, swagger_type)
+        if fragment is None:
+            fragment = build()
+            self.set(key, fragment)
+        return fragment
+
+    def get(self, key, swagger_type):
+        value = self.cache.get(key)
+        if value is None:
+            return None
+        try:
+            return from_plain(marshal.loads(zlib.decompress(value)), swagger_type)
+        except (ValueError, EOFError, TypeError, zlib.error):
+            logger.warning('Unable to read cached schema fragment {key}'.format(key=key))
+            return None
+
+    def set(self, key, fragment):
+        if not isinstance(fragment, openapi.SwaggerDict):
+            return False
+
+        plain = to_plain(fragment)
+        if has_refs(plain):
+            return False
+
+        try:
+            value = zlib.compress(marshal.dumps(plain))
+        except ValueError:
+            logger.debug('Schema fragment {key} contains values that cannot be cached'.format(key=key))
+            return False
+
+        self.cache.set(key, value, self.timeout)
+        return True
+
+
+def to_plain(obj):
+    """Convert swagger object into plain dicts and lists."""
+    if isinstance(obj, dict):
+        return {str(key): to_plain(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_plain(item) for item in obj]
+    if isinstance(obj, Promise):
+        return str(obj)
+    return obj
+
+
+def has_refs(plain):
+    if isinstance(plain, dict):
+        return '$ref' in plain or any(has_refs(value) for value in plain.values())
+    if isinstance(plain, list):
+        return any(has_refs(item) for item in plain)
+    return False
+
+
+# Swagger object types of children for keys that hold swagger objects, other values are kept as plain values
+_SWAGGER_CHILDREN = {
+    openapi.Schema: {
+        'properties': ('mapping', openapi.Schema),
+        'items': ('single', openapi.Schema),
+        'additionalProperties': ('single', openapi.Schema),
+        'allOf': ('list', openapi.Schema),
+        'oneOf': ('list', openapi.Schema),
+        'anyOf': ('list', openapi.Schema),
+    },
+    openapi.Operation: {
+        'parameters': ('list', openapi.Parameter),
+        'responses': ('single', openapi.Responses),
+    },
+    openapi.Parameter: {
+        'schema': ('single', openapi.Schema),
+        'items': ('single', openapi.Items),
+    },
+    openapi.Items: {
+        'items': ('single', openapi.Items),
+    },
+    openapi.Response: {
+        'schema': ('single', openapi.Schema),
+    },
+}
+
+
+def from_plain(plain, swagger_type):
+    """Convert plain dicts and lists produced by :func:`to_plain` back into swagger objects of `swagger_type`."""
+    if not isinstance(plain, dict):
+        return plain
+    if '$ref' in plain:
+        swagger_type = openapi.SchemaRef
+
+    # Skip __init__ as it runs validation and arguments conversion, which has already been done for cached object
+    obj = swagger_type.__new__(swagger_type)
+    OrderedDict.__init__(obj)
+
+    children = _SWAGGER_CHILDREN.get(swagger_type, {})
+    for key, value in plain.items():
+        if swagger_type is openapi.Responses:
+            value = from_plain(value, openapi.Response)
+        elif key in children:
+            kind, child_type = children[key]
+            if kind == 'mapping':
+                value = OrderedDict((k, from_plain(v, child_type)) for k, v in value.items())
+            elif kind == 'list':
+                value = [from_plain(v, child_type) for v in value]
+            else:
+                value = from_plain(value, child_type)
+        OrderedDict.__setitem__(obj, key, value)
+    return obj
@@ -0,0 +1,452 @@
+import hashlib
+import json
+
+from collections import OrderedDict
+
+__all__ = [
+    'SchemaChange',
+    'SchemaDiff',
+    'get_resource_fingerprints',
+]
+
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch')
+
+
+class SchemaChange:
+    """Single change of JSON API contract at `location` (operation and part of it, e.g. request or included type)."""
+
+    def __init__(self, location, message, breaking):
+        self.location = location
+        self.message = message
+        self.breaking = breaking
+
+    def __eq__(self, other):
+        return isinstance(other, SchemaChange) and \
+            (self.location, self.message, self.breaking) == (other.location, other.message, other.breaking)
+
+    def __repr__(self):
+        return '<SchemaChange {kind} {location}: {message}>'.format(
+            kind='breaking' if self.breaking else 'non-breaking', location=self.location, message=self.message
+        )
+
+
+class SchemaDiff:
+    """
+    Structural diff of two generated JSON API schema documents (plain dicts loaded from JSON or `openapi.Swagger`).
+
+    Documents are split into resources – `data` of request and responses and every `included` type of every
+    operation – plus include paths and other params of operations. Their fingerprints are compared first and only
+    resources with different fingerprints are compared in detail, so when fingerprints are computed once per document
+    with :func:`get_resource_fingerprints` and stored along with it, the comparison takes time proportional to the
+    changes.
+
+    Changes are classified as breaking for clients:
+     - request: removed attributes and relationships, new required ones, fields that became required or not nullable,
+       new enums and removed enum values, new required body or params of existing operations
+     - response: removed attributes, relationships, included types and include paths, fields that became nullable,
+       removed enums and new enum values
+     - both: removed operations, changed types (and formats) of attributes, types and cardinality of relationships,
+       any other changed constraints of attributes (e.g. `pattern` or `maxLength`)
+
+    Nested properties and items of attributes are compared with the same rules.
+    """
+    #: Keys of attribute schemas not affecting clients, changes of them are non-breaking
+    documentation_keys = ('title', 'description', 'example')
+
+    def __init__(self, old_document, new_document, old_fingerprints=None, new_fingerprints=None):
+        self.old_document = old_document
+        self.new_document = new_document
+        self.old_resources = _ResourceIndex(old_document)
+        self.new_resources = _ResourceIndex(new_document)
+        self._compared_refs = set()
+        self.old_fingerprints = old_fingerprints
+        self.new_fingerprints = new_fingerprints
+        self._changes = None
+
+    @property
+    def changes(self):
+        if self._changes is None:
+            self._changes = self.compare()
+        return self._changes
+
+    @property
+    def breaking_changes(self):
+        return [change for change in self.changes if change.breaking]
+
+    @property
+    def is_breaking(self):
+        return bool(self.breaking_changes)
+
+    def format(self):
+        return '\n'.join(
+            '{kind}\t{location}\t{message}'.format(
+                kind='BREAKING' if change.breaking else 'non-breaking', location=change.location,
+                message=change.message
+            )
+            for change in self.changes
+        )
+
+    def compare(self):
+        old_resources, new_resources = self.old_resources, self.new_resources
+        old_fingerprints = self.old_fingerprints or old_resources.get_fingerprints()
+        new_fingerprints = self.new_fingerprints or new_resources.get_fingerprints()
+
+        changes = []
+        for location, fingerprint in old_fingerprints.items():
+            if location not in new_fingerprints:
+                changes.extend(self.compare_removed(location))
+            elif new_fingerprints[location] != fingerprint:
+                changes.extend(self.compare_location(
+                    location, old_resources.get(location), new_resources.get(location)
+                ))
+        old_operations = {_split_location(location)[0] for location in old_fingerprints}
+        for location in new_fingerprints:
+            if location not in old_fingerprints:
+                changes.extend(self.compare_added(location, _split_location(location)[0] in old_operations))
+        return changes
+
+    def compare_removed(self, location):
+        operation, part = _split_location(location)
+        if part.startswith('included '):
+            return [SchemaChange(operation, 'removed included type {}'.format(part[len('included '):]), True)]
+        if part == 'include':
+            return [SchemaChange(operation, 'removed include param', True)]
+        return [SchemaChange(location, 'removed', True)]
+
+    def compare_added(self, location, is_existing_operation=False):
+        operation, part = _split_location(location)
+        if part.startswith('included '):
+            return [SchemaChange(operation, 'added included type {}'.format(part[len('included '):]), False)]
+        if part == 'include':
+            return [SchemaChange(operation, 'added include param', False)]
+        # New required request data is breaking only for already existing operations, adding operation is not
+        if not is_existing_operation:
+            return [SchemaChange(location, 'added', False)]
+        if part == 'parameters':
+            return self.compare_parameters(location, OrderedDict(), self.new_resources.get(location))
+        if part == 'request' and self.new_resources.is_required(location):
+            return [SchemaChange(location, 'added required', True)]
+        return [SchemaChange(location, 'added', False)]
+
+    def compare_location(self, location, old, new):
+        operation, part = _split_location(location)
+        if part == 'include':
+            return self.compare_include_paths(location, old, new)
+        if part == 'parameters':
+            return self.compare_parameters(location, old, new)
+        return self.compare_resources(location, old, new, is_request=part == 'request')
+
+    def compare_include_paths(self, location, old_paths, new_paths):
+        return [
+            SchemaChange(location, 'removed include path {}'.format(path), True)
+            for path in old_paths if path not in new_paths
+        ] + [
+            SchemaChange(location, 'added include path {}'.format(path), False)
+            for path in new_paths if path not in old_paths
+        ]
+
+    def compare_parameters(self, location, old_parameters, new_parameters):
+        """Compare query, path and header params, clients break on new required ones and changed types."""
+        changes = []
+        for name, old_parameter in old_parameters.items():
+            if name not in new_parameters:
+                # Clients still sending it are not rejected, it is ignored
+                changes.append(SchemaChange(location, 'removed {}'.format(name), False))
+                continue
+            new_parameter = new_parameters[name]
+            if new_parameter['required'] != old_parameter['required']:
+                changes.append(SchemaChange(location, '{} became {}'.format(
+                    name, 'required' if new_parameter['required'] else 'optional'
+                ), new_parameter['required']))
+            changes.extend(self.compare_schemas(location, name, old_parameter['schema'], new_parameter['schema'],
+                                                is_request=True))
+        for name, new_parameter in new_parameters.items():
+            if name not in old_parameters:
+                changes.append(SchemaChange(location, 'added {required}{name}'.format(
+                    required='required ' if new_parameter['required'] else '', name=name
+                ), new_parameter['required']))
+        return changes
+
+    def compare_resources(self, location, old, new, is_request):
+        changes = []
+        if old['type'] != new['type']:
+            changes.append(SchemaChange(location, 'type changed from {} to {}'.format(old['type'], new['type']), True))
+        if old['many'] != new['many']:
+            changes.append(SchemaChange(location, 'changed to {}'.format('array' if new['many'] else 'object'), True))
+
+        for section in ('attributes', 'relationships'):
+            compare_field = self.compare_attributes if section == 'attributes' else self.compare_relationships
+            old_fields, new_fields = old[section], new[section]
+            for name, old_field in old_fields.items():
+                if name not in new_fields:
+                    changes.append(SchemaChange(location, 'removed {} {}'.format(section, name), True))
+                elif old_field != new_fields[name]:
+                    changes.extend(compare_field(location, name, old_field, new_fields[name], is_request))
+            for name, new_field in new_fields.items():
+                if name not in old_fields:
+                    required = new_field['required'] and is_request
+                    changes.append(SchemaChange(location, 'added {required}{section} {name}'.format(
+                        required='required ' if required else '', section=section, name=name
+                    ), required))
+        return changes
+
+    def compare_required(self, location, section, name, old, new, is_request):
+        if old['required'] == new['required'] or not is_request:
+            return []
+        if new['required']:
+            return [SchemaChange(location, '{} {} became required'.format(section, name), True)]
+        return [SchemaChange(location, '{} {} became optional'.format(section, name), False)]
+
+    def compare_attributes(self, location, name, old, new, is_request):
+        changes = self.compare_required(location, 'attributes', name, old, new, is_request)
+        changes.extend(self.compare_schemas(location, 'attributes {}'.format(name), old['schema'], new['schema'],
+                                            is_request))
+        if not changes:
+            changes.append(SchemaChange(location, 'attributes {} changed'.format(name), False))
+        return changes
+
+    def compare_schemas(self, location, label, old_schema, new_schema, is_request):
+        """Compare attribute schemas (or their nested properties and items) described by `label`."""
+        refs = (old_schema.get('$ref'), new_schema.get('$ref'))
+        if refs in self._compared_refs:
+            # Recursive definition, already being compared
+            return []
+        old_schema, new_schema = self.old_resources.resolve(old_schema), self.new_resources.resolve(new_schema)
+        if old_schema == new_schema:
+            return []
+
+        if refs != (None, None):
+            self._compared_refs.add(refs)
+        try:
+            return self.compare_resolved_schemas(location, label, old_schema, new_schema, is_request)
+        finally:
+            self._compared_refs.discard(refs)
+
+    def compare_resolved_schemas(self, location, label, old_schema, new_schema, is_request):
+        changes = []
+        for key in ('type', 'format'):
+            if old_schema.get(key) != new_schema.get(key):
+                changes.append(SchemaChange(location, '{} {} changed from {} to {}'.format(
+                    label, key, old_schema.get(key), new_schema.get(key)
+                ), True))
+
+        old_enum, new_enum = old_schema.get('enum') or [], new_schema.get('enum') or []
+        if old_enum != new_enum:
+            # Clients sending removed values or receiving unknown ones break, no enum accepts or returns any value
+            if is_request:
+                breaking = bool(new_enum) and (not old_enum or any(value not in new_enum for value in old_enum))
+            else:
+                breaking = bool(old_enum) and (not new_enum or any(value not in old_enum for value in new_enum))
+            changes.append(SchemaChange(location, '{} enum changed'.format(label), breaking))
+
+        old_nullable, new_nullable = old_schema.get('x-nullable', False), new_schema.get('x-nullable', False)
+        if old_nullable != new_nullable:
+            # Clients sending nulls or not expecting to receive them break
+            changes.append(SchemaChange(
+                location, '{} became {}'.format(label, 'nullable' if new_nullable else 'not nullable'),
+                new_nullable != is_request
+            ))
+
+        changes.extend(self.compare_properties(location, label, old_schema, new_schema, is_request))
+        if old_schema.get('items') != new_schema.get('items'):
+            changes.extend(self.compare_schemas(location, '{} items'.format(label), old_schema.get('items') or {},
+                                                new_schema.get('items') or {}, is_request))
+
+        handled_keys = ('type', 'format', 'enum', 'x-nullable', 'properties', 'required', 'items')
+        for key in OrderedDict.fromkeys(list(old_schema) + list(new_schema)):
+            if key in handled_keys or old_schema.get(key) == new_schema.get(key):
+                continue
+            changes.append(SchemaChange(location, '{} {} changed from {} to {}'.format(
+                label, key, old_schema.get(key), new_schema.get(key)
+            ), key not in self.documentation_keys))
+        return changes
+
+    def compare_properties(self, location, label, old_schema, new_schema, is_request):
+        changes = []
+        old_properties, new_properties = old_schema.get('properties') or {}, new_schema.get('properties') or {}
+        old_required, new_required = old_schema.get('required') or [], new_schema.get('required') or []
+        for name, old_property in old_properties.items():
+            property_label = '{} {}'.format(label, name)
+            if name not in new_properties:
+                changes.append(SchemaChange(location, 'removed {}'.format(property_label), True))
+                continue
+            if is_request and (name in old_required) != (name in new_required):
+                required = name in new_required
+                changes.append(SchemaChange(location, '{} became {}'.format(
+                    property_label, 'required' if required else 'optional'
+                ), required))
+            changes.extend(self.compare_schemas(location, property_label, old_property, new_properties[name],
+                                                is_request))
+        for name in new_properties:
+            if name not in old_properties:
+                required = is_request and name in new_required
+                changes.append(SchemaChange(location, 'added {required}{label} {name}'.format(
+                    required='required ' if required else '', label=label, name=name
+                ), required))
+        return changes
+
+    def compare_relationships(self, location, name, old, new, is_request):
+        changes = self.compare_required(location, 'relationships', name, old, new, is_request)
+        if old['type'] != new['type']:
+            changes.append(SchemaChange(location, 'relationships {} type changed from {} to {}'.format(
+                name, old['type'], new['type']
+            ), True))
+        if old['many'] != new['many']:
+            changes.append(SchemaChange(location, 'relationships {} changed to {}'.format(
+                name, 'to-many' if new['many'] else 'to-one'
+            ), True))
+        if not changes:
+            changes.append(SchemaChange(location, 'relationships {} changed'.format(name), False))
+        return changes
+
+
+def get_resource_fingerprints(document):
+    """
+    Return fingerprints of all resources and include paths of `document` by location, suitable for storing as JSON
+    next to the document and passing to :class:`SchemaDiff`.
+    """
+    return _ResourceIndex(document).get_fingerprints()
+
+
+def _split_location(location):
+    method, path, part = location.split(' ', 2)
+    return '{} {}'.format(method, path), part
+
+
+class _ResourceIndex:
+    """Resources and include paths of document by location, summarized on demand."""
+
+    def __init__(self, document):
+        self.document = document
+        self._locations = None
+        self._required_locations = set()
+        self._fingerprints_by_id = {}
+
+    @property
+    def locations(self):
+        if self._locations is None:
+            self._locations = OrderedDict(self._iter_locations())
+        return self._locations
+
+    def get_fingerprints(self):
+        return OrderedDict((location, self.get_fingerprint(value)) for location, value in self.locations.items())
+
+    def get_fingerprint(self, value):
+        # Schemas generated in the same process are shared between operations, fingerprint them once
+        try:
+            return self._fingerprints_by_id[id(value)][1]
+        except KeyError:
+            fingerprint = hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+            self._fingerprints_by_id[id(value)] = (value, fingerprint)
+            return fingerprint
+
+    def get(self, location):
+        value = self.locations[location]
+        if _split_location(location)[1] in ('include', 'parameters'):
+            return value
+        return self.summarize_resource(value)
+
+    def is_required(self, location):
+        return location in self.locations and location in self._required_locations
+
+    def _iter_locations(self):
+        for path, path_item in self.document.get('paths', {}).items():
+            for method, operation in path_item.items():
+                if method not in HTTP_METHODS:
+                    continue
+                operation_location = '{} {}'.format(method.upper(), path)
+
+                parameters = OrderedDict()
+                for parameter in operation.get('parameters', []):
+                    parameter = self.resolve(parameter)
+                    if parameter.get('in') == 'body':
+                        data = self.get_data_schema(parameter.get('schema'))
+                        if data is not None:
+                            if parameter.get('required'):
+                                self._required_locations.add('{} request'.format(operation_location))
+                            yield '{} request'.format(operation_location), data
+                    elif parameter.get('name') == 'include' and parameter.get('in') == 'query':
+                        yield '{} include'.format(operation_location), self.get_include_paths(parameter)
+                    else:
+                        parameters['{} {}'.format(parameter.get('in'), parameter.get('name'))] = {
+                            'required': bool(parameter.get('required')),
+                            # Descriptions (e.g. listing sparse fieldsets) do not affect clients
+                            'schema': {key: value for key, value in parameter.items()
+                                       if key not in ('name', 'in', 'required', 'description')},
+                        }
+                if parameters:
+                    yield '{} parameters'.format(operation_location), parameters
+
+                for status_code, response in operation.get('responses', {}).items():
+                    schema = self.resolve(self.resolve(response).get('schema') or {})
+                    data = self.get_data_schema(schema)
+                    if data is not None:
+                        yield '{} response {}'.format(operation_location, status_code), data
+                    for resource_type, included_schema in self.get_included_schemas(schema):
+                        yield '{} included {}'.format(operation_location, resource_type), included_schema
+
+    def resolve(self, schema):
+        if isinstance(schema, dict) and '$ref' in schema:
+            return self.document.get('definitions', {})[schema['$ref'].split('/')[-1]]
+        return schema
+
+    def get_properties(self, schema):
+        return self.resolve(schema).get('properties') or {}
+
+    def get_data_schema(self, schema):
+        if not schema:
+            return None
+        return self.get_properties(schema).get('data')
+
+    def get_included_schemas(self, schema):
+        included = self.resolve(self.get_properties(schema).get('included') or {})
+        if included.get('type') != 'array':
+            # Included resources listed as object properties by type by earlier versions
+            return list(self.get_properties(included).items())
+
+        items = self.resolve(included.get('items') or {})
+        resources = [self.resolve(resource) for resource in items.get('x-oneOf') or items.get('oneOf') or []]
+        return [
+            (self.resolve(self.get_properties(resource).get('type') or {}).get('pattern'), resource)
+            for resource in resources
+        ]
+
+    def get_include_paths(self, parameter):
+        description = parameter.get('description') or ''
+        paths = description.split(': ', 1)[1] if ': ' in description else ''
+        return [path for path in paths.split(', ') if path]
+
+    def summarize_resource(self, schema):
+        schema = self.resolve(schema)
+        many = schema.get('type') == 'array'
+        if many:
+            schema = self.resolve(schema.get('items') or {})
+        properties = self.get_properties(schema)
+
+        attributes_schema = self.resolve(properties.get('attributes') or {})
+        attributes_required = attributes_schema.get('required') or []
+        attributes = OrderedDict(
+            (name, {'schema': self.resolve(attribute), 'required': name in attributes_required})
+            for name, attribute in self.get_properties(attributes_schema).items()
+        )
+
+        relationships_schema = self.resolve(properties.get('relationships') or {})
+        relationships_required = relationships_schema.get('required') or []
+        relationships = OrderedDict()
+        for name, relationship in self.get_properties(relationships_schema).items():
+            data = self.resolve(self.get_properties(relationship).get('data') or {})
+            relationship_many = data.get('type') == 'array'
+            if relationship_many:
+                data = self.resolve(data.get('items') or {})
+            relationships[name] = {
+                'type': self.resolve(self.get_properties(data).get('type') or {}).get('pattern'),
+                'many': relationship_many,
+                'required': name in relationships_required,
+            }
+
+        return {
+            'type': self.resolve(properties.get('type') or {}).get('pattern'),
+            'many': many,
+            'attributes': attributes,
+            'relationships': relationships,
+        }
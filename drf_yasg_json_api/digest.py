@@ -0,0 +1,25 @@
+import hashlib
+import json
+
+__all__ = [
+    'get_canonical_json',
+    'get_schema_digest',
+]
+
+
+def get_canonical_json(document):
+    """
+    Return canonical JSON of schema `document` (`openapi.Swagger` or plain dict loaded from JSON): keys of objects
+    sorted and no whitespace, so that equal documents are byte-identical whatever order their dicts were built in.
+    """
+    if hasattr(document, 'as_odict'):
+        document = document.as_odict()
+    return json.dumps(document, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def get_schema_digest(document, algorithm='sha256'):
+    """
+    Return hex digest of canonical JSON of schema `document`, stable between runs and processes. Use it to address
+    generated documents in caches, e.g. as ETag or part of artifact names.
+    """
+    return hashlib.new(algorithm, get_canonical_json(document).encode('utf-8')).hexdigest()
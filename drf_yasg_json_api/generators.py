@@ -0,0 +1,300 @@
+import hashlib
+import json
+import zlib
+
+from collections import OrderedDict
+from urllib import parse as urlparse
+
+from drf_yasg import generators
+from drf_yasg import openapi
+from drf_yasg.app_settings import swagger_settings
+
+from drf_yasg_json_api.cache import SchemaCoalescer
+from drf_yasg_json_api.utils import get_fingerprint_value
+from drf_yasg_json_api.utils import get_generation_cache
+
+__all__ = [
+    'CoalescingSchemaGenerator',
+    'LowMemorySchemaGenerator',
+    'OperationFragment',
+    'PartialSchemaGenerator',
+]
+
+
+class CoalescingSchemaGenerator(generators.OpenAPISchemaGenerator):
+    """
+    Schema generator serving concurrent requests for the same document from a single generation,
+    see :class:`drf_yasg_json_api.cache.SchemaCoalescer`.
+
+    Documents are distinguished by generator (its url patterns or urlconf and info), API version, `public` flag,
+    permission bucket of requesting user, schema url and path of schema view.
+    """
+    coalescer = SchemaCoalescer()
+
+    def get_schema(self, request=None, public=False):
+        key = self.coalescer.make_key(*self.get_cache_key_parts(request, public))
+        return self.coalescer.get_or_generate(key, lambda: self.generate_schema(request, public))
+
+    def generate_schema(self, request, public):
+        return super().get_schema(request, public)
+
+    def get_cache_key_parts(self, request, public):
+        url = self.url
+        if url is None and request is not None:
+            url = request.build_absolute_uri()
+        # Only scheme and host of the url end up in the document
+        url = urlparse.urlparse(url or '')
+        return [
+            self.get_generator_fingerprint(),
+            getattr(request, 'version', None) or self.version,
+            'public' if public else 'private',
+            self.get_permission_bucket(request, public),
+            '{scheme}://{netloc}'.format(scheme=url.scheme, netloc=url.netloc),
+            request.path if request is not None else '',
+        ]
+
+    def get_generator_fingerprint(self):
+        """
+        Digest of what the document is generated from: url patterns (or urlconf) and info, so that schema views
+        generating different documents (e.g. public and internal API) do not share cache entries.
+        """
+        urlconf = self._gen.urlconf
+        fingerprint = [
+            self.get_patterns_fingerprint(self._gen.patterns) if self._gen.patterns is not None else None,
+            getattr(urlconf, '__name__', urlconf),
+            get_fingerprint_value(self.info.get('title')),
+            get_fingerprint_value(self.info.get('description')),
+            # Version is set on info by generation
+            get_fingerprint_value(getattr(self.info, '_default_version', None)),
+        ]
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def get_patterns_fingerprint(self, patterns):
+        fingerprint = []
+        for pattern in patterns:
+            url_patterns = getattr(pattern, 'url_patterns', None)
+            if url_patterns is not None:
+                fingerprint.append([str(pattern.pattern), self.get_patterns_fingerprint(url_patterns)])
+                continue
+            callback = pattern.callback
+            view = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None) or callback
+            fingerprint.append([str(pattern.pattern), get_fingerprint_value(view)])
+        return fingerprint
+
+    def get_permission_bucket(self, request, public):
+        """
+        Group users that see the same document. Override if your views' permissions depend on more than user status.
+        """
+        if public or request is None:
+            return 'any'
+
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return 'anonymous'
+        if user.is_superuser:
+            return 'superuser'
+        if user.is_staff:
+            return 'staff'
+        return 'authenticated'
+
+
+class PartialSchemaGenerator(generators.OpenAPISchemaGenerator):
+    """
+    Schema generator producing document of selected operations only: of single path (and method) and/or of tags.
+
+    Only view inspectors of selected operations are run and only definitions referenced by them (directly or through
+    other definitions) are included. Paths and `basePath` are the same as in the full document.
+
+    Selection is passed to :meth:`get_partial_schema` or, when schema view uses this generator, read from query params
+    of schema request, e.g. `/swagger.json?path=/projects/{id}/&method=get` or `/swagger.json?tag=projects`.
+    Without any selection the full document is generated.
+    """
+    path_query_param = 'path'
+    method_query_param = 'method'
+    tag_query_param = 'tag'
+
+    selected_path = None
+    selected_method = None
+    selected_tags = None
+
+    _full_prefix = None
+
+    def get_partial_schema(self, request=None, public=False, path=None, method=None, tags=None):
+        self.selected_path = path
+        self.selected_method = method.lower() if method else None
+        self.selected_tags = set(tags) if tags else None
+        return self.generate_partial_schema(request, public)
+
+    def get_schema(self, request=None, public=False):
+        query_params = getattr(request, 'query_params', None)
+        if query_params is not None and not self.is_partial:
+            return self.get_partial_schema(
+                request, public,
+                path=query_params.get(self.path_query_param),
+                method=query_params.get(self.method_query_param),
+                tags=query_params.getlist(self.tag_query_param),
+            )
+        return self.generate_partial_schema(request, public)
+
+    @property
+    def is_partial(self):
+        return bool(self.selected_path or self.selected_method or self.selected_tags)
+
+    def generate_partial_schema(self, request, public):
+        schema = super().get_schema(request, public)
+        if self.is_partial and schema is not None and 'definitions' in schema:
+            definitions = get_referenced_definitions(schema['paths'], schema['definitions'])
+            if definitions:
+                schema['definitions'] = definitions
+            else:
+                del schema['definitions']
+        return schema
+
+    def get_paths(self, endpoints, components, request, public):
+        if not self.is_partial or not endpoints:
+            return super().get_paths(endpoints, components, request, public)
+
+        # Keep paths and basePath of the full document
+        self._full_prefix = self.determine_path_prefix(list(endpoints.keys())) or ''
+        try:
+            return super().get_paths(
+                self.select_endpoints(endpoints, components, request), components, request, public
+            )
+        finally:
+            self._full_prefix = None
+
+    def determine_path_prefix(self, paths):
+        if self._full_prefix is not None:
+            return self._full_prefix
+        return super().determine_path_prefix(paths)
+
+    def select_endpoints(self, endpoints, components, request):
+        selected_endpoints = OrderedDict()
+        for path, (view_cls, methods) in endpoints.items():
+            if self.selected_path and self.selected_path not in (path, path[len(self._full_prefix):]):
+                continue
+            selected_methods = [
+                (method, view) for method, view in methods
+                if (not self.selected_method or method.lower() == self.selected_method) and
+                (not self.selected_tags or self.selected_tags & set(
+                    self.get_operation_tags(view, path, method, components, request)
+                ))
+            ]
+            if selected_methods:
+                selected_endpoints[path] = (view_cls, selected_methods)
+        return selected_endpoints
+
+    def get_operation_tags(self, view, path, method, components, request):
+        """Return tags of operation without inspecting it, see `drf_yasg.generators.get_operation`."""
+        operation_keys = self.get_operation_keys(path[len(self._full_prefix):], method, view)
+        overrides = self.get_overrides(view, method)
+        view_inspector_cls = overrides.get(
+            'auto_schema', getattr(view, 'swagger_schema', swagger_settings.DEFAULT_AUTO_SCHEMA_CLASS)
+        )
+        if view_inspector_cls is None:
+            return []
+        view_inspector = view_inspector_cls(view, path, method, components, request, overrides, operation_keys)
+        return view_inspector.get_tags(operation_keys)
+
+
+class OperationFragment:
+    """Operation finalized into compressed JSON, see :class:`LowMemorySchemaGenerator`."""
+    __slots__ = ('data',)
+
+    def __init__(self, operation, compress_level=1):
+        text = json.dumps(operation.as_odict(), separators=(',', ':'))
+        self.data = zlib.compress(text.encode('utf-8'), compress_level)
+
+    @property
+    def json(self):
+        return zlib.decompress(self.data).decode('utf-8')
+
+    def load(self):
+        return json.loads(self.json, object_pairs_hook=OrderedDict)
+
+
+class LowMemorySchemaGenerator(generators.OpenAPISchemaGenerator):
+    """
+    Schema generator keeping memory usage flat as number of endpoints grows.
+
+    Each operation is finalized into :class:`OperationFragment` as soon as it is built, so schemas of operation
+    (and serializers and fields referenced while building them) are released before the next one is inspected.
+    Schemas shared within a generation are released after each operation too, unless `release_shared_schemas`
+    is False, trading memory for time.
+
+    :meth:`write_json` streams document straight from fragments, :meth:`get_schema` returns regular
+    `openapi.Swagger` with operations decoded back into dicts.
+    """
+    compress_level = 1
+    release_shared_schemas = True
+
+    def get_operation(self, view, path, prefix, method, components, request):
+        operation = super().get_operation(view, path, prefix, method, components, request)
+        if self.release_shared_schemas:
+            get_generation_cache(components).clear()
+        if operation is None:
+            return None
+        return OperationFragment(operation, self.compress_level)
+
+    def get_schema(self, request=None, public=False):
+        schema = self.get_fragments_schema(request, public)
+        for path_item in schema['paths'].values():
+            for key, value in path_item.items():
+                if isinstance(value, OperationFragment):
+                    path_item[key] = value.load()
+        return schema
+
+    def get_fragments_schema(self, request=None, public=False):
+        """Return `openapi.Swagger` with :class:`OperationFragment` in place of operations."""
+        return super().get_schema(request, public)
+
+    def write_json(self, stream, request=None, public=False):
+        """Write JSON document to `stream` (text file-like object) without decoding operation fragments."""
+        schema = self.get_fragments_schema(request, public)
+        stream.write('{')
+        for index, (key, value) in enumerate(schema.items()):
+            stream.write('{separator}{key}:'.format(separator=',' if index else '', key=json.dumps(key)))
+            if key == 'paths':
+                self.write_paths_json(stream, value)
+            else:
+                stream.write(json.dumps(openapi.SwaggerDict._as_odict(value, {}), separators=(',', ':')))
+        stream.write('}')
+
+    def write_paths_json(self, stream, paths):
+        stream.write('{')
+        for path_index, (path, path_item) in enumerate(paths.items()):
+            stream.write('{separator}{path}:{{'.format(separator=',' if path_index else '', path=json.dumps(path)))
+            for index, (key, value) in enumerate(path_item.items()):
+                if isinstance(value, OperationFragment):
+                    value = value.json
+                else:
+                    value = json.dumps(openapi.SwaggerDict._as_odict(value, {}), separators=(',', ':'))
+                stream.write('{separator}{key}:{value}'.format(
+                    separator=',' if index else '', key=json.dumps(key), value=value
+                ))
+            stream.write('}')
+        stream.write('}')
+
+
+def get_referenced_definitions(paths, definitions):
+    """Return `definitions` referenced from `paths`, directly or through other definitions, in original order."""
+    referenced = set()
+    seen = set()
+    pending = [paths]
+    while pending:
+        value = pending.pop()
+        # Schemas are shared between operations, walk each of them once
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        if isinstance(value, dict):
+            ref = value.get('$ref')
+            if isinstance(ref, str) and ref.startswith('#/definitions/'):
+                name = ref[len('#/definitions/'):]
+                if name not in referenced and name in definitions:
+                    referenced.add(name)
+                    pending.append(definitions[name])
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+    return OrderedDict((name, definition) for name, definition in definitions.items() if name in referenced)
@@ -1,3 +1,44 @@
-from .field import *  # noqa
-from .query import *  # noqa
-from .view import *  # noqa
+import importlib
+import sys
+
+# Inspectors are referenced from settings of every process, but only processes generating schema need them, so
+# modules pulling in drf-yasg and django-rest-framework-json-api stacks are imported on first access of their names
+_lazy_names = {
+    'InlineSerializerInspector': 'field',
+    'InlineSerializerSmartInspector': 'field',
+    'JSONAPISerializerInspector': 'field',
+    'JSONAPISerializerSmartInspector': 'field',
+    'IntegerPrimaryKeyRelatedFieldInspector': 'field',
+    'IntegerIDFieldInspector': 'field',
+    'ManyRelatedFieldInspector': 'field',
+    'NamesFormatFilter': 'field',
+    'XPropertiesFilter': 'field',
+    'DjangoFilterInspector': 'query',
+    'DjangoRestResponsePagination': 'query',
+    'OrderingFilterInspector': 'query',
+    'ReferencingDjangoRestResponsePagination': 'query',
+    'SwaggerAutoSchema': 'view',
+}
+
+__all__ = list(_lazy_names)
+
+
+def __getattr__(name):
+    try:
+        module_name = _lazy_names[name]
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+    value = getattr(importlib.import_module(f'{__name__}.{module_name}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    # No module __getattr__ (PEP 562), import eagerly
+    from .field import *  # noqa
+    from .query import *  # noqa
+    from .view import *  # noqa
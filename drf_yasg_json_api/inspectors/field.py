@@ -9,22 +9,27 @@ from drf_yasg import openapi
 from drf_yasg.inspectors.field import get_model_field
 from drf_yasg.inspectors.field import get_parent_serializer
 from drf_yasg.utils import filter_none
-from rest_framework import relations
 from rest_framework import serializers
-from rest_framework.serializers import BaseSerializer
 from rest_framework.settings import api_settings
 from rest_framework_json_api import serializers as dja_serializers
 from rest_framework_json_api import utils as json_api_utils
 from rest_framework_json_api.settings import json_api_settings
 from rest_framework_json_api.utils import format_value
 from rest_framework_json_api.utils import get_resource_name
-from rest_framework_json_api.utils import get_resource_type_from_model
-from rest_framework_json_api.utils import get_resource_type_from_serializer
 
 from drf_yasg_json_api.deprecation import DrfYasgJsonApiDeprecationWarning
 from drf_yasg_json_api.utils import get_field_by_source
+from drf_yasg_json_api.utils import get_field_fingerprint
+from drf_yasg_json_api.utils import get_field_kind
 from drf_yasg_json_api.utils import get_field_related_model
+from drf_yasg_json_api.utils import get_formatted_field_names
+from drf_yasg_json_api.utils import get_generation_cache
+from drf_yasg_json_api.utils import get_model_resource_type
+from drf_yasg_json_api.utils import get_related_resource_type
+from drf_yasg_json_api.utils import get_serializer_fingerprint
 from drf_yasg_json_api.utils import get_serializer_model_primary_key
+from drf_yasg_json_api.utils import get_serializer_resource_type
+from drf_yasg_json_api.utils import get_switches
 from drf_yasg_json_api.utils import is_json_api
 from drf_yasg_json_api.utils import is_json_api_request
 from drf_yasg_json_api.utils import is_json_api_response
@@ -53,6 +58,18 @@ class JSONAPISerializerInspector(inspectors.InlineSerializerInspector):
     strip_read_fields_from_request = False
     strip_write_fields_from_response = False
     handle_json_api_only = True
+    #: :class:`drf_yasg_json_api.cache.FragmentCache` to share generated resource schemas between processes
+    fragment_cache = None
+    #: Share schemas of serializer fields between request, response and included variants of the same serializer
+    share_variant_schemas = True
+    #: Cache resource types of relationships per serializer class, field name and field class, disable if fields of
+    #: the same serializer class may point to different resource types
+    cache_related_resource_names = True
+    #: Order attributes and relationships by name instead of declaration
+    canonical_ordering = False
+    #: Format names of attributes and relationships while building resource schema, from names precomputed per
+    #: serializer, instead of :class:`NamesFormatFilter` rewriting the whole resource schema afterwards
+    format_names = False
 
     def get_schema(self, serializer):
         return self.probe_field_inspectors(serializer, openapi.Schema, self.use_definitions, is_request=False)
@@ -75,17 +92,52 @@ class JSONAPISerializerInspector(inspectors.InlineSerializerInspector):
             is_request = False
 
         if included:
-            resource_name = get_resource_type_from_serializer(field)
+            resource_name = get_serializer_resource_type(field)
         else:
             resource_name = get_resource_name(context={'view': self.view})
 
         SwaggerType, ChildSwaggerType = self._get_partial_types(field, swagger_object_type, use_references, **kwargs)
-        return self.build_serializer_schema(field, resource_name, SwaggerType, ChildSwaggerType, use_references,
-                                            is_request)
+
+        def build():
+            return self.build_serializer_schema(field, resource_name, SwaggerType, ChildSwaggerType, use_references,
+                                                is_request)
+
+        if self.fragment_cache is None or kwargs:
+            result = build()
+        else:
+            result = self.fragment_cache.get_or_build(
+                lambda: self.get_fragment_cache_key_parts(field, resource_name, is_request, included),
+                build,
+                swagger_object_type,
+            )
+        if self.format_names:
+            mark_names_formatted(result, self.components)
+        return result
+
+    def get_fragment_cache_key_parts(self, serializer, resource_name, is_request, included):
+        return [
+            'serializer',
+            get_serializer_fingerprint(serializer),
+            resource_name,
+            is_request,
+            included,
+            self.method.lower() == 'post',
+            self.__class__,
+            self.field_inspectors,
+            # Switches (e.g. `canonical_ordering`, `share_variant_schemas`) may be overridden without changing names
+            get_switches(self),
+            [get_switches(inspector) for inspector in self.field_inspectors],
+            self.view.renderer_classes,
+            self.view.parser_classes,
+            api_settings.URL_FIELD_NAME,
+            json_api_settings.FORMAT_FIELD_NAMES if self.format_names else None,
+        ]
 
     def build_serializer_schema(self, serializer, resource_name, SwaggerType, ChildSwaggerType, use_references,
                                 is_request=None):
         fields = json_api_utils.get_serializer_fields(serializer)
+        if self.canonical_ordering:
+            fields = OrderedDict(sorted(fields.items()))
         is_post = self.method.lower() == 'post'
 
         id_field = self.extract_id_field(fields, serializer)
@@ -94,13 +146,16 @@ class JSONAPISerializerInspector(inspectors.InlineSerializerInspector):
                 view=self.view.__class__.__name__, serializer=serializer.__class__.__name__
             ))
 
-        attributes, req_attrs = self.extract_attributes(id_field, fields, ChildSwaggerType, use_references, is_request)
-        relationships, req_rels = self.extract_relationships(fields, ChildSwaggerType, use_references, is_request)
+        names = get_formatted_field_names(serializer.__class__, fields) if self.format_names else None
+        attributes, req_attrs = self.extract_attributes(id_field, fields, ChildSwaggerType, use_references, is_request,
+                                                        names)
+        relationships, req_rels = self.extract_relationships(fields, ChildSwaggerType, use_references, is_request,
+                                                             names)
         links = self.extract_links(fields, ChildSwaggerType, use_references) if not is_request else None
 
         schema_fields = filter_none(OrderedDict(
             type=self.build_type_schema(resource_name),
-            id=self.probe_field_inspectors(id_field, ChildSwaggerType, use_references)
+            id=self.get_field_schema(id_field, ChildSwaggerType, use_references)
             if id_field and not (self.strip_read_fields_from_request and is_request and is_post) else None,
             attributes=openapi.Schema(type=openapi.TYPE_OBJECT, properties=attributes, required=req_attrs)
             if attributes else None,
@@ -130,6 +185,32 @@ class JSONAPISerializerInspector(inspectors.InlineSerializerInspector):
             type=openapi.TYPE_STRING, pattern=resource_name, read_only=read_only or None
         )))
 
+    def get_field_schema(self, field, ChildSwaggerType, use_references):
+        """
+        Schema of a serializer field does not depend on variant (request, response, included) of serializer schema.
+        Within a single generation every field schema is built once and shared by all variants, which only build their
+        own nodes that differ (`required` lists, stripped fields, links) on top of shared ones.
+
+        Shared schemas must not be modified by variants, copy them first.
+        """
+        if not self.share_variant_schemas:
+            return self.probe_field_inspectors(field, ChildSwaggerType, use_references)
+
+        parent_serializer = get_parent_serializer(field)
+        key = (
+            'field_schema',
+            self.view.__class__,
+            tuple(self.field_inspectors),
+            ChildSwaggerType,
+            use_references,
+            parent_serializer.__class__ if parent_serializer is not None else None,
+            repr(get_field_fingerprint(field)),
+        )
+        shared_schemas = get_generation_cache(self.components)
+        if key not in shared_schemas:
+            shared_schemas[key] = self.probe_field_inspectors(field, ChildSwaggerType, use_references)
+        return shared_schemas[key]
+
     def extract_id_field(self, fields, serializer: serializers.Serializer):
         # Included in fields and explicitly named "id"
         if 'id' in fields:
@@ -157,8 +238,8 @@ class JSONAPISerializerInspector(inspectors.InlineSerializerInspector):
         serializer_id.bind('id', serializer)
         return serializer_id
 
-    def extract_attributes(self, id_field, fields, ChildSwaggerType, use_references, is_request=None):
-        attrs = {}
+    def extract_attributes(self, id_field, fields, ChildSwaggerType, use_references, is_request=None, names=None):
+        attrs = OrderedDict()
         required_attrs = []
         for field_name, field in fields.items():
             if self.should_strip_from_schema(field, is_request):
@@ -167,15 +248,16 @@ class JSONAPISerializerInspector(inspectors.InlineSerializerInspector):
             if id_field and field_name == id_field.field_name:
                 continue
             # Skip fields with relations
-            if isinstance(field, (relations.RelatedField, relations.ManyRelatedField, BaseSerializer)):
+            if get_field_kind(field.__class__) != 'attributes':
                 continue
 
-            attrs[field_name] = self.probe_field_inspectors(field, ChildSwaggerType, use_references)
+            name = names[field_name] if names is not None else field_name
+            attrs[name] = self.get_field_schema(field, ChildSwaggerType, use_references)
             if self.is_request_or_unknown(is_request) and field.required and not field.read_only:
-                required_attrs.append(field_name)
+                required_attrs.append(name)
         return attrs, (required_attrs or None)
 
-    def extract_relationships(self, fields, ChildSwaggerType, use_references, is_request=None):
+    def extract_relationships(self, fields, ChildSwaggerType, use_references, is_request=None, names=None):
         relationships = OrderedDict()
         required_relationships = []
         for field_name, field in fields.items():
@@ -187,46 +269,83 @@ class JSONAPISerializerInspector(inspectors.InlineSerializerInspector):
             if field_name == api_settings.URL_FIELD_NAME:
                 continue
             # Skip fields without relations
-            if not isinstance(field, (relations.RelatedField, relations.ManyRelatedField, serializers.Serializer)):
+            if get_field_kind(field.__class__) != 'relationships':
                 continue
 
-            # Produce swagger output
-            relation_data_schema = openapi.Schema(**filter_none(OrderedDict(
-                type=openapi.TYPE_OBJECT,
-                properties=OrderedDict(
-                    id=self.probe_field_inspectors(field, ChildSwaggerType, use_references),
-                    type=self.build_type_schema(
-                        self.get_resource_name_from_related_id_field(field_name, field),
-                        read_only=field.read_only
-                    ),
-                ),
-                required=['id', 'type'] if (self.is_request_or_unknown(is_request)) and not field.read_only else None,
-            )))
-
-            if is_many_related_field(field):
-                relation_data_schema = openapi.Schema(type=openapi.TYPE_ARRAY, items=relation_data_schema)
-
-            relation_links_schema = self.get_links_from_id_field(field_name, field)
-            if relation_links_schema:
-                relation_links_schema = openapi.Schema(type=openapi.TYPE_OBJECT, properties=relation_links_schema)
-
+            name = names[field_name] if names is not None else field_name
             is_relation_required = self.is_request_or_unknown(is_request) and field.required and not field.read_only
-
-            relationships[field_name] = openapi.Schema(**filter_none(OrderedDict(
-                type=openapi.TYPE_OBJECT,
-                properties=filter_none({
-                    'data': relation_data_schema,
-                    'links': relation_links_schema if self.not_request_or_unknown(is_request) else None
-                }),
-                required=['data'] if is_relation_required else None,
-                read_only=field.read_only or None,
-                x_read_only=field.read_only or None,
-            )))
+            relationships[name] = self.get_relationship_schema(
+                field_name, field, ChildSwaggerType, use_references, is_request, is_relation_required
+            )
             if is_relation_required:
-                required_relationships.append(field_name)
+                required_relationships.append(name)
 
         return relationships, (required_relationships or None)
 
+    def get_relationship_schema(self, field_name, field, ChildSwaggerType, use_references, is_request,
+                                is_relation_required):
+        """
+        Relationships pointing at the same resource type with the same flags and id schema have identical schemas,
+        which are built once per generation and shared by all of them.
+        """
+        id_schema = self.get_field_schema(field, ChildSwaggerType, use_references)
+        resource_name = self.get_related_resource_name(field_name, field)
+        links = self.get_links_from_id_field(field_name, field) if self.not_request_or_unknown(is_request) else None
+        if not self.share_variant_schemas:
+            return self.build_relationship_schema(id_schema, resource_name, field, is_request, is_relation_required,
+                                                  links)
+
+        key = (
+            'relationship_schema',
+            resource_name,
+            bool(is_many_related_field(field)),
+            bool(field.read_only),
+            self.is_nullable_relationship(field),
+            self.is_request_or_unknown(is_request),
+            is_relation_required,
+            tuple(links) if links else None,
+            id(id_schema),
+        )
+        templates = get_generation_cache(self.components)
+        # Id schema is kept with the template, so that its id cannot be reused by other object
+        template_id_schema, schema = templates.get(key, (None, None))
+        if template_id_schema is not id_schema:
+            schema = self.build_relationship_schema(id_schema, resource_name, field, is_request, is_relation_required,
+                                                    links)
+            templates[key] = (id_schema, schema)
+        return schema
+
+    def build_relationship_schema(self, id_schema, resource_name, field, is_request, is_relation_required, links):
+        relation_data_schema = openapi.Schema(**filter_none(OrderedDict(
+            type=openapi.TYPE_OBJECT,
+            properties=OrderedDict(
+                id=id_schema,
+                type=self.build_type_schema(resource_name, read_only=field.read_only),
+            ),
+            required=['id', 'type'] if (self.is_request_or_unknown(is_request)) and not field.read_only else None,
+            # Empty to-one relationship is rendered as null
+            x_nullable=self.is_nullable_relationship(field) or None,
+        )))
+
+        if is_many_related_field(field):
+            relation_data_schema = openapi.Schema(type=openapi.TYPE_ARRAY, items=relation_data_schema)
+
+        relation_links_schema = openapi.Schema(type=openapi.TYPE_OBJECT, properties=links) if links else None
+
+        return openapi.Schema(**filter_none(OrderedDict(
+            type=openapi.TYPE_OBJECT,
+            properties=filter_none({
+                'data': relation_data_schema,
+                'links': relation_links_schema
+            }),
+            required=['data'] if is_relation_required else None,
+            read_only=field.read_only or None,
+            x_read_only=field.read_only or None,
+        )))
+
+    def is_nullable_relationship(self, field):
+        return not is_many_related_field(field) and bool(getattr(field, 'allow_null', False))
+
     def extract_links(self, fields, ChildSwaggerType, use_references):
         self_field_name = api_settings.URL_FIELD_NAME
 
@@ -235,13 +354,22 @@ class JSONAPISerializerInspector(inspectors.InlineSerializerInspector):
             if self_field_name in fields and isinstance(fields[self_field_name], serializers.RelatedField) else None
         ))
 
+    def get_related_resource_name(self, field_name, field):
+        """Resource type of related field, resolved once for field of the same serializer class."""
+        if not self.cache_related_resource_names:
+            return self.get_resource_name_from_related_id_field(field_name, field)
+        return get_related_resource_type(
+            field.parent.__class__, field_name, field.__class__,
+            lambda: self.get_resource_name_from_related_id_field(field_name, field)
+        )
+
     def get_resource_name_from_related_id_field(self, field_name, id_field):
         # Unpack ManyRelatedField from many wrapper
         id_field = getattr(id_field, 'child_relation', None) or id_field
 
         # Not very frequent case but different from others
         if isinstance(id_field, serializers.Serializer):
-            return json_api_utils.get_resource_type_from_serializer(id_field)
+            return get_serializer_resource_type(id_field)
         # Most cases
         else:
             # Try to get from included serializers
@@ -253,7 +381,7 @@ class JSONAPISerializerInspector(inspectors.InlineSerializerInspector):
 
             related_model = get_field_related_model(id_field)
             if related_model:
-                return get_resource_type_from_model(related_model)
+                return get_model_resource_type(related_model)
 
         raise ValueError(f"Unable to extract resource name for {parent_serializer}.{field_name} serializer field")
 
@@ -261,9 +389,9 @@ class JSONAPISerializerInspector(inspectors.InlineSerializerInspector):
         links = OrderedDict()
         if isinstance(id_field, dja_serializers.ResourceRelatedField):
             if id_field.related_link_lookup_field is not None:
-                links['related'] = openapi.Schema(type=openapi.TYPE_STRING, pattern=openapi.FORMAT_URI, read_only=True)
+                links['related'] = openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI, read_only=True)
             if id_field.self_link_view_name is not None:
-                links['self'] = openapi.Schema(type=openapi.TYPE_STRING, pattern=openapi.FORMAT_URI, read_only=True)
+                links['self'] = openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI, read_only=True)
         return links or None
 
     def is_json_api_root_serializer(self, field, is_request=False):
@@ -407,6 +535,17 @@ class ManyRelatedFieldInspector(inspectors.SimpleFieldInspector):
         return inspectors.NotHandled
 
 
+def mark_names_formatted(schema, components):
+    """Mark resource `schema` built with formatted names, so that :class:`NamesFormatFilter` skips it."""
+    schema = openapi.resolve_ref(schema, components)
+    # Schema is kept with its id, so that the id cannot be reused by other object
+    get_generation_cache(components).setdefault('names_formatted', {})[id(schema)] = schema
+
+
+def is_names_formatted(schema, components):
+    return id(schema) in get_generation_cache(components).get('names_formatted', {})
+
+
 class NamesFormatFilter(inspectors.FieldInspector):
 
     def format_string(self, s):
@@ -414,7 +553,9 @@ class NamesFormatFilter(inspectors.FieldInspector):
 
     def format_schema(self, schema):
         """Recursively format property names for the given schema according to``JSON_API_FORMAT_KEYS`` setting.
-        The target schema object must be modified in-place.
+        The target schema object must be modified in-place. It belongs to the current generation (caches shared
+        between generations hand out copies) and formatting is idempotent, so schemas shared within the generation
+        may be formatted repeatedly.
 
         :param openapi.Schema schema: the :class:`.Schema` object
         """
@@ -430,7 +571,10 @@ class NamesFormatFilter(inspectors.FieldInspector):
     def process_result(self, result, method_name, obj, **kwargs):
         if isinstance(result, openapi.Schema.OR_REF) and is_json_api(self.view):
             schema = openapi.resolve_ref(result, self.components)
-            self.format_schema(schema)
+            # Resource built by JSONAPISerializerInspector.format_names, its nested schemas of fields were formatted
+            # when their fields were inspected
+            if not is_names_formatted(schema, self.components):
+                self.format_schema(schema)
 
         return result
 
@@ -1,22 +1,51 @@
+import copy
 import logging
 
 from collections import OrderedDict
 
+from django.core.exceptions import ImproperlyConfigured
 from django.utils.functional import cached_property
 from drf_yasg import inspectors
 from drf_yasg import openapi
+from drf_yasg.inspectors.field import get_queryset_from_view
 from drf_yasg.utils import filter_none
+from drf_yasg.utils import force_real_str
+from rest_framework.pagination import CursorPagination
 from rest_framework_json_api import pagination
+from rest_framework_json_api.settings import json_api_settings
+from rest_framework_json_api.utils import format_value
+
+from drf_yasg_json_api.utils import clear_filter_parameters
+from drf_yasg_json_api.utils import get_filter_parameters
+from drf_yasg_json_api.utils import get_fingerprint_value
+from drf_yasg_json_api.utils import get_generation_cache
+from drf_yasg_json_api.utils import is_json_api_response
 
 logger = logging.getLogger(__name__)
 
 __all__ = [
     'DjangoFilterInspector',
     'DjangoRestResponsePagination',
+    'OrderingFilterInspector',
+    'ReferencingDjangoRestResponsePagination',
 ]
 
 
 class DjangoFilterInspector(inspectors.CoreAPICompatInspector):
+    """
+    Generate `filter[]` query params from FilterSet of `DjangoFilterBackend`.
+
+    Params are generated straight from filters declared by FilterSet (unless `coreapi_compat` is set) and cached per
+    filter backend class and FilterSet resolved by it, so views sharing FilterSet share them. Cache is cleared on
+    settings change.
+    """
+    #: Generate params from coreapi schema fields of filter backend instead of FilterSet filters
+    coreapi_compat = False
+
+    @classmethod
+    def clear_cache(cls):
+        clear_filter_parameters()
+
     @cached_property
     def django_filters(self):
         from rest_framework_json_api import django_filters
@@ -25,7 +54,43 @@ class DjangoFilterInspector(inspectors.CoreAPICompatInspector):
     def get_filter_parameters(self, filter_backend):
         if not isinstance(filter_backend, self.django_filters.DjangoFilterBackend):
             return inspectors.NotHandled
-        return super().get_filter_parameters(filter_backend)
+        if self.coreapi_compat:
+            return super().get_filter_parameters(filter_backend)
+
+        queryset = get_queryset_from_view(self.view)
+        filterset_class = filter_backend.get_filterset_class(self.view, queryset)
+        key = (
+            'filter',
+            filter_backend.__class__,
+            self.__class__,
+            self.get_filterset_key(filterset_class),
+            getattr(queryset, 'model', None),
+        )
+        parameters = get_filter_parameters(key, lambda: tuple(
+            self.filter_to_parameter(filter_name, filter_)
+            for filter_name, filter_ in (filterset_class.base_filters.items() if filterset_class else ())
+        ))
+        # Cached params are shared by all generations and threads, so every operation gets its own copies
+        return [copy.copy(parameter) for parameter in parameters]
+
+    def get_filterset_key(self, filterset_class):
+        if filterset_class is None or '<locals>' not in filterset_class.__qualname__:
+            return filterset_class
+        # Created on the fly (e.g. from `filterset_fields` of view), as a new class for every call
+        meta = filterset_class._meta
+        return repr(get_fingerprint_value([
+            filterset_class.__bases__, meta.model, meta.fields, meta.exclude, filterset_class.declared_filters
+        ]))
+
+    def filter_to_parameter(self, filter_name, filter_):
+        from django_filters.filters import NumberFilter
+        return openapi.Parameter(
+            name=f'filter[{filter_name}]',
+            in_=openapi.IN_QUERY,
+            required=filter_.extra['required'],
+            description=force_real_str(filter_.extra.get('help_text', '')),
+            type=openapi.TYPE_NUMBER if isinstance(filter_, NumberFilter) else openapi.TYPE_STRING,
+        )
 
     def coreapi_field_to_parameter(self, field):
         parameter = super().coreapi_field_to_parameter(field)
@@ -33,17 +98,121 @@ class DjangoFilterInspector(inspectors.CoreAPICompatInspector):
         return parameter
 
 
+class OrderingFilterInspector(inspectors.FilterInspector):
+    """
+    Generate `sort` query param of `rest_framework_json_api.filters.OrderingFilter` listing fields available for
+    sorting, formatted the way the filter accepts them.
+    """
+
+    @cached_property
+    def ordering_filter_class(self):
+        from rest_framework_json_api.filters import OrderingFilter
+        return OrderingFilter
+
+    def get_filter_parameters(self, filter_backend):
+        if not isinstance(filter_backend, self.ordering_filter_class):
+            return inspectors.NotHandled
+
+        queryset = get_queryset_from_view(self.view)
+        try:
+            valid_fields = filter_backend.get_valid_fields(queryset, self.view, {'request': None})
+        except (ImproperlyConfigured, AttributeError):
+            logger.warning('Unable to determine sort fields of {view}'.format(view=self.view.__class__.__name__),
+                           exc_info=True)
+            valid_fields = []
+
+        return [openapi.Parameter(
+            type=openapi.TYPE_STRING,
+            in_=openapi.IN_QUERY,
+            name=filter_backend.ordering_param,
+            description='Sort by fields, prefixed with "-" for descending order. Available fields: {fields}'.format(
+                fields=', '.join(self.format_sort_field(field_name) for field_name, label in valid_fields)
+            ),
+            format='comma-separated-array'
+        )]
+
+    def format_sort_field(self, field_name):
+        # Relationship paths are separated with dots, which OrderingFilter turns back into "__"
+        return '.'.join(format_value(part, json_api_settings.FORMAT_FIELD_NAMES) for part in field_name.split('__'))
+
+
 class DjangoRestResponsePagination(inspectors.PaginatorInspector):
+    """
+    Generate `links` and `meta` of JSON API paginated responses for page number, limit/offset and cursor paginators.
+
+    Cursor paginators (subclasses of `rest_framework.pagination.CursorPagination` used with JSON API renderer) respond
+    with `data` only, since JSON API renderer emits `links` only when paginated data has `links` key and DRF responds
+    with `next` and `previous` keys instead. Those overriding `get_paginated_response` are expected to respond with
+    `links` (`next` and `prev`) like JSON API paginators do.
+    """
+    #: Emit `links` and `meta` schemas once as definitions referenced from every paginated response
+    use_definitions = False
+
+    PAGE_NUMBER = 'page_number'
+    LIMIT_OFFSET = 'limit_offset'
+    CURSOR = 'cursor'
+    UNLINKED_CURSOR = 'unlinked_cursor'
+
+    definition_names = {
+        ('links', PAGE_NUMBER): 'JSONAPIPaginationLinks',
+        ('links', LIMIT_OFFSET): 'JSONAPIPaginationLinks',
+        ('links', CURSOR): 'JSONAPICursorPaginationLinks',
+        ('meta', PAGE_NUMBER): 'JSONAPIPageNumberPaginationMeta',
+        ('meta', LIMIT_OFFSET): 'JSONAPILimitOffsetPaginationMeta',
+    }
 
     def get_paginated_response(self, paginator, response_schema):
-        if not isinstance(paginator, (pagination.JsonApiPageNumberPagination, pagination.JsonApiLimitOffsetPagination)):
+        style = self.get_pagination_style(paginator)
+        if style is None:
             return inspectors.NotHandled
 
         assert 'data' in response_schema['properties'], "expected data field in response"
         assert response_schema['properties']['data'].type == openapi.TYPE_ARRAY, "array expected for paged response"
 
-        has_page = isinstance(paginator, pagination.JsonApiPageNumberPagination)
-        meta_schema = openapi.Schema(
+        return openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties=filter_none(OrderedDict(
+                links=None if style == self.UNLINKED_CURSOR else self.get_envelope_schema('links', style),
+                meta=None if style in (self.CURSOR, self.UNLINKED_CURSOR) else self.get_envelope_schema('meta', style),
+                data=response_schema.properties['data'],
+                included=response_schema.properties.get('included')
+            ))
+        )
+
+    def get_pagination_style(self, paginator):
+        if isinstance(paginator, pagination.JsonApiPageNumberPagination):
+            return self.PAGE_NUMBER
+        if isinstance(paginator, pagination.JsonApiLimitOffsetPagination):
+            return self.LIMIT_OFFSET
+        if isinstance(paginator, CursorPagination) and is_json_api_response(self.get_renderer_classes()):
+            return self.CURSOR if self.responds_with_links(paginator) else self.UNLINKED_CURSOR
+        return None
+
+    def responds_with_links(self, paginator):
+        return type(paginator).get_paginated_response is not CursorPagination.get_paginated_response
+
+    def get_envelope_schema(self, envelope, style):
+        """
+        Return schema of `envelope` (`links` or `meta`) for pagination `style`. Envelopes are the same for every
+        response paginated in the same style, so they are built once per generation, either as definitions or as
+        inline schemas shared by all responses.
+        """
+        build = getattr(self, 'build_{envelope}_schema'.format(envelope=envelope))
+        if self.use_definitions:
+            definitions = self.components.with_scope(openapi.SCHEMA_DEFINITIONS)
+            name = self.definition_names[(envelope, style)]
+            definitions.setdefault(name, lambda: build(style))
+            return openapi.SchemaRef(definitions, name)
+
+        envelopes = get_generation_cache(self.components)
+        key = ('pagination', envelope, style)
+        if key not in envelopes:
+            envelopes[key] = build(style)
+        return envelopes[key]
+
+    def build_meta_schema(self, style):
+        has_page = style == self.PAGE_NUMBER
+        return openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties=OrderedDict(
                 pagination=openapi.Schema(
@@ -58,22 +227,17 @@ class DjangoRestResponsePagination(inspectors.PaginatorInspector):
                 )
             )
         )
-        links_schema = openapi.Schema(
-            type=openapi.TYPE_OBJECT,
-            properties=OrderedDict((
-                ('first', openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI)),
-                ('next', openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI)),
-                ('last', openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI)),
-                ('prev', openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI)),
-            )),
-        )
 
+    def build_links_schema(self, style):
+        names = ('next', 'prev') if style == self.CURSOR else ('first', 'next', 'last', 'prev')
         return openapi.Schema(
             type=openapi.TYPE_OBJECT,
-            properties=filter_none(OrderedDict(
-                links=links_schema,
-                meta=meta_schema,
-                data=response_schema.properties['data'],
-                included=response_schema.properties.get('included')
-            ))
+            properties=OrderedDict(
+                (name, openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI, x_nullable=True))
+                for name in names
+            ),
         )
+
+
+class ReferencingDjangoRestResponsePagination(DjangoRestResponsePagination):
+    use_definitions = True
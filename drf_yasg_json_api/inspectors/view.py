@@ -1,20 +1,34 @@
+import inspect
+import itertools
 import logging
+import re
+import time
 
 from collections import OrderedDict
 
+from django.utils.functional import cached_property
 from drf_yasg import inspectors
 from drf_yasg import openapi
 from drf_yasg.utils import filter_none
 from drf_yasg.utils import guess_response_status
 from rest_framework import serializers
 from rest_framework.status import is_success
+from rest_framework_json_api.serializers import SparseFieldsetsMixin
 from rest_framework_json_api.settings import json_api_settings
 from rest_framework_json_api.utils import format_value
-from rest_framework_json_api.utils import get_resource_type_from_serializer
 
+from drf_yasg_json_api.digest import get_canonical_json
+from drf_yasg_json_api.profiling import profiled
+from drf_yasg_json_api.utils import get_fingerprint_value
+from drf_yasg_json_api.utils import get_generation_cache
 from drf_yasg_json_api.utils import get_included_serializers
+from drf_yasg_json_api.utils import get_serializer_field_map
+from drf_yasg_json_api.utils import get_serializer_fingerprint
+from drf_yasg_json_api.utils import get_serializer_resource_type
+from drf_yasg_json_api.utils import get_switches
 from drf_yasg_json_api.utils import is_json_api_request
 from drf_yasg_json_api.utils import is_json_api_response
+from drf_yasg_json_api.utils import resource_type_registry
 
 __all__ = [
     'SwaggerAutoSchema',
@@ -24,13 +38,151 @@ logger = logging.getLogger(__name__)
 
 
 class SwaggerAutoSchema(inspectors.SwaggerAutoSchema):
+    #: :class:`drf_yasg_json_api.cache.FragmentCache` to share generated operations between processes
+    fragment_cache = None
+    #: :class:`drf_yasg_json_api.profiling.SchemaProfiler` to record generation time and size of operations
+    profiler = None
+    #: Document `fields[type]` sparse fieldsets params of response resource and its included resources
+    sparse_fieldsets_parameters = True
+    #: Order included types and include paths by name instead of declaration, see also
+    #: `JSONAPISerializerInspector.canonical_ordering`
+    canonical_ordering = False
+    #: Emit included resources and their union as definitions referenced from every response including them
+    included_definitions = False
+    _operation_profile = None
+
+    def get_operation(self, operation_keys=None):
+        if self.profiler is None:
+            return self.get_cached_operation(operation_keys)
+
+        self._operation_profile = self.profiler.start_operation(self.method, self.path)
+        start = time.perf_counter()
+        try:
+            operation = self.get_cached_operation(operation_keys)
+        finally:
+            profile, self._operation_profile = self._operation_profile, None
+        self.profiler.finish_operation(profile, operation, time.perf_counter() - start)
+        return operation
+
+    def get_cached_operation(self, operation_keys=None):
+        if self.fragment_cache is None:
+            return super().get_operation(operation_keys)
+
+        return self.fragment_cache.get_or_build(
+            lambda: self.get_fragment_cache_key_parts(operation_keys),
+            lambda: super(SwaggerAutoSchema, self).get_operation(operation_keys),
+            openapi.Operation,
+        )
+
+    def get_fragment_cache_key_parts(self, operation_keys=None):
+        view_serializer = self.get_view_serializer()
+        return [
+            'operation',
+            self.__class__,
+            self.method,
+            self.path,
+            operation_keys or self.operation_keys,
+            self.overrides,
+            self.get_summary_and_description(),
+            self.field_inspectors,
+            self.filter_inspectors,
+            self.paginator_inspectors,
+            # Switches (e.g. `canonical_ordering`, `included_definitions`, `sparse_fieldsets_parameters`) may be
+            # overridden without changing names of classes
+            get_switches(self),
+            [get_switches(inspector) for inspector in itertools.chain(
+                self.field_inspectors, self.filter_inspectors, self.paginator_inspectors
+            )],
+            self.get_view_fingerprint(),
+            get_serializer_fingerprint(view_serializer) if isinstance(view_serializer, serializers.Serializer)
+            else get_fingerprint_value(view_serializer),
+        ]
+
+    # Decisions about the operation (a single view and method) are asked for by several hooks, every one of them is
+    # computed once per operation
+
+    @cached_property
+    def parses_json_api(self):
+        return is_json_api_request(self.get_parser_classes())
+
+    @cached_property
+    def renders_json_api(self):
+        return is_json_api_response(self.get_renderer_classes())
+
+    def is_list_view(self):
+        return self._is_list_view
+
+    @cached_property
+    def _is_list_view(self):
+        return super().is_list_view()
+
+    def should_page(self):
+        return self._should_page
+
+    @cached_property
+    def _should_page(self):
+        return super().should_page()
+
+    def get_default_response_serializer(self):
+        return self._default_response_serializer
+
+    @cached_property
+    def _default_response_serializer(self):
+        return super().get_default_response_serializer()
+
+    def get_response_serializers(self):
+        # Default responses are built here, copy so that they are not built again for `include` params and responses
+        return OrderedDict(self._response_serializers)
+
+    @cached_property
+    def _response_serializers(self):
+        return super().get_response_serializers()
+
+    def get_include_source_serializer(self):
+        """
+        Serializer of success response providing included serializers (for `include` and sparse fieldsets params),
+        either from `responses` of `swagger_auto_schema` decorator or the default one.
+        """
+        return self._include_source_serializer
+
+    @cached_property
+    def _include_source_serializer(self):
+        success_response_serializers = [
+            serializer for status_code, serializer in self.get_response_serializers().items()
+            if (
+                is_success(int(status_code)) and
+                isinstance(serializer, serializers.BaseSerializer) and
+                hasattr(serializer, 'included_serializers')
+            )
+        ]
+
+        if not success_response_serializers:
+            return self.get_default_response_serializer()
+        if len(success_response_serializers) > 1:  # pragma: no cover
+            logger.warning(
+                'More than one response serializer for view {view_name} method {method} '
+                'provides included serializers, falling back to first one'.format(
+                    view_name=self.view.__class__.__name__, method=self.method
+                )
+            )
+        return success_response_serializers[0]
+
+    def get_view_fingerprint(self):
+        view_cls = self.view.__class__
+        # All plain class attributes, which covers renderers, parsers, pagination, filters and their configuration
+        return [get_fingerprint_value(view_cls)] + [
+            (name, get_fingerprint_value(value)) for name, value in inspect.getmembers(view_cls)
+            if not name.startswith('_') and not inspect.isroutine(value) and not isinstance(value, property)
+        ]
+
+    @profiled
     def get_request_body_schema(self, serializer):
         """
         Hook in to generate request schema from view's serializer OR overridden using `request_body` argument of
         of `swagger_auto_schema` decorator.
         """
         schema = self.serializer_to_request_schema(serializer)
-        if is_json_api_request(self.get_parser_classes()):
+        if self.parses_json_api:
             if schema is not None:
                 schema = openapi.Schema(
                     type=openapi.TYPE_OBJECT,
@@ -45,7 +197,7 @@ class SwaggerAutoSchema(inspectors.SwaggerAutoSchema):
         Hook in to generate response schemas for all pure (not converted to schema) serializers which can be provided
         using `responses` argument of `swagger_auto_schema` decorator.
         """
-        if not is_json_api_response(self.get_renderer_classes()):
+        if not self.renders_json_api:
             return super().get_response_schemas(response_serializers)
 
         response_schemas = OrderedDict()
@@ -76,12 +228,13 @@ class SwaggerAutoSchema(inspectors.SwaggerAutoSchema):
             )
         )
 
+    @profiled
     def get_default_responses(self):
         """
         Hook in to generate default response schema from view's serializer. Used only when no overriding response is
         provided using `responses` argument of `swagger_auto_schema` decorator.
         """
-        if not is_json_api_response(self.get_renderer_classes()):
+        if not self.renders_json_api:
             return super().get_default_responses()
 
         method = self.method.lower()
@@ -123,17 +276,99 @@ class SwaggerAutoSchema(inspectors.SwaggerAutoSchema):
 
         return default_data_schema
 
+    @profiled
     def get_included_schema_for_response(self, serializer):
-        included_paths, included_serializers = self._get_included_paths_and_serializers(serializer)
+        """
+        `included` array of union of resources reachable through included serializers, discriminated by `type`.
+
+        Swagger 2.0 has no `oneOf`, resources of union are listed in `x-oneOf` and `type` is restricted to their types.
+        Schema is built once per generation for every include closure, see :meth:`get_include_closure`.
+        """
+        closure_id, included_paths, included_serializers = self.get_include_closure(serializer)
+        if self._operation_profile is not None:
+            self._operation_profile.add_included_count(len(included_serializers))
         if not included_serializers:
             return None
 
-        return openapi.Schema(
+        key = (
+            'included',
+            tuple(self.field_inspectors),
+            tuple(self.view.renderer_classes),
+            tuple(self.view.parser_classes),
+            self.canonical_ordering,
+            self.included_definitions,
+            closure_id,
+        )
+        included_schemas = get_generation_cache(self.components)
+        if key not in included_schemas:
+            included_schemas[key] = self.build_included_schema(included_serializers)
+        return included_schemas[key]
+
+    def get_include_closure(self, serializer):
+        """
+        Return `(closure_id, include_paths, included_serializers)` of include closure of `serializer` – all serializers
+        reachable through included serializers.
+
+        Closures are computed once per serializer class within a generation and serializers with the same set of
+        included serializers get the same closure id, so that schemas built from a closure are built once and shared.
+        """
+        serializer_class = serializer if isinstance(serializer, type) else serializer.__class__
+        closures = get_generation_cache(self.components)
+        key = ('include_closure', serializer_class, self.canonical_ordering)
+        if key not in closures:
+            included_paths, included_serializers = self._get_included_paths_and_serializers(serializer_class)
+            resource_type_registry.register_serializers([serializer_class] + included_serializers)
+            closure_ids = closures.setdefault('include_closure_ids', {})
+            closure_id = closure_ids.setdefault(frozenset(included_serializers), len(closure_ids))
+            closures[key] = (closure_id, included_paths, included_serializers)
+        return closures[key]
+
+    def build_included_schema(self, included_serializers):
+        resource_schemas = OrderedDict()
+        for serializer in included_serializers:
+            schema = self.serializer_to_included_schema(serializer())
+            resource_schemas[get_serializer_resource_type(serializer)] = schema
+        if self.canonical_ordering:
+            resource_schemas = OrderedDict(sorted(resource_schemas.items()))
+        if self.included_definitions:
+            resource_schemas = OrderedDict(
+                (resource_type, self.get_definition_ref(
+                    '{}IncludedResource'.format(self._format_definition_name(resource_type)), schema
+                ))
+                for resource_type, schema in resource_schemas.items()
+            )
+
+        resource_schema = openapi.Schema(
             type=openapi.TYPE_OBJECT,
-            description='note: expect this field to be an array consisting of items of types listed below',
-            properties={get_resource_type_from_serializer(serializer): self.serializer_to_included_schema(serializer())
-                        for i, serializer in enumerate(included_serializers)}
+            properties=OrderedDict(
+                type=openapi.Schema(type=openapi.TYPE_STRING, enum=list(resource_schemas)),
+                id=openapi.Schema(type=openapi.TYPE_STRING),
+            ),
+            required=['type', 'id'],
+            discriminator='type',
+            x_one_of=list(resource_schemas.values()),
         )
+        if self.included_definitions:
+            resource_types = list(resource_schemas)
+            if len(resource_types) > 3:
+                resource_types = resource_types[:1] + ['and {} others'.format(len(resource_types) - 1)]
+            resource_schema = self.get_definition_ref('Included{}'.format(
+                ''.join(self._format_definition_name(resource_type) for resource_type in resource_types)
+            ), resource_schema)
+        return openapi.Schema(type=openapi.TYPE_ARRAY, items=resource_schema)
+
+    def get_definition_ref(self, name, schema):
+        """Add `schema` to definitions under `name`, suffixed with a number if other schema is already defined there."""
+        definitions = self.components.with_scope(openapi.SCHEMA_DEFINITIONS)
+        base_name, index = name, 1
+        while definitions.has(name) and get_canonical_json(definitions.get(name)) != get_canonical_json(schema):
+            index += 1
+            name = '{}{}'.format(base_name, index)
+        definitions.setdefault(name, lambda: schema)
+        return openapi.SchemaRef(definitions, name)
+
+    def _format_definition_name(self, value):
+        return ''.join(part.capitalize() for part in re.split(r'[^a-zA-Z0-9]+', value) if part)
 
     def serializer_to_included_schema(self, serializer):
         return self.probe_inspectors(
@@ -145,6 +380,7 @@ class SwaggerAutoSchema(inspectors.SwaggerAutoSchema):
             self.field_inspectors, 'get_request_schema', serializer, {'field_inspectors': self.field_inspectors},
         )
 
+    @profiled
     def get_query_parameters(self):
         """
         Hook in to add `include` parameter supported by response serializer.
@@ -153,37 +389,21 @@ class SwaggerAutoSchema(inspectors.SwaggerAutoSchema):
         and (of course) for view's main serializer if it's not overridden by decorator.
 
         """
-        if not is_json_api_response(self.get_renderer_classes()):
+        if not self.renders_json_api:
             return super().get_query_parameters()
 
-        success_response_serializers = [
-            serializer for status_code, serializer in self.get_response_serializers().items()
-            if (
-                is_success(int(status_code)) and
-                isinstance(serializer, serializers.BaseSerializer) and
-                hasattr(serializer, 'included_serializers')
-            )
-        ]
-
-        if not success_response_serializers:
-            response_serializer = self.get_default_response_serializer()
-        else:
-            response_serializer = success_response_serializers[0]
-            if len(success_response_serializers) > 1:  # pragma: no cover
-                logger.warning(
-                    'More than one response serializer for view {view_name} method {method} '
-                    'provides included serializers, falling back to first one'.format(
-                        view_name=self.view.__class__.__name__, method=self.method
-                    )
-                )
-
-        return super().get_query_parameters() + self.get_query_parameters_included(response_serializer)
+        response_serializer = self.get_include_source_serializer()
+        return (
+            super().get_query_parameters() +
+            self.get_query_parameters_included(response_serializer) +
+            self.get_query_parameters_sparse_fieldsets(response_serializer)
+        )
 
     def get_query_parameters_included(self, serializer):
         parameters = []
 
         if hasattr(serializer, 'included_serializers'):
-            paths, serializers = self._get_included_paths_and_serializers(serializer)
+            closure_id, paths, serializers = self.get_include_closure(serializer)
             parameters.append(openapi.Parameter(
                 type=openapi.TYPE_STRING,
                 in_=openapi.IN_QUERY,
@@ -196,12 +416,47 @@ class SwaggerAutoSchema(inspectors.SwaggerAutoSchema):
 
         return parameters
 
+    def get_query_parameters_sparse_fieldsets(self, serializer):
+        serializer = getattr(serializer, 'child', serializer)
+        if not self.sparse_fieldsets_parameters or not isinstance(serializer, SparseFieldsetsMixin):
+            return []
+
+        included_serializers = []
+        if hasattr(serializer, 'included_serializers'):
+            closure_id, paths, included_serializers = self.get_include_closure(serializer)
+
+        resource_types = OrderedDict()
+        for serializer_class in [serializer.__class__] + list(included_serializers):
+            if not issubclass(serializer_class, SparseFieldsetsMixin):
+                continue
+            try:
+                resource_types.setdefault(get_serializer_resource_type(serializer_class), serializer_class)
+            except AttributeError:
+                continue
+
+        parameters = []
+        # Main resource first, included ones by type
+        for resource_type in list(resource_types)[:1] + sorted(list(resource_types)[1:]):
+            field_map = get_serializer_field_map(resource_types[resource_type])
+            parameters.append(openapi.Parameter(
+                type=openapi.TYPE_STRING,
+                in_=openapi.IN_QUERY,
+                name='fields[{resource_type}]'.format(resource_type=resource_type),
+                description='Sparse fieldset of {resource_type}. Available fields: {fields}'.format(
+                    resource_type=resource_type, fields=', '.join(itertools.chain(*field_map.values()))
+                ),
+                format='comma-separated-array'
+            ))
+
+        return parameters
+
     MAX_INCLUDED_PATH_DEPTH = 20
 
     def _get_included_paths_and_serializers(self, field):
         field_cls = field if isinstance(field, type) else field.__class__
         all_included_paths = []
-        all_included_serializers = set()
+        # Ordered by discovery, sets of classes are ordered by their ids, which differ between processes
+        all_included_serializers = OrderedDict()
         serializers_to_visit = [([], [], field_cls)]
         while serializers_to_visit:
             path, parent_serializers, serializer = serializers_to_visit.pop()
@@ -225,14 +480,16 @@ class SwaggerAutoSchema(inspectors.SwaggerAutoSchema):
                 all_included_paths.append(".".join(path))
             included_serializers = get_included_serializers(serializer)
             for name, sub_serializer in included_serializers.items():
-                all_included_serializers.add(sub_serializer)
+                all_included_serializers[sub_serializer] = None
                 serializers_to_visit.append((
                     path + [self._format_key(name)],
                     parent_serializers + [serializer],
                     sub_serializer
                 ))
 
-        return all_included_paths, all_included_serializers
+        if self.canonical_ordering:
+            all_included_paths.sort()
+        return all_included_paths, list(all_included_serializers)
 
     def _format_key(self, s):
         return format_value(s, json_api_settings.FORMAT_FIELD_NAMES)
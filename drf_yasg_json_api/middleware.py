@@ -0,0 +1,258 @@
+import json
+import logging
+import queue
+import random
+import threading
+
+from collections import Counter
+from collections import OrderedDict
+
+from django.http import JsonResponse
+
+from drf_yasg_json_api.validation import RequestValidators
+from drf_yasg_json_api.validation import ResponseValidators
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'ConformanceStats',
+    'RequestValidationMiddleware',
+    'ResponseConformanceMiddleware',
+    'conformance_stats',
+]
+
+
+class SchemaDocumentMixin:
+    """Generate schema document once, on first request, using `generator_class` (drf-yasg generator by default)."""
+    generator_class = None
+    #: `drf_yasg.openapi.Info` of generated document, irrelevant for validation
+    info = None
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._lock = threading.Lock()
+
+    def get_document(self):
+        from drf_yasg import openapi
+        from drf_yasg.generators import OpenAPISchemaGenerator
+
+        generator_class = self.generator_class or OpenAPISchemaGenerator
+        info = self.info or openapi.Info(title='', default_version='')
+        return generator_class(info=info).get_schema(request=None, public=True)
+
+
+class RequestValidationMiddleware(SchemaDocumentMixin):
+    """
+    Validate JSON API request payloads against request schemas of generated document before they reach views,
+    see :class:`drf_yasg_json_api.validation.RequestValidators`.
+
+    Invalid payloads are rejected with JSON API errors response (status 400), or only logged if `reject_invalid`
+    is False.
+    """
+    reject_invalid = True
+    methods = ('POST', 'PUT', 'PATCH')
+    media_type = 'application/vnd.api+json'
+
+    _validators = None
+
+    def __call__(self, request):
+        if request.method in self.methods and request.content_type == self.media_type:
+            response = self.validate_request(request)
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    @property
+    def validators(self):
+        if self._validators is None:
+            with self._lock:
+                if self._validators is None:
+                    self._validators = RequestValidators(self.get_document())
+        return self._validators
+
+    def validate_request(self, request):
+        try:
+            payload = json.loads(request.body.decode(request.encoding or 'utf-8'))
+        except ValueError:
+            # Malformed payload is reported by parser
+            return None
+
+        errors = self.validators.validate(request.method, request.path_info, payload)
+        if not errors:
+            return None
+
+        logger.warning('Invalid payload of {method} {path}: {errors}'.format(
+            method=request.method, path=request.path_info,
+            errors='; '.join('{} {}'.format(pointer, message) for pointer, message in errors)
+        ))
+        if not self.reject_invalid:
+            return None
+        return JsonResponse(
+            {'errors': [
+                {'status': '400', 'detail': message, 'source': {'pointer': pointer}} for pointer, message in errors
+            ]},
+            status=400,
+            content_type=self.media_type,
+        )
+
+
+class ConformanceStats:
+    """
+    Counters of sampled and mismatched responses per operation (e.g. `GET /projects/{id}/ 200`).
+
+    Memory is bounded: at most `max_operations` operations are tracked, and at most `max_pointers` JSON pointers of
+    invalid values per operation; samples of other operations are only counted in `untracked`.
+    """
+
+    def __init__(self, max_operations=1000, max_pointers=20):
+        self.max_operations = max_operations
+        self.max_pointers = max_pointers
+        self._operations = OrderedDict()
+        self._lock = threading.Lock()
+        self.untracked = 0
+        self.dropped = 0
+
+    def record(self, operation, errors):
+        """Record sample of `operation`, return pointers of `errors` not recorded before for it."""
+        with self._lock:
+            stats = self._operations.get(operation)
+            if stats is None:
+                if len(self._operations) >= self.max_operations:
+                    self.untracked += 1
+                    return []
+                stats = self._operations[operation] = {'sampled': 0, 'mismatched': 0, 'pointers': Counter()}
+
+            stats['sampled'] += 1
+            if not errors:
+                return []
+            stats['mismatched'] += 1
+            new_pointers = []
+            for pointer, message in errors:
+                if pointer in stats['pointers']:
+                    stats['pointers'][pointer] += 1
+                elif len(stats['pointers']) < self.max_pointers:
+                    stats['pointers'][pointer] = 1
+                    new_pointers.append(pointer)
+            return new_pointers
+
+    def record_dropped(self):
+        with self._lock:
+            self.dropped += 1
+
+    def snapshot(self):
+        """Return copy of counters of all tracked operations."""
+        with self._lock:
+            return OrderedDict(
+                (operation, {
+                    'sampled': stats['sampled'],
+                    'mismatched': stats['mismatched'],
+                    'pointers': dict(stats['pointers']),
+                })
+                for operation, stats in self._operations.items()
+            )
+
+    def reset(self):
+        with self._lock:
+            self._operations.clear()
+            self.untracked = 0
+            self.dropped = 0
+
+
+#: Stats of :class:`ResponseConformanceMiddleware`, unless it is configured with other ones
+conformance_stats = ConformanceStats()
+
+
+class ResponseConformanceMiddleware(SchemaDocumentMixin):
+    """
+    Check sample of JSON API responses against response schemas of generated document.
+
+    Sampled responses are put on a bounded queue and validated by background worker threads, which also generate
+    the document on first sample, so request threads only pay for copying response content. Samples exceeding
+    the queue are dropped. Results are aggregated in `stats`, and first mismatch at each pointer of an operation is
+    logged.
+    """
+    #: Fraction of responses to validate
+    sample_rate = 0.01
+    max_workers = 1
+    max_queue_size = 100
+    media_type = 'application/vnd.api+json'
+    stats = conformance_stats
+
+    _validators = None
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self._queue = queue.Queue(maxsize=self.max_queue_size)
+        self._workers = []
+        self._random = random.Random()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if self.should_sample(request, response):
+            self.enqueue(request.method, request.path_info, response.status_code, response.content)
+        return response
+
+    def should_sample(self, request, response):
+        return (
+            self.sample_rate > 0 and
+            self._random.random() < self.sample_rate and
+            not getattr(response, 'streaming', False) and
+            (response.get('Content-Type') or '').split(';')[0].strip() == self.media_type
+        )
+
+    @property
+    def validators(self):
+        if self._validators is None:
+            with self._lock:
+                if self._validators is None:
+                    self._validators = ResponseValidators(self.get_document())
+        return self._validators
+
+    def enqueue(self, method, path, status_code, content):
+        self.start_workers()
+        try:
+            self._queue.put_nowait((method, path, status_code, content))
+        except queue.Full:
+            self.stats.record_dropped()
+
+    def start_workers(self):
+        if len(self._workers) >= self.max_workers:
+            return
+        with self._lock:
+            while len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self.work, name='response-conformance', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def work(self):
+        while True:
+            sample = self._queue.get()
+            try:
+                self.validate_response(*sample)
+            except Exception:
+                logger.exception('Checking conformance of response failed')
+            finally:
+                self._queue.task_done()
+
+    def join(self):
+        """Wait until all queued samples are validated."""
+        self._queue.join()
+
+    def validate_response(self, method, request_path, status_code, content):
+        path = self.validators.match_path(request_path)
+        if path is None or self.validators.get_validator(method, path, status_code) is None:
+            return
+        try:
+            payload = json.loads(content.decode('utf-8'))
+        except ValueError:
+            payload = None
+
+        errors = self.validators.validate(method, request_path, status_code, payload)
+        operation = '{} {} {}'.format(method, path, status_code)
+        new_pointers = self.stats.record(operation, errors)
+        if new_pointers:
+            logger.warning('Response of {operation} does not match schema: {errors}'.format(
+                operation=operation,
+                errors='; '.join('{} {}'.format(pointer, message)
+                                 for pointer, message in errors if pointer in new_pointers)
+            ))
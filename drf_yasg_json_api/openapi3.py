@@ -0,0 +1,438 @@
+import json
+import re
+
+from collections import OrderedDict
+
+from drf_yasg import codecs
+from drf_yasg import renderers
+
+__all__ = [
+    'OpenAPI3Converter',
+    'OpenAPI3JSONRenderer',
+    'OpenAPI3YAMLRenderer',
+    'to_openapi3',
+]
+
+DEFINITIONS_REF_PREFIX = '#/definitions/'
+COMPONENTS_REF_PREFIX = '#/components/schemas/'
+
+# Swagger 2.0 parameter keys moved to `schema` of OpenAPI 3 parameter
+_PARAMETER_SCHEMA_KEYS = (
+    'type', 'format', 'items', 'default', 'enum', 'pattern', 'minimum', 'maximum', 'exclusiveMinimum',
+    'exclusiveMaximum', 'minLength', 'maxLength', 'minItems', 'maxItems', 'uniqueItems', 'multipleOf',
+)
+_COLLECTION_FORMAT_STYLES = {
+    'csv': ('form', False),
+    'multi': ('form', True),
+    'ssv': ('spaceDelimited', False),
+    'pipes': ('pipeDelimited', False),
+}
+_OAUTH2_FLOWS = {
+    'implicit': 'implicit',
+    'password': 'password',
+    'application': 'clientCredentials',
+    'accessCode': 'authorizationCode',
+}
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+
+
+def to_openapi3(document, version='3.0.3', extract_resources=True):
+    """Convert generated Swagger 2.0 `document`, see :class:`OpenAPI3Converter`."""
+    return OpenAPI3Converter(version=version, extract_resources=extract_resources).convert(document)
+
+
+class OpenAPI3Converter:
+    """
+    Convert generated Swagger 2.0 document (`openapi.Swagger` or plain dict) into OpenAPI 3.0 or 3.1 document.
+
+    On top of plain conversion JSON API specifics are emitted the way OpenAPI 3 allows:
+     - `x-readOnly` and `x-writeOnly` become real `readOnly` and `writeOnly`, on any level
+     - `included` becomes an array of `oneOf` resources discriminated by `type`
+     - `fields[]` and `include` params become comma separated arrays (`style: form`, `explode: false`)
+     - with `extract_resources`, resource objects of requests, responses and included are moved to
+       `components/schemas`, one component per distinct resource schema, shared by all operations using it
+     - components left unreferenced by conversion (e.g. unions of included resources) are dropped
+    """
+
+    def __init__(self, version='3.0.3', extract_resources=True):
+        self.version = version
+        self.extract_resources = extract_resources
+        self.components = OrderedDict()
+        self._component_names = {}
+        self._converted = {}
+
+    @property
+    def is_31(self):
+        return self.version.startswith('3.1')
+
+    def convert(self, document):
+        if hasattr(document, 'as_odict'):
+            document = document.as_odict()
+        self.components = OrderedDict()
+        self._component_names = {}
+        self._converted = {}
+
+        for name, definition in (document.get('definitions') or {}).items():
+            self.components[name] = self.convert_schema(definition)
+
+        result = OrderedDict()
+        result['openapi'] = self.version
+        result['info'] = document.get('info')
+        result['servers'] = self.convert_servers(document)
+        result['paths'] = OrderedDict(
+            (path, self.convert_path_item(path_item, document)) for path, path_item in document.get('paths', {}).items()
+        )
+        self.prune_components(result)
+        components = OrderedDict()
+        if self.components:
+            components['schemas'] = self.components
+        if document.get('securityDefinitions'):
+            components['securitySchemes'] = OrderedDict(
+                (name, self.convert_security_scheme(scheme))
+                for name, scheme in document['securityDefinitions'].items()
+            )
+        if components:
+            result['components'] = components
+        for key in ('security', 'tags', 'externalDocs'):
+            if key in document:
+                result[key] = document[key]
+        return result
+
+    def prune_components(self, result):
+        """Drop components not referenced from `result`, directly or through other components."""
+        referenced = set()
+        visited = set()
+        pending = [result]
+        while pending:
+            value = pending.pop()
+            if id(value) in visited:
+                # Converted schemas are shared between operations
+                continue
+            visited.add(id(value))
+            if isinstance(value, dict):
+                ref = value.get('$ref')
+                if isinstance(ref, str) and ref.startswith(COMPONENTS_REF_PREFIX):
+                    name = ref[len(COMPONENTS_REF_PREFIX):]
+                    if name not in referenced and name in self.components:
+                        referenced.add(name)
+                        pending.append(self.components[name])
+                pending.extend(value.values())
+            elif isinstance(value, list):
+                pending.extend(value)
+        self.components = OrderedDict(
+            (name, schema) for name, schema in self.components.items() if name in referenced
+        )
+
+    def convert_servers(self, document):
+        base_path = document.get('basePath') or '/'
+        host = document.get('host')
+        if not host:
+            return [OrderedDict(url=base_path)]
+        return [
+            OrderedDict(url='{scheme}://{host}{base_path}'.format(scheme=scheme, host=host, base_path=base_path))
+            for scheme in document.get('schemes') or ['https']
+        ]
+
+    def convert_security_scheme(self, scheme):
+        scheme_type = scheme.get('type')
+        if scheme_type == 'basic':
+            result = OrderedDict(type='http', scheme='basic')
+        elif scheme_type == 'oauth2':
+            flow = OrderedDict(
+                (key, scheme[key]) for key in ('authorizationUrl', 'tokenUrl') if key in scheme
+            )
+            flow['scopes'] = scheme.get('scopes') or {}
+            result = OrderedDict(type='oauth2', flows={_OAUTH2_FLOWS.get(scheme.get('flow'), 'implicit'): flow})
+        else:
+            result = OrderedDict((key, value) for key, value in scheme.items() if key != 'description')
+        if 'description' in scheme:
+            result['description'] = scheme['description']
+        return result
+
+    def convert_path_item(self, path_item, document):
+        result = OrderedDict()
+        for key, value in path_item.items():
+            if key in HTTP_METHODS:
+                result[key] = self.convert_operation(value, document)
+            elif key == 'parameters':
+                if value:
+                    result[key] = [self.convert_parameter(parameter) for parameter in value]
+            else:
+                result[key] = value
+        return result
+
+    def convert_operation(self, operation, document):
+        consumes = operation.get('consumes') or document.get('consumes') or ['application/json']
+        produces = operation.get('produces') or document.get('produces') or ['application/json']
+
+        result = OrderedDict()
+        parameters = []
+        form_parameters = []
+        for key, value in operation.items():
+            if key in ('consumes', 'produces', 'schemes'):
+                continue
+            if key == 'parameters':
+                for parameter in value:
+                    if parameter.get('in') == 'body':
+                        result['requestBody'] = self.convert_body_parameter(parameter, consumes)
+                    elif parameter.get('in') == 'formData':
+                        form_parameters.append(parameter)
+                    else:
+                        parameters.append(self.convert_parameter(parameter))
+                if parameters:
+                    result['parameters'] = parameters
+                if form_parameters:
+                    result['requestBody'] = self.convert_form_parameters(form_parameters, consumes)
+            elif key == 'responses':
+                result[key] = OrderedDict(
+                    (status_code, self.convert_response(response, produces))
+                    for status_code, response in value.items()
+                )
+            else:
+                result[key] = value
+        return result
+
+    def convert_parameter(self, parameter):
+        if '$ref' in parameter:
+            return OrderedDict([('$ref', parameter['$ref'].replace('#/parameters/', '#/components/parameters/'))])
+
+        result = OrderedDict()
+        schema = OrderedDict()
+        for key, value in parameter.items():
+            if key in _PARAMETER_SCHEMA_KEYS:
+                schema[key] = value
+            elif key != 'collectionFormat':
+                result[key] = value
+
+        if schema.get('format') == 'comma-separated-array':
+            # JSON API comma separated params, e.g. `include` and `fields[]`
+            schema = OrderedDict(type='array', items=OrderedDict(type=schema.get('type', 'string')))
+            result['style'], result['explode'] = 'form', False
+        elif 'collectionFormat' in parameter and parameter['collectionFormat'] in _COLLECTION_FORMAT_STYLES:
+            result['style'], result['explode'] = _COLLECTION_FORMAT_STYLES[parameter['collectionFormat']]
+        result['schema'] = self.convert_schema(schema)
+        return result
+
+    def convert_body_parameter(self, parameter, consumes):
+        schema = self.convert_request_schema(parameter.get('schema') or {})
+        result = OrderedDict()
+        if parameter.get('description'):
+            result['description'] = parameter['description']
+        result['content'] = OrderedDict((media_type, OrderedDict(schema=schema)) for media_type in consumes)
+        if parameter.get('required'):
+            result['required'] = True
+        return result
+
+    def convert_form_parameters(self, parameters, consumes):
+        properties = OrderedDict()
+        required = []
+        for parameter in parameters:
+            schema = self.convert_parameter(parameter)['schema']
+            if parameter.get('type') == 'file':
+                schema = OrderedDict(type='string', format='binary')
+            if parameter.get('description'):
+                schema['description'] = parameter['description']
+            properties[parameter['name']] = schema
+            if parameter.get('required'):
+                required.append(parameter['name'])
+        schema = OrderedDict(type='object', properties=properties)
+        if required:
+            schema['required'] = required
+        media_types = [media_type for media_type in consumes
+                       if media_type in ('multipart/form-data', 'application/x-www-form-urlencoded')]
+        return OrderedDict(content=OrderedDict(
+            (media_type, OrderedDict(schema=schema)) for media_type in media_types or ['multipart/form-data']
+        ))
+
+    def convert_response(self, response, produces):
+        result = OrderedDict(description=response.get('description') or '')
+        if response.get('headers'):
+            result['headers'] = OrderedDict(
+                (name, self.convert_header(header)) for name, header in response['headers'].items()
+            )
+        if response.get('schema'):
+            schema = self.convert_response_schema(response['schema'])
+            result['content'] = OrderedDict((media_type, OrderedDict(schema=schema)) for media_type in produces)
+        return result
+
+    def convert_header(self, header):
+        result = OrderedDict()
+        if 'description' in header:
+            result['description'] = header['description']
+        result['schema'] = self.convert_schema(OrderedDict(
+            (key, value) for key, value in header.items() if key in _PARAMETER_SCHEMA_KEYS
+        ))
+        return result
+
+    def convert_request_schema(self, schema):
+        schema = self.convert_schema(schema)
+        if self.extract_resources:
+            schema = self.extract_data_resources(schema, 'Request')
+        return schema
+
+    def convert_response_schema(self, schema):
+        schema = self.convert_schema(schema)
+        if not self.is_document_schema(schema):
+            return schema
+
+        properties = OrderedDict(schema['properties'])
+        if 'included' in properties:
+            properties['included'] = self.convert_included_schema(properties['included'])
+        schema = OrderedDict(schema, properties=properties)
+        if self.extract_resources:
+            schema = self.extract_data_resources(schema, '')
+        return schema
+
+    def convert_included_schema(self, included):
+        if included.get('type') == 'array':
+            items = included.get('items') or {}
+            if '$ref' in items:
+                items = self.components.get(items['$ref'][len(COMPONENTS_REF_PREFIX):]) or {}
+            resources = items.get('oneOf') or items.get('x-oneOf') or [items]
+        else:
+            # Object listing included resources by type
+            resources = list((included.get('properties') or {}).values())
+
+        refs = [self.get_resource_component(resource, '') if self.extract_resources else resource
+                for resource in resources]
+        items = OrderedDict(oneOf=refs)
+        if self.extract_resources:
+            items['discriminator'] = OrderedDict(propertyName='type', mapping=OrderedDict(
+                (self.get_resource_type(resource), ref['$ref']) for resource, ref in zip(resources, refs)
+                if self.get_resource_type(resource)
+            ))
+        result = OrderedDict(type='array', items=items)
+        if included.get('description'):
+            result['description'] = included['description']
+        return result
+
+    def is_document_schema(self, schema):
+        return schema.get('type') == 'object' and isinstance(schema.get('properties'), dict)
+
+    def extract_data_resources(self, schema, variant):
+        if not self.is_document_schema(schema) or 'data' not in schema['properties']:
+            return schema
+        data = schema['properties']['data']
+        if data.get('type') == 'array' and self.is_resource_schema(data.get('items') or {}):
+            data = OrderedDict(data, items=self.get_resource_component(data['items'], variant))
+        elif self.is_resource_schema(data):
+            data = self.get_resource_component(data, variant)
+        else:
+            return schema
+        return OrderedDict(schema, properties=OrderedDict(schema['properties'], data=data))
+
+    def is_resource_schema(self, schema):
+        properties = schema.get('properties') or {}
+        return bool(self.get_resource_type(schema)) and any(
+            name in properties for name in ('attributes', 'relationships', 'id')
+        )
+
+    def get_resource_type(self, schema):
+        if '$ref' in schema:
+            schema = self.components.get(schema['$ref'][len(COMPONENTS_REF_PREFIX):]) or {}
+        return ((schema.get('properties') or {}).get('type') or {}).get('pattern')
+
+    def get_resource_component(self, schema, variant):
+        """Return reference to component of resource `schema`, identical resources share a single component."""
+        if '$ref' in schema:
+            return schema
+        content = json.dumps(schema, sort_keys=True, default=str)
+        name = self._component_names.get(content)
+        if name is None:
+            base_name = '{resource_type}{variant}Resource'.format(
+                resource_type=''.join(part.capitalize() for part in re.split(r'[^a-zA-Z0-9]+', self.get_resource_type(
+                    schema
+                )) if part),
+                variant=variant,
+            )
+            name = base_name
+            index = 1
+            while name in self.components:
+                index += 1
+                name = '{}{}'.format(base_name, index)
+            self.components[name] = schema
+            self._component_names[content] = name
+        return OrderedDict([('$ref', COMPONENTS_REF_PREFIX + name)])
+
+    def convert_schema(self, schema):
+        # Schemas shared in generated document are converted once
+        try:
+            return self._converted[id(schema)][1]
+        except KeyError:
+            pass
+
+        result = OrderedDict()
+        for key, value in schema.items():
+            if key == '$ref':
+                result[key] = value.replace(DEFINITIONS_REF_PREFIX, COMPONENTS_REF_PREFIX)
+            elif key in ('properties', 'patternProperties'):
+                result[key] = OrderedDict((name, self.convert_schema(item)) for name, item in value.items())
+            elif key in ('items', 'additionalProperties', 'not') and isinstance(value, dict):
+                result[key] = self.convert_schema(value)
+            elif key in ('allOf', 'anyOf', 'oneOf', 'x-oneOf'):
+                result[key.replace('x-', '')] = [self.convert_schema(item) for item in value]
+            elif key == 'x-readOnly':
+                result['readOnly'] = value
+            elif key == 'x-writeOnly':
+                result['writeOnly'] = value
+            elif key == 'x-nullable':
+                result['nullable'] = value
+            elif key == 'discriminator' and isinstance(value, str):
+                result[key] = OrderedDict(propertyName=value)
+            elif key == 'type' and value == 'file':
+                result[key] = 'string'
+                result['format'] = 'binary'
+            else:
+                result[key] = value
+
+        if self.is_31:
+            # Swagger 2.0 boolean `exclusiveMinimum`/`exclusiveMaximum` are numbers since JSON Schema draft 6
+            for exclusive_key, limit_key in (('exclusiveMinimum', 'minimum'), ('exclusiveMaximum', 'maximum')):
+                if isinstance(result.get(exclusive_key), bool):
+                    if result.pop(exclusive_key) and limit_key in result:
+                        result[exclusive_key] = result.pop(limit_key)
+        if self.is_31 and result.pop('nullable', False):
+            if 'type' in result:
+                result['type'] = [result['type'], 'null']
+            elif '$ref' in result:
+                result = OrderedDict(oneOf=[OrderedDict([('$ref', result['$ref'])]), OrderedDict(type='null')])
+        # Siblings of `$ref` are ignored by OpenAPI 3.0
+        if '$ref' in result and len(result) > 1 and not self.is_31:
+            ref = OrderedDict([('$ref', result.pop('$ref'))])
+            result = OrderedDict(allOf=[ref], **result)
+
+        self._converted[id(schema)] = (schema, result)
+        return result
+
+
+class _OpenAPI3CodecMixin:
+    version = '3.0.3'
+
+    def __init__(self, validators, *args, **kwargs):
+        # Validators of drf-yasg validate Swagger 2.0 documents only
+        super().__init__([], *args, **kwargs)
+
+    def generate_swagger_object(self, swagger):
+        return to_openapi3(swagger, version=self.version)
+
+
+class OpenAPI3CodecJson(_OpenAPI3CodecMixin, codecs.OpenAPICodecJson):
+    pass
+
+
+class OpenAPI3CodecYaml(_OpenAPI3CodecMixin, codecs.OpenAPICodecYaml):
+    pass
+
+
+class OpenAPI3JSONRenderer(renderers.OpenAPIRenderer):
+    """Render generated schema as OpenAPI 3 JSON document, use with `drf_yasg.views.get_schema_view`."""
+    media_type = 'application/vnd.oai.openapi+json'
+    format = 'openapi3'
+    codec_class = OpenAPI3CodecJson
+
+
+class OpenAPI3YAMLRenderer(renderers.SwaggerYAMLRenderer):
+    """Render generated schema as OpenAPI 3 YAML document, use with `drf_yasg.views.get_schema_view`."""
+    media_type = 'application/vnd.oai.openapi'
+    format = 'openapi3.yaml'
+    codec_class = OpenAPI3CodecYaml
@@ -0,0 +1,155 @@
+import functools
+import json
+import logging
+import threading
+import time
+
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'OperationProfile',
+    'SchemaProfiler',
+]
+
+
+class OperationProfile:
+    """
+    Generation time of profiled hooks, size and number of included resources of a single operation.
+
+    Timings are exclusive: time of hooks called from other profiled hooks (e.g. `get_included_schema_for_response`
+    from `get_default_responses`) is counted only for the inner one, so they add up to at most `total_time`.
+    """
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.timings = OrderedDict()
+        self.total_time = 0.0
+        self.size = 0
+        self.included_count = 0
+        # Time spent in nested hooks of every hook being measured
+        self._nested_times = []
+
+    def measure(self, hook_name):
+        return _Measure(self, hook_name)
+
+    def add_time(self, hook_name, seconds):
+        # Hooks can be called more than once per operation (e.g. included schema for every response)
+        self.timings[hook_name] = self.timings.get(hook_name, 0.0) + seconds
+
+    def add_included_count(self, count):
+        # Included schema is built for every success response, report the largest one
+        self.included_count = max(self.included_count, count)
+
+    def __repr__(self):
+        return '<OperationProfile {method} {path} {total_time:.4f}s {size}B>'.format(
+            method=self.method, path=self.path, total_time=self.total_time, size=self.size
+        )
+
+
+class _Measure:
+    def __init__(self, profile, hook_name):
+        self.profile = profile
+        self.hook_name = hook_name
+
+    def __enter__(self):
+        self.profile._nested_times.append(0.0)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = time.perf_counter() - self.start
+        nested_times = self.profile._nested_times
+        self.profile.add_time(self.hook_name, elapsed - nested_times.pop())
+        if nested_times:
+            nested_times[-1] += elapsed
+
+
+class SchemaProfiler:
+    """
+    Collect :class:`OperationProfile` of every operation generated by :class:`SwaggerAutoSchema` with this profiler
+    set as its `profiler` attribute.
+
+    Operation exceeding any of the budgets (total generation time in seconds, size of serialized operation in bytes,
+    number of included resources) is reported with a warning.
+    """
+
+    def __init__(self, time_budget=None, size_budget=None, included_budget=None):
+        self.time_budget = time_budget
+        self.size_budget = size_budget
+        self.included_budget = included_budget
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    @property
+    def profiles(self):
+        return list(self._profiles)
+
+    def reset(self):
+        with self._lock:
+            self._profiles = []
+
+    def start_operation(self, method, path):
+        return OperationProfile(method, path)
+
+    def finish_operation(self, profile, operation, total_time):
+        profile.total_time = total_time
+        profile.size = len(json.dumps(operation, separators=(',', ':'), default=str)) if operation else 0
+        with self._lock:
+            self._profiles.append(profile)
+
+        for exceeded_budget in self.get_exceeded_budgets(profile):
+            logger.warning('{method} {path} exceeds {budget}'.format(
+                method=profile.method, path=profile.path, budget=exceeded_budget
+            ))
+
+    def get_exceeded_budgets(self, profile):
+        exceeded = []
+        if self.time_budget is not None and profile.total_time > self.time_budget:
+            exceeded.append('time budget: {value:.4f}s > {budget}s'.format(
+                value=profile.total_time, budget=self.time_budget
+            ))
+        if self.size_budget is not None and profile.size > self.size_budget:
+            exceeded.append('size budget: {value}B > {budget}B'.format(value=profile.size, budget=self.size_budget))
+        if self.included_budget is not None and profile.included_count > self.included_budget:
+            exceeded.append('included resources budget: {value} > {budget}'.format(
+                value=profile.included_count, budget=self.included_budget
+            ))
+        return exceeded
+
+    def get_report(self, sort_by='total_time'):
+        """Return profiles sorted by `sort_by` attribute (`total_time`, `size` or `included_count`), worst first."""
+        return sorted(self.profiles, key=lambda profile: getattr(profile, sort_by), reverse=True)
+
+    def format_report(self, sort_by='total_time', limit=None):
+        hook_names = []
+        for profile in self.profiles:
+            for name in profile.timings:
+                if name not in hook_names:
+                    hook_names.append(name)
+
+        lines = ['\t'.join(['method', 'path', 'total [ms]'] + ['{} [ms]'.format(name) for name in hook_names] +
+                           ['size [B]', 'included'])]
+        for profile in self.get_report(sort_by)[:limit]:
+            lines.append('\t'.join(
+                [profile.method, profile.path, '{:.2f}'.format(profile.total_time * 1000)] +
+                ['{:.2f}'.format(profile.timings.get(name, 0.0) * 1000) for name in hook_names] +
+                [str(profile.size), str(profile.included_count)]
+            ))
+        return '\n'.join(lines)
+
+
+def profiled(method):
+    """Record time spent in decorated :class:`SwaggerAutoSchema` hook if operation is being profiled."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profile = getattr(self, '_operation_profile', None)
+        if profile is None:
+            return method(self, *args, **kwargs)
+        with profile.measure(method.__name__):
+            return method(self, *args, **kwargs)
+
+    return wrapper
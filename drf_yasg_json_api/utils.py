@@ -1,12 +1,36 @@
 import copy
+import datetime
+import decimal
+import enum
+import functools
+import inspect
 import itertools
+import logging
+import re
+import threading
+import uuid
+import weakref
 
+from collections import OrderedDict
 from typing import Optional
 
+from django.apps import apps
+from django.core.signals import setting_changed
 from django.db import models
+from django.dispatch import receiver
+from django.utils.functional import Promise
 from django.utils.module_loading import import_string
 from drf_yasg.inspectors.field import get_parent_serializer
+from rest_framework import relations
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+from rest_framework_json_api.settings import json_api_settings
+from rest_framework_json_api.utils import format_value
+from rest_framework_json_api.utils import get_resource_type_from_model
+from rest_framework_json_api.utils import get_resource_type_from_serializer
+from rest_framework_json_api.utils import get_serializer_fields
+
+logger = logging.getLogger(__name__)
 
 
 def is_json_api(view):
@@ -88,6 +112,19 @@ def is_many_related_field(field):
     return getattr(field, 'child_relation', None)
 
 
+@functools.lru_cache(maxsize=None)
+def get_field_kind(field_class):
+    """
+    Return where field of `field_class` goes in JSON API resource: `attributes`, `relationships` or nowhere (None).
+    Depends only on the class so it is decided once per field class.
+    """
+    if issubclass(field_class, (relations.RelatedField, relations.ManyRelatedField, serializers.Serializer)):
+        return 'relationships'
+    if issubclass(field_class, serializers.BaseSerializer):
+        return None
+    return 'attributes'
+
+
 def get_field_source(field: serializers.Field):
     source = field.source or field.field_name
     # If no source and parent is not serializer it is child_field of other field
@@ -113,3 +150,353 @@ def get_included_serializers(serializer):
                 included_serializers[name] = import_string(value)
 
     return included_serializers
+
+
+def get_library_version():
+    try:
+        from importlib import metadata
+    except ImportError:  # pragma: no cover
+        # Python < 3.8
+        import pkg_resources
+        try:
+            return pkg_resources.get_distribution('drf-yasg-json-api').version
+        except pkg_resources.DistributionNotFound:
+            return 'unknown'
+
+    try:
+        return metadata.version('drf-yasg-json-api')
+    except metadata.PackageNotFoundError:  # pragma: no cover
+        return 'unknown'
+
+
+#: Types of values whose `repr` is stable across processes and never does I/O
+_plain_value_types = (bytes, complex, decimal.Decimal, datetime.date, datetime.time, datetime.timedelta, enum.Enum,
+                      uuid.UUID, type(re.compile('')))
+
+
+def get_fingerprint_value(value, _seen=frozenset()):
+    """
+    Convert value into structure of builtins that is stable across processes and describes the value well enough
+    to tell whether schema generated from it may differ.
+
+    Objects without special case are described by their class and public attributes, `repr` of them is never called,
+    since it may do I/O (e.g. `repr` of `UniqueValidator` evaluates its queryset).
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Promise):
+        return str(value)
+    if isinstance(value, type):
+        return '{module}.{name}'.format(module=value.__module__, name=value.__qualname__)
+    if isinstance(value, _plain_value_types):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return [get_fingerprint_value(item, _seen) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((get_fingerprint_value(item, _seen) for item in value), key=repr)
+    if isinstance(value, dict):
+        return sorted(((str(key), get_fingerprint_value(val, _seen)) for key, val in value.items()), key=repr)
+    if isinstance(value, (models.QuerySet, models.Manager)):
+        return 'queryset:{label}'.format(label=value.model._meta.label)
+    if isinstance(value, serializers.BaseSerializer):
+        return get_fingerprint_value(value.__class__)
+    if isinstance(value, serializers.Field):
+        return get_field_fingerprint(value)
+    if inspect.isroutine(value):
+        return '{module}.{name}'.format(module=getattr(value, '__module__', ''),
+                                        name=getattr(value, '__qualname__', value.__class__.__qualname__))
+    if hasattr(value, 'deconstruct'):
+        return get_fingerprint_value(value.deconstruct(), _seen)
+
+    attributes = getattr(value, '__dict__', None)
+    if attributes is None or id(value) in _seen:
+        return get_fingerprint_value(value.__class__)
+    _seen = _seen | {id(value)}
+    return [get_fingerprint_value(value.__class__), sorted(
+        ((name, get_fingerprint_value(attribute, _seen)) for name, attribute in attributes.items()
+         if not name.startswith('_')),
+        key=repr
+    )]
+
+
+def get_switches(inspector):
+    """
+    Return `(name, value)` of public switches (plain bool, number or string class attributes, e.g. `canonical_ordering`)
+    of inspector class or instance, with values overridden by instance.
+    """
+    inspector_class = inspector if isinstance(inspector, type) else inspector.__class__
+    switches = []
+    for name in sorted(dir(inspector_class)):
+        value = inspect.getattr_static(inspector_class, name)
+        if name.startswith('_') or not isinstance(value, (bool, int, float, str)):
+            continue
+        switches.append((name, getattr(inspector, name)))
+    return switches
+
+
+def get_field_fingerprint(field: serializers.Field):
+    return [
+        get_fingerprint_value(field.__class__),
+        field.field_name,
+        field.source,
+        get_fingerprint_value(getattr(field, '_kwargs', {})),
+    ]
+
+
+def get_model_fingerprint(model):
+    if model is None:
+        return None
+    return [
+        model._meta.label,
+        [
+            (f.name, get_fingerprint_value(f.__class__), getattr(f, 'primary_key', False),
+             f.related_model._meta.label if getattr(f, 'related_model', None) else None)
+            for f in model._meta.get_fields()
+        ]
+    ]
+
+
+def get_serializer_fingerprint(serializer):
+    serializer_meta = getattr(serializer, 'Meta', None)
+    return [
+        get_fingerprint_value(serializer.__class__),
+        get_fingerprint_value({k: v for k, v in vars(serializer_meta).items() if not k.startswith('_')}
+                              if serializer_meta else None),
+        get_fingerprint_value(getattr(serializer, 'included_serializers', None)),
+        get_model_fingerprint(getattr(serializer_meta, 'model', None)),
+        [(name, get_field_fingerprint(field)) for name, field in serializer.fields.items()],
+    ]
+
+
+# Process-wide caches below are read without locking and filled under this lock, so that concurrent generations
+# (e.g. threads of the same server process) never see partially filled entries. Values put in them are never
+# modified afterwards, mutable ones are copied by their users.
+_cache_lock = threading.RLock()
+
+_generation_caches = weakref.WeakKeyDictionary()
+
+
+def get_generation_cache(components):
+    """
+    Return dict living as long as a single schema generation, which is identified by its components resolver shared by
+    all inspectors taking part in it.
+
+    A generation runs in a single thread, so its cache can be filled and its schemas modified without locking.
+    """
+    try:
+        return _generation_caches[components]
+    except KeyError:
+        with _cache_lock:
+            return _generation_caches.setdefault(components, {})
+
+
+_serializer_field_maps = weakref.WeakKeyDictionary()
+
+
+def get_serializer_field_map(serializer_class):
+    """
+    Return names of `attributes` and `relationships` of resource rendered by `serializer_class`, as accepted by
+    sparse fieldsets, computed once per serializer class.
+    """
+    try:
+        return _serializer_field_maps[serializer_class]
+    except KeyError:
+        pass
+
+    field_map = OrderedDict((('attributes', []), ('relationships', [])))
+    for field_name, field in get_serializer_fields(serializer_class()).items():
+        # Id is always rendered and self link is kept by sparse fieldsets
+        if field_name in ('id', api_settings.URL_FIELD_NAME):
+            continue
+        kind = get_field_kind(field.__class__)
+        if kind is not None:
+            field_map[kind].append(field_name)
+    with _cache_lock:
+        return _serializer_field_maps.setdefault(serializer_class, field_map)
+
+
+_formatted_field_names = weakref.WeakKeyDictionary()
+
+
+def get_formatted_field_names(serializer_class, field_names):
+    """
+    Return map of `field_names` of `serializer_class` to names formatted according to ``JSON_API_FORMAT_FIELD_NAMES``
+    setting, computed once per serializer class, its field names and the setting.
+    """
+    format_type = json_api_settings.FORMAT_FIELD_NAMES
+    key = (tuple(field_names), format_type)
+    names = _formatted_field_names.get(serializer_class, {}).get(key)
+    if names is not None:
+        return names
+
+    names = OrderedDict((field_name, format_value(field_name, format_type)) for field_name in key[0])
+    with _cache_lock:
+        return _formatted_field_names.setdefault(serializer_class, {}).setdefault(key, names)
+
+
+class ResourceTypeRegistry:
+    """
+    Resource types of models and serializer classes, so that formatting and pluralization of types is not repeated for
+    every root, included and related resource.
+
+    Types of all installed models are resolved at once on first use, types of serializers as they are registered,
+    e.g. all serializers of include closure at once. Registry is cleared when ``JSON_API_*`` settings change.
+    """
+
+    def __init__(self):
+        self._model_types = {}
+        self._serializer_types = weakref.WeakKeyDictionary()
+        self._lock = _cache_lock
+
+    def get_model_type(self, model):
+        try:
+            return self._model_types[model]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if not self._model_types:
+                self._model_types.update({model: get_resource_type_from_model(model) for model in apps.get_models()})
+                collisions = self.get_collisions()
+                if collisions:
+                    logger.debug('Resource types shared by models: {collisions}'.format(collisions=collisions))
+            if model not in self._model_types:
+                # Model not registered (yet) in apps
+                self._model_types[model] = get_resource_type_from_model(model)
+            return self._model_types[model]
+
+    def get_serializer_type(self, serializer):
+        """
+        Return resource type of `serializer` (class or instance), raise `AttributeError` if it cannot be determined.
+        """
+        serializer_class = serializer if isinstance(serializer, type) else serializer.__class__
+        try:
+            return self._serializer_types[serializer_class]
+        except KeyError:
+            pass
+
+        resource_type = self.resolve_serializer_type(serializer_class)
+        with self._lock:
+            return self._serializer_types.setdefault(serializer_class, resource_type)
+
+    def resolve_serializer_type(self, serializer_class):
+        meta = getattr(serializer_class, 'Meta', None)
+        if (
+            hasattr(meta, 'model') and
+            not hasattr(meta, 'resource_name') and
+            not hasattr(getattr(serializer_class, 'JSONAPIMeta', None), 'resource_name')
+        ):
+            return self.get_model_type(meta.model)
+        return get_resource_type_from_serializer(serializer_class)
+
+    def register_serializers(self, serializer_classes):
+        """Resolve types of all `serializer_classes` at once, skip ones without type."""
+        resource_types = {}
+        for serializer_class in serializer_classes:
+            if serializer_class in self._serializer_types:
+                continue
+            try:
+                resource_types[serializer_class] = self.resolve_serializer_type(serializer_class)
+            except AttributeError:
+                continue
+        with self._lock:
+            for serializer_class, resource_type in resource_types.items():
+                self._serializer_types.setdefault(serializer_class, resource_type)
+
+    def get_collisions(self):
+        """
+        Return map of resource types shared by more than one model (e.g. models of the same name in different apps)
+        to models and serializers rendering them, serializers without model or with type other than type of their
+        model included. Only models and serializers known to registry are considered.
+        """
+        with self._lock:
+            model_types = list(self._model_types.items())
+            serializer_types = list(self._serializer_types.items())
+
+        owners = OrderedDict()
+        for model, resource_type in model_types:
+            owners.setdefault(resource_type, OrderedDict())[model] = model._meta.label
+        for serializer_class, resource_type in serializer_types:
+            model = getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+            owner = model if model is not None else serializer_class
+            owners.setdefault(resource_type, OrderedDict()).setdefault(owner, '{module}.{name}'.format(
+                module=serializer_class.__module__, name=serializer_class.__qualname__
+            ))
+        return OrderedDict(
+            (resource_type, list(names.values()))
+            for resource_type, names in sorted(owners.items()) if len(names) > 1
+        )
+
+    def clear(self):
+        with self._lock:
+            self._model_types.clear()
+            self._serializer_types.clear()
+
+
+resource_type_registry = ResourceTypeRegistry()
+_related_resource_types = weakref.WeakKeyDictionary()
+
+
+def get_model_resource_type(model):
+    """Resource type of model, see :class:`ResourceTypeRegistry`."""
+    return resource_type_registry.get_model_type(model)
+
+
+def get_serializer_resource_type(serializer):
+    """Resource type of serializer (class or instance), see :class:`ResourceTypeRegistry`."""
+    return resource_type_registry.get_serializer_type(serializer)
+
+
+def get_related_resource_type(parent_serializer_class, field_name, field_class, resolve):
+    """
+    Return resource type of related field `field_name` of `field_class` declared in `parent_serializer_class`,
+    resolved using `resolve` callable only the first time.
+    """
+    resource_types = _related_resource_types.get(parent_serializer_class)
+    key = (field_name, field_class)
+    if resource_types is not None and key in resource_types:
+        return resource_types[key]
+
+    resource_type = resolve()
+    with _cache_lock:
+        return _related_resource_types.setdefault(parent_serializer_class, {}).setdefault(key, resource_type)
+
+
+_filter_parameters = {}
+
+
+def get_filter_parameters(key, build):
+    """Return filter params cached under `key`, built using `build` callable only the first time."""
+    parameters = _filter_parameters.get(key)
+    if parameters is not None:
+        return parameters
+
+    parameters = build()
+    with _cache_lock:
+        return _filter_parameters.setdefault(key, parameters)
+
+
+def clear_filter_parameters():
+    with _cache_lock:
+        _filter_parameters.clear()
+
+
+@receiver(setting_changed)
+def clear_resource_types(setting, **kwargs):
+    # Filter params depend on settings of django-filter and REST framework
+    clear_filter_parameters()
+    # Resource types depend on JSON_API_FORMAT_TYPES, JSON_API_PLURALIZE_TYPES and their older aliases
+    if setting.startswith('JSON_API_'):
+        with _cache_lock:
+            resource_type_registry.clear()
+            _related_resource_types.clear()
+
+
+def clear_serializer_caches():
+    """
+    Clear cached field maps and formatted field names of serializer classes, e.g. after their fields were changed
+    at runtime.
+    """
+    with _cache_lock:
+        _serializer_field_maps.clear()
+        _formatted_field_names.clear()
@@ -0,0 +1,269 @@
+import abc
+import re
+import threading
+
+from collections import OrderedDict
+
+__all__ = [
+    'RequestValidators',
+    'ResponseValidators',
+    'compile_validator',
+]
+
+_python_types = {
+    'object': (dict,),
+    'array': (list,),
+    'string': (str,),
+    'integer': (int,),
+    'number': (int, float),
+    'boolean': (bool,),
+}
+
+
+def compile_validator(schema, definitions=None, partial=False):
+    """
+    Compile request `schema` (`openapi.Schema` or plain dict) into a function validating payloads against it.
+
+    Returned function takes parsed payload and returns list of `(pointer, message)` errors, where pointer is JSON
+    pointer of invalid value, e.g. `/data/attributes/name`. Only checks that matter for JSON API payloads are
+    compiled: types, `required`, `properties`, `items`, `enum`, `pattern` and `x-nullable`.
+
+    With `partial` (e.g. for PATCH) only `type` and `id` are required below top level members of payload.
+    """
+    return _Compiler(definitions or {}).compile_payload(schema, partial)
+
+
+class _Compiler:
+
+    def __init__(self, definitions):
+        self.definitions = definitions
+        # Schemas are shared between operations and variants, compile each of them once
+        self.compiled = {}
+
+    def resolve(self, schema):
+        while isinstance(schema, dict) and '$ref' in schema:
+            schema = self.definitions[schema['$ref'].split('/')[-1]]
+        return schema
+
+    def compile_payload(self, schema, partial=False):
+        validate = self.compile(schema, relax_children=partial)
+
+        def validate_payload(payload):
+            errors = []
+            validate(payload, '', errors)
+            return errors
+
+        return validate_payload
+
+    def compile(self, schema, relax_required=False, relax_children=False, exact_pattern=False):
+        """
+        Compile `schema`, with `relax_required` only `type` and `id` are required in it, with `relax_children` in its
+        descendants. With `exact_pattern` its `pattern` has to match whole value instead of any part of it.
+        """
+        schema = self.resolve(schema)
+        key = (id(schema), relax_required, relax_children, exact_pattern)
+        try:
+            return self.compiled[key][1]
+        except KeyError:
+            pass
+
+        checks = []
+        nullable = schema.get('x-nullable', False)
+
+        def validate(value, pointer, errors):
+            if value is None and nullable:
+                return
+            for check in checks:
+                if not check(value, pointer, errors):
+                    return
+
+        # Registered before checks are compiled, so that recursive schemas compile into recursive validators.
+        # Keep schema alive, so that its id is not reused by other object
+        self.compiled[key] = (schema, validate)
+        checks.extend(self.compile_checks(schema, relax_required, relax_children, exact_pattern))
+        return validate
+
+    def compile_checks(self, schema, relax_required=False, relax_children=False, exact_pattern=False):
+        relax_children = relax_required or relax_children
+        checks = []
+        schema_type = schema.get('type')
+        if schema_type in _python_types:
+            checks.append(self.compile_type(schema_type))
+        if 'enum' in schema:
+            checks.append(self.compile_enum(schema['enum']))
+        if 'pattern' in schema and schema_type == 'string':
+            checks.append(self.compile_pattern(schema['pattern'], exact_pattern))
+        if schema_type == 'object':
+            checks.append(self.compile_object(schema, relax_required, relax_children))
+        if schema_type == 'array' and schema.get('items'):
+            checks.append(self.compile_array(schema['items'], relax_children))
+        return checks
+
+    def compile_type(self, schema_type):
+        python_types = _python_types[schema_type]
+        # bool is subclass of int, but JSON booleans are not numbers
+        reject_bool = schema_type in ('integer', 'number')
+
+        def check_type(value, pointer, errors):
+            if not isinstance(value, python_types) or (reject_bool and isinstance(value, bool)):
+                errors.append((pointer or '/', 'expected {}'.format(schema_type)))
+                return False
+            return True
+
+        return check_type
+
+    def compile_enum(self, enum):
+        values = list(enum)
+
+        def check_enum(value, pointer, errors):
+            if value not in values:
+                errors.append((pointer or '/', 'expected one of: {}'.format(', '.join(map(str, values)))))
+                return False
+            return True
+
+        return check_enum
+
+    def compile_pattern(self, pattern, exact=False):
+        # JSON Schema patterns match any part of value, resource types are matched exactly
+        regex = re.compile(pattern)
+        match = regex.fullmatch if exact else regex.search
+
+        def check_pattern(value, pointer, errors):
+            if not match(value):
+                errors.append((pointer or '/', 'does not match {}'.format(pattern)))
+                return False
+            return True
+
+        return check_pattern
+
+    def compile_object(self, schema, relax_required=False, relax_children=False):
+        required = [name for name in schema.get('required') or [] if not relax_required or name in ('type', 'id')]
+        schema_properties = schema.get('properties') or {}
+        # Patterns of `type` of resource objects and resource identifiers are resource types
+        is_resource = 'type' in schema_properties and \
+            any(name in schema_properties for name in ('id', 'attributes', 'relationships'))
+        properties = [
+            (name, self.compile(property_schema, relax_children, relax_children, is_resource and name == 'type'))
+            for name, property_schema in schema_properties.items()
+        ]
+
+        def check_object(value, pointer, errors):
+            for name in required:
+                if name not in value:
+                    errors.append(('{}/{}'.format(pointer, name), 'required'))
+            for name, validate in properties:
+                if name in value:
+                    validate(value[name], '{}/{}'.format(pointer, name), errors)
+            return True
+
+        return check_object
+
+    def compile_array(self, items, relax_required=False):
+        validate_item = self.compile(items, relax_required, relax_required)
+
+        def check_array(value, pointer, errors):
+            for index, item in enumerate(value):
+                validate_item(item, '{}/{}'.format(pointer, index), errors)
+            return True
+
+        return check_array
+
+
+class _OperationValidators(abc.ABC):
+    """Validators of operations of generated schema `document`, compiled on first use and cached."""
+
+    def __init__(self, document):
+        self.document = document
+        self.base_path = (document.get('basePath') or '/').rstrip('/')
+        self._compiler = _Compiler(document.get('definitions') or {})
+        self._validators = {}
+        self._lock = threading.Lock()
+        self._path_patterns = [
+            (re.compile('^{}$'.format(re.sub(r'\\{[^/]+?\\}', '[^/]+', re.escape(path)))), path)
+            for path in document.get('paths', {})
+        ]
+
+    def match_path(self, request_path):
+        """Return path of document matching `request_path` or None."""
+        if self.base_path:
+            if not request_path.startswith(self.base_path):
+                return None
+            request_path = request_path[len(self.base_path):]
+        for pattern, path in self._path_patterns:
+            if pattern.match(request_path):
+                return path
+        return None
+
+    def get_operation(self, method, path):
+        return self.document.get('paths', {}).get(path, OrderedDict()).get(method.lower())
+
+    def get_cached_validator(self, key):
+        try:
+            return self._validators[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._validators:
+                self._validators[key] = self.compile_operation(*key)
+        return self._validators[key]
+
+    @abc.abstractmethod
+    def compile_operation(self, method, path, *args):
+        """Compile validator of operation identified by cache key, return None if there is nothing to validate."""
+
+
+class RequestValidators(_OperationValidators):
+    """
+    Request payload validators of all operations of generated schema `document`, compiled on first use and cached.
+    """
+
+    def get_validator(self, method, path):
+        """Return validator of request payload of operation or None if operation does not accept body."""
+        return self.get_cached_validator((method.lower(), path))
+
+    def compile_operation(self, method, path):
+        operation = self.get_operation(method, path)
+        if operation is None:
+            return None
+        for parameter in operation.get('parameters') or []:
+            parameter = self._compiler.resolve(parameter)
+            if parameter.get('in') == 'body' and parameter.get('schema'):
+                # Partial updates send only changed attributes and relationships
+                return self._compiler.compile_payload(parameter['schema'], partial=method == 'patch')
+        return None
+
+    def validate(self, method, request_path, payload):
+        """Return errors of `payload` sent to `request_path`, empty list if it is valid or cannot be validated."""
+        path = self.match_path(request_path)
+        validator = self.get_validator(method, path) if path is not None else None
+        if validator is None:
+            return []
+        return validator(payload)
+
+
+class ResponseValidators(_OperationValidators):
+    """
+    Response payload validators of all operations of generated schema `document` by status code, compiled on first
+    use and cached.
+    """
+
+    def get_validator(self, method, path, status_code):
+        """Return validator of response payload of operation or None if response of status has no schema."""
+        return self.get_cached_validator((method.lower(), path, str(status_code)))
+
+    def compile_operation(self, method, path, status_code):
+        operation = self.get_operation(method, path)
+        if operation is None:
+            return None
+        response = self._compiler.resolve((operation.get('responses') or {}).get(status_code) or {})
+        if not response.get('schema'):
+            return None
+        return self._compiler.compile_payload(response['schema'])
+
+    def validate(self, method, request_path, status_code, payload):
+        """Return errors of `payload` returned from `request_path`, empty list if it is valid or cannot be validated."""
+        path = self.match_path(request_path)
+        validator = self.get_validator(method, path, status_code) if path is not None else None
+        if validator is None:
+            return []
+        return validator(payload)
@@ -0,0 +1,162 @@
+# Generated stress API: many models with FK/M2M webs, cyclic included serializers, mixed paginators and filters
+import functools
+
+from collections import OrderedDict
+
+import drf_yasg.inspectors
+
+from django.db import models
+from rest_framework import mixins
+from rest_framework import pagination as rest_pagination
+from rest_framework import routers
+from rest_framework import viewsets
+from rest_framework.response import Response
+from rest_framework_json_api import django_filters
+from rest_framework_json_api import filters
+from rest_framework_json_api import pagination
+from rest_framework_json_api import parsers
+from rest_framework_json_api import renderers
+from rest_framework_json_api import serializers
+
+import drf_yasg_json_api.inspectors
+
+from tests import base
+from tests import compatibility
+
+MODELS_COUNT = 200
+
+
+class StressSwaggerAutoSchema(base.BasicSwaggerAutoSchema):
+    filter_inspectors = [
+        drf_yasg_json_api.inspectors.DjangoFilterInspector,
+        drf_yasg_json_api.inspectors.OrderingFilterInspector,
+        drf_yasg.inspectors.CoreAPICompatInspector,
+    ]
+    paginator_inspectors = [
+        drf_yasg_json_api.inspectors.DjangoRestResponsePagination,
+        drf_yasg.inspectors.DjangoRestResponsePagination,
+        drf_yasg.inspectors.CoreAPICompatInspector,
+    ]
+
+
+class JsonApiCursorPagination(rest_pagination.CursorPagination):
+    cursor_query_param = 'page[cursor]'
+    ordering = 'id'
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('results', data),
+            ('links', OrderedDict([('next', self.get_next_link()), ('prev', self.get_previous_link())])),
+        ]))
+
+
+_paginations = (
+    pagination.JsonApiPageNumberPagination,
+    pagination.JsonApiLimitOffsetPagination,
+    JsonApiCursorPagination,
+    None,
+)
+
+_filters = (
+    {
+        'filter_backends': (filters.QueryParameterValidationFilter, django_filters.DjangoFilterBackend),
+        'filterset_fields': {'name': ('exact', 'icontains'), 'created': ('gte', 'lte')},
+    },
+    {
+        'filter_backends': (filters.OrderingFilter,),
+        'ordering_fields': ('name', 'created', 'owner__name'),
+    },
+    {
+        'filter_backends': (filters.OrderingFilter, django_filters.DjangoFilterBackend),
+        'ordering_fields': ('name',),
+        'filterset_fields': {'owner': ('exact',)},
+    },
+    {
+        'filter_backends': (),
+    },
+)
+
+
+def _get_owner_index(index, count):
+    # Every model is owned by model of lower index, except the first one closing the cycle with the last one
+    return index // 2 if index else count - 1
+
+
+def _get_peers_index(index):
+    return (index * 7 + 3) % index if index > 1 else None
+
+
+@functools.lru_cache(maxsize=None)
+def get_stress_models(count=MODELS_COUNT):
+    """Define `count` models (once per process, models cannot be registered twice)."""
+    stress_models = []
+    for index in range(count):
+        attrs = {
+            '__module__': __name__,
+            'Meta': type('Meta', (), {'app_label': 'tests'}),
+            'name': models.CharField(max_length=100),
+            'created': models.DateTimeField(),
+            'owner': models.ForeignKey('tests.StressModel{}'.format(_get_owner_index(index, count)),
+                                       on_delete=models.DO_NOTHING, related_name='+'),
+        }
+        if _get_peers_index(index) is not None:
+            attrs['peers'] = models.ManyToManyField('tests.StressModel{}'.format(_get_peers_index(index)),
+                                                    related_name='+')
+        if index % 10 == 0:
+            attrs['parent'] = models.ForeignKey('self', null=True, on_delete=models.DO_NOTHING, related_name='+')
+        stress_models.append(type('StressModel{}'.format(index), (models.Model,), attrs))
+    return stress_models
+
+
+@functools.lru_cache(maxsize=None)
+def get_stress_serializers(count=MODELS_COUNT):
+    """
+    Define serializer of every stress model, their `included_serializers` reference serializer classes, dotted paths
+    (resolved from globals of this module) and "self", forming cycles.
+    """
+    stress_serializers = []
+    for index, model in enumerate(get_stress_models(count)):
+        fields = ['id', 'name', 'created', 'owner']
+        included_serializers = {}
+        if _get_owner_index(index, count) < index:
+            included_serializers['owner'] = stress_serializers[_get_owner_index(index, count)]
+        else:
+            included_serializers['owner'] = '{}.StressSerializer{}'.format(__name__, _get_owner_index(index, count))
+        if _get_peers_index(index) is not None:
+            fields.append('peers')
+            included_serializers['peers'] = '{}.StressSerializer{}'.format(__name__, _get_peers_index(index))
+        if index % 10 == 0:
+            fields.append('parent')
+            included_serializers['parent'] = 'self'
+
+        serializer = type('StressSerializer{}'.format(index), (serializers.ModelSerializer,), {
+            '__module__': __name__,
+            'Meta': type('Meta', (), {'model': model, 'fields': tuple(fields)}),
+            'included_serializers': included_serializers,
+        })
+        globals()[serializer.__name__] = serializer
+        stress_serializers.append(serializer)
+    return stress_serializers
+
+
+def get_stress_router(count=MODELS_COUNT, endpoints_count=None):
+    """Router of view sets of first `endpoints_count` stress models (all by default)."""
+    router = routers.DefaultRouter()
+    stress_models = get_stress_models(count)
+    stress_serializers = get_stress_serializers(count)
+    for index in range(count if endpoints_count is None else endpoints_count):
+        attrs = {
+            'queryset': stress_models[index].objects.all(),
+            'serializer_class': stress_serializers[index],
+            'renderer_classes': [renderers.JSONRenderer],
+            'parser_classes': [parsers.JSONParser],
+            'swagger_schema': StressSwaggerAutoSchema,
+            'pagination_class': _paginations[index % len(_paginations)],
+        }
+        attrs.update(_filters[index % len(_filters)])
+        view_set = type('StressViewSet{}'.format(index), (
+            mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet
+        ), attrs)
+        prefix = 'stress{}'.format(index)
+        router.register(prefix, view_set, **compatibility._basename_or_base_name(prefix))
+    return router
@@ -0,0 +1,299 @@
+import json
+import threading
+import time
+
+from collections import OrderedDict
+from unittest import mock
+
+from django.core.cache import cache
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+from rest_framework import mixins
+from rest_framework import routers
+from rest_framework import viewsets
+from rest_framework.validators import UniqueValidator
+from rest_framework_json_api import parsers
+from rest_framework_json_api import renderers
+from rest_framework_json_api import serializers
+
+import drf_yasg_json_api.inspectors
+
+from drf_yasg_json_api.cache import FragmentCache
+from drf_yasg_json_api.cache import SchemaCoalescer
+from drf_yasg_json_api.generators import CoalescingSchemaGenerator
+from drf_yasg_json_api.utils import get_fingerprint_value
+from drf_yasg_json_api.utils import get_switches
+from tests import base
+from tests import compatibility
+from tests import models as test_models
+
+
+def setup_function():
+    cache.clear()
+
+
+def test_coalescer__concurrent_requests_wait_on_single_generation():
+    coalescer = SchemaCoalescer()
+    generated = []
+    started = threading.Event()
+
+    def generate():
+        started.set()
+        time.sleep(0.2)
+        generated.append(1)
+        return {'swagger': '2.0'}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(coalescer.get_or_generate('key', generate)))
+               for _ in range(8)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(generated) == 1
+    assert results == [{'swagger': '2.0'}] * 8
+
+
+def test_coalescer__fresh_document_served_from_cache():
+    coalescer = SchemaCoalescer()
+    generate = mock.Mock(return_value={'swagger': '2.0'})
+
+    assert coalescer.get_or_generate('key', generate) == {'swagger': '2.0'}
+    assert coalescer.get_or_generate('key', generate) == {'swagger': '2.0'}
+    assert generate.call_count == 1
+
+
+def test_coalescer__stale_document_served_while_revalidating():
+    coalescer = SchemaCoalescer(fresh_timeout=0)
+    coalescer.get_or_generate('key', lambda: 'old')
+    started = threading.Event()
+    release = threading.Event()
+
+    def generate():
+        started.set()
+        release.wait()
+        return 'new'
+
+    leader_result = []
+    leader = threading.Thread(target=lambda: leader_result.append(coalescer.get_or_generate('key', generate)))
+    leader.start()
+    started.wait()
+
+    assert coalescer.get_or_generate('key', generate) == 'old'
+
+    release.set()
+    leader.join()
+    assert leader_result == ['new']
+
+
+def test_coalescer__key():
+    coalescer = SchemaCoalescer()
+    key = coalescer.make_key('fingerprint', 'v1', 'https://example.com', '/schema with space/\n' + 'x' * 300)
+
+    assert key.startswith('drf_yasg_json_api.schema:')
+    assert len(key) < 250 and ' ' not in key and '\n' not in key
+    assert key == coalescer.make_key('fingerprint', 'v1', 'https://example.com', '/schema with space/\n' + 'x' * 300)
+    assert key != coalescer.make_key('fingerprint', 'v2', 'https://example.com', '/schema with space/\n' + 'x' * 300)
+
+
+def test_coalescer__other_process_lock():
+    coalescer = SchemaCoalescer(wait_timeout=0.2, poll_interval=0.05)
+    cache.add(coalescer.make_key('key', 'lock'), True)
+
+    # No document at all, after waiting for other process the document is generated anyway
+    assert coalescer.get_or_generate('key', lambda: 'generated') == 'generated'
+    # Lock of other process is not released by this one
+    assert cache.get(coalescer.make_key('key', 'lock')) is True
+
+
+def test_coalescing_generator():
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'members')
+
+    class ProjectViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = base.BasicSwaggerAutoSchema
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+
+    generator = CoalescingSchemaGenerator(info=openapi.Info(title="", default_version="v1"), patterns=router.urls)
+
+    with mock.patch.object(CoalescingSchemaGenerator, 'get_endpoints', wraps=generator.get_endpoints) as endpoints:
+        swagger = generator.get_schema(request=None, public=True)
+        assert generator.get_schema(request=None, public=True) == swagger
+        generator.get_schema(request=None, public=False)
+
+    assert endpoints.call_count == 2
+    response_schema = swagger['paths']['/projects/{id}/']['get']['responses']['200']['schema']['properties']
+    assert response_schema['data']['properties']['type']['pattern'] == 'projects'
+
+    # Generators of other documents do not share cached ones
+    internal_router = routers.DefaultRouter()
+    internal_router.register(r'internal-projects', ProjectViewSet,
+                             **compatibility._basename_or_base_name('internal-projects'))
+    internal_generator = CoalescingSchemaGenerator(info=openapi.Info(title="", default_version="v1"),
+                                                   patterns=internal_router.urls)
+    assert list(internal_generator.get_schema(request=None, public=True)['paths']) == ['/internal-projects/{id}/']
+    titled_generator = CoalescingSchemaGenerator(info=openapi.Info(title="Internal", default_version="v1"),
+                                                 patterns=router.urls)
+    assert titled_generator.get_schema(request=None, public=True)['info']['title'] == 'Internal'
+    same_generator = CoalescingSchemaGenerator(info=openapi.Info(title="", default_version="v1"), patterns=router.urls)
+    assert same_generator.get_cache_key_parts(None, True) == generator.get_cache_key_parts(None, True)
+
+
+def test_fingerprint__no_database_access():
+    # Test is not marked with django_db, so any query fails it
+    class ProjectSerializer(serializers.ModelSerializer):
+        name = serializers.CharField(validators=[UniqueValidator(queryset=test_models.Project.objects.all())])
+
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'members')
+
+    class ProjectViewSet(mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = base.BasicSwaggerAutoSchema
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+    swagger = generator.get_schema(request=None, public=True)
+
+    assert 'name' in swagger['paths']['/projects/']['post']['parameters'][0]['schema']['properties']['data'][
+        'properties']['attributes']['properties']
+    assert 'queryset:tests.Project' in json.dumps(get_fingerprint_value(ProjectSerializer().fields['name']))
+
+
+def test_fragment_cache__roundtrip():
+    fragment_cache = FragmentCache()
+    schema = openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties=OrderedDict(
+            name=openapi.Schema(type=openapi.TYPE_STRING, read_only=True),
+            tags=openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING)),
+        ),
+        required=['name'],
+    )
+    key = fragment_cache.make_key('schema')
+
+    assert fragment_cache.set(key, schema)
+    cached_schema = fragment_cache.get(key, openapi.Schema)
+
+    assert cached_schema == schema
+    assert cached_schema is not schema
+    assert isinstance(cached_schema, openapi.Schema)
+    assert isinstance(cached_schema.properties['tags'].items_, openapi.Schema)
+    assert cached_schema.properties['name'].read_only is True
+
+
+def test_fragment_cache__skip_references():
+    fragment_cache = FragmentCache()
+    components = openapi.ReferenceResolver(openapi.SCHEMA_DEFINITIONS, force_init=True)
+    schema = openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={'member': openapi.SchemaRef(components, 'Member', ignore_unresolved=True)},
+    )
+
+    assert not fragment_cache.set(fragment_cache.make_key('schema'), schema)
+
+
+def _get_cached_fragments_router(fragment_cache):
+    class CachedJSONAPISerializerInspector(drf_yasg_json_api.inspectors.JSONAPISerializerSmartInspector):
+        pass
+
+    CachedJSONAPISerializerInspector.fragment_cache = fragment_cache
+
+    smart_inspector = drf_yasg_json_api.inspectors.JSONAPISerializerSmartInspector
+
+    class CachedSwaggerAutoSchema(base.BasicSwaggerAutoSchema):
+        field_inspectors = [
+            CachedJSONAPISerializerInspector if inspector is smart_inspector else inspector
+            for inspector in base.BasicSwaggerAutoSchema.field_inspectors
+        ]
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'members')
+
+    class ProjectViewSet(mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = CachedSwaggerAutoSchema
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+    return router
+
+
+def test_fragment_cache__serializer_schemas():
+    router = _get_cached_fragments_router(FragmentCache())
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+    swagger = generator.get_schema(request=None, public=True)
+
+    with mock.patch.object(drf_yasg_json_api.inspectors.JSONAPISerializerInspector, 'build_serializer_schema') as build:
+        cached_swagger = generator.get_schema(request=None, public=True)
+
+    assert not build.called
+    assert json.dumps(cached_swagger) == json.dumps(swagger)
+    response_schema = cached_swagger['paths']['/projects/{id}/']['get']['responses']['200']['schema']['properties']
+    assert response_schema['data']['properties']['type']['pattern'] == 'projects'
+
+
+def test_fragment_cache__operations():
+    router = _get_cached_fragments_router(None)
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+    swagger = generator.get_schema(request=None, public=True)
+
+    with mock.patch.object(base.BasicSwaggerAutoSchema, 'fragment_cache', FragmentCache()):
+        generator.get_schema(request=None, public=True)
+        with mock.patch.object(drf_yasg_json_api.inspectors.SwaggerAutoSchema, 'get_responses') as get_responses:
+            cached_swagger = generator.get_schema(request=None, public=True)
+
+    assert not get_responses.called
+    assert json.dumps(cached_swagger) == json.dumps(swagger)
+    assert isinstance(cached_swagger['paths']['/projects/']['post'], openapi.Operation)
+
+
+def test_fragment_cache__switches():
+    router = _get_cached_fragments_router(FragmentCache())
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+
+    with mock.patch.object(base.BasicSwaggerAutoSchema, 'fragment_cache', FragmentCache()):
+        generator.get_schema(request=None, public=True)
+        with mock.patch.object(base.BasicSwaggerAutoSchema, 'sparse_fieldsets_parameters', False):
+            swagger = generator.get_schema(request=None, public=True)
+
+    parameters = [parameter['name'] for parameter in swagger['paths']['/projects/{id}/']['get']['parameters']]
+    assert 'fields[projects]' not in parameters
+
+    inspector_class = drf_yasg_json_api.inspectors.JSONAPISerializerInspector
+    with mock.patch.object(inspector_class, 'build_serializer_schema',
+                           return_value=openapi.Schema(type=openapi.TYPE_OBJECT)) as build:
+        generator.get_schema(request=None, public=True)
+        assert not build.called
+        with mock.patch.object(inspector_class, 'canonical_ordering', True):
+            generator.get_schema(request=None, public=True)
+        assert build.called
+
+    # Switches overridden by instance count too
+    swagger_schema = base.BasicSwaggerAutoSchema(None, '/projects/', 'get', None, None, {})
+    switches = get_switches(swagger_schema)
+    swagger_schema.included_definitions = True
+    assert ('included_definitions', False) in switches
+    assert ('included_definitions', True) in get_switches(swagger_schema)
@@ -0,0 +1,124 @@
+import json
+import threading
+
+import drf_yasg.inspectors
+
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+from rest_framework import mixins
+from rest_framework import routers
+from rest_framework import viewsets
+from rest_framework_json_api import django_filters
+from rest_framework_json_api import filters
+from rest_framework_json_api import pagination
+from rest_framework_json_api import parsers
+from rest_framework_json_api import renderers
+from rest_framework_json_api import serializers
+
+import drf_yasg_json_api.inspectors
+
+from drf_yasg_json_api import utils
+from tests import base
+from tests import compatibility
+from tests import models as test_models
+
+
+class MemberSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = test_models.Member
+        fields = ('id', 'first_name', 'last_name', 'projects')
+
+    included_serializers = {
+        'projects': 'tests.test_concurrency.ProjectSerializer',
+    }
+
+
+class ProjectSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = test_models.Project
+        fields = ('id', 'name', 'archived', 'members', 'owner_member', 'sub_projects')
+
+    included_serializers = {
+        'members': MemberSerializer,
+        'owner_member': MemberSerializer,
+        'sub_projects': 'self',
+    }
+
+
+class ConcurrentSwaggerAutoSchema(base.BasicSwaggerAutoSchema):
+    filter_inspectors = [
+        drf_yasg_json_api.inspectors.DjangoFilterInspector,
+        drf_yasg_json_api.inspectors.OrderingFilterInspector,
+    ]
+    paginator_inspectors = [
+        drf_yasg_json_api.inspectors.DjangoRestResponsePagination,
+        drf_yasg.inspectors.DjangoRestResponsePagination,
+    ]
+
+
+def _get_router():
+    class ProjectViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin,
+                         mixins.UpdateModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = ConcurrentSwaggerAutoSchema
+        pagination_class = pagination.JsonApiPageNumberPagination
+        filter_backends = (django_filters.DjangoFilterBackend, filters.OrderingFilter)
+        filterset_fields = {'archived': ('exact',), 'name': ('exact', 'icontains')}
+        ordering_fields = ('name', 'owner_member__first_name')
+
+    class MemberViewSet(ProjectViewSet):
+        queryset = test_models.Member.objects.all()
+        serializer_class = MemberSerializer
+        pagination_class = pagination.JsonApiLimitOffsetPagination
+        filterset_fields = {'first_name': ('exact',)}
+        ordering_fields = ('first_name',)
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+    router.register(r'members', MemberViewSet, **compatibility._basename_or_base_name('members'))
+    return router
+
+
+def _clear_process_caches():
+    utils.clear_resource_types(setting='JSON_API_FORMAT_TYPES')
+    utils.clear_serializer_caches()
+    drf_yasg_json_api.inspectors.DjangoFilterInspector.clear_cache()
+
+
+def test_parallel_generation__identical_output():
+    urls = _get_router().urls
+
+    def generate():
+        generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=urls)
+        return json.dumps(generator.get_schema(request=None, public=True).as_odict())
+
+    _clear_process_caches()
+    expected = generate()
+
+    threads_count, generations_count = 8, 3
+    barrier = threading.Barrier(threads_count)
+    results = []
+    errors = []
+
+    def work():
+        try:
+            barrier.wait()
+            for _ in range(generations_count):
+                results.append(generate())
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    # Process-wide caches are filled concurrently by all threads
+    _clear_process_caches()
+    threads = [threading.Thread(target=work) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(results) == threads_count * generations_count
+    assert all(result == expected for result in results)
@@ -0,0 +1,189 @@
+import copy
+import json
+
+from unittest import mock
+
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+from rest_framework import mixins
+from rest_framework import routers
+from rest_framework import viewsets
+from rest_framework_json_api import parsers
+from rest_framework_json_api import renderers
+from rest_framework_json_api import serializers
+
+from drf_yasg_json_api import diff
+from drf_yasg_json_api.diff import SchemaChange
+from drf_yasg_json_api.diff import SchemaDiff
+from drf_yasg_json_api.diff import get_resource_fingerprints
+from tests import base
+from tests import compatibility
+from tests import models as test_models
+
+
+def _generate_document(project_fields, member_fields=('id', 'first_name', 'last_name'), included=True):
+    class MemberSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Member
+            fields = member_fields
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = project_fields
+            extra_kwargs = {'archived': {'required': True}}
+
+        included_serializers = {'members': MemberSerializer} if included else {}
+
+    class ProjectViewSet(mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = base.BasicSwaggerAutoSchema
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+    return generator.get_schema(request=None, public=True)
+
+
+def _get_attributes(document, location):
+    if location == 'request':
+        schema = document['paths']['/projects/']['post']['parameters'][0]['schema']
+    else:
+        schema = document['paths']['/projects/{id}/']['get']['responses']['200']['schema']
+    return schema['properties']['data']['properties']['attributes']['properties']
+
+
+def test_diff__no_changes():
+    document = _generate_document(('id', 'name', 'members'))
+    stored_document = json.loads(json.dumps(document))
+
+    schema_diff = SchemaDiff(stored_document, _generate_document(('id', 'name', 'members')))
+
+    assert schema_diff.changes == []
+    assert not schema_diff.is_breaking
+
+
+def test_diff__classified_changes():
+    old_document = json.loads(json.dumps(_generate_document(('id', 'name', 'members', 'owner_member'))))
+    new_document = _generate_document(('id', 'archived', 'members'), member_fields=('id', 'first_name'))
+
+    schema_diff = SchemaDiff(old_document, new_document)
+
+    assert SchemaChange('POST /projects/ request', 'removed attributes name', True) in schema_diff.changes
+    assert SchemaChange('POST /projects/ request', 'added required attributes archived', True) in schema_diff.changes
+    assert SchemaChange('GET /projects/{id}/ response 200', 'added attributes archived', False) in \
+        schema_diff.changes
+    assert SchemaChange('GET /projects/{id}/ response 200', 'removed relationships owner-member', True) in \
+        schema_diff.changes
+    assert SchemaChange('GET /projects/{id}/ included members', 'removed attributes last-name', True) in \
+        schema_diff.changes
+    assert schema_diff.is_breaking
+    assert 'BREAKING\tPOST /projects/ request\tremoved attributes name' in schema_diff.format().splitlines()
+
+
+def test_diff__included_types():
+    old_document = json.loads(json.dumps(_generate_document(('id', 'name', 'members'), included=False)))
+    new_document = _generate_document(('id', 'name', 'members'))
+
+    schema_diff = SchemaDiff(old_document, new_document)
+    assert SchemaChange('GET /projects/{id}/', 'added included type members', False) in schema_diff.changes
+    assert SchemaChange('GET /projects/{id}/ include', 'added include path members', False) in schema_diff.changes
+    assert not schema_diff.is_breaking
+
+    reverse_diff = SchemaDiff(new_document, old_document)
+    assert SchemaChange('GET /projects/{id}/', 'removed included type members', True) in reverse_diff.changes
+    assert reverse_diff.is_breaking
+
+
+def test_diff__only_changed_resources_compared():
+    old_document = json.loads(json.dumps(_generate_document(('id', 'name', 'members'))))
+    old_fingerprints = get_resource_fingerprints(old_document)
+    new_document = _generate_document(('id', 'name', 'members'), member_fields=('id', 'first_name'))
+
+    with mock.patch.object(diff._ResourceIndex, 'summarize_resource', autospec=True,
+                           side_effect=diff._ResourceIndex.summarize_resource) as summarize:
+        schema_diff = SchemaDiff(old_document, new_document, old_fingerprints=json.loads(json.dumps(old_fingerprints)))
+        assert schema_diff.changes == [
+            SchemaChange('POST /projects/ included members', 'removed attributes last-name', True),
+            SchemaChange('GET /projects/{id}/ included members', 'removed attributes last-name', True),
+        ]
+
+    # Old and new version of the only changed resource in both operations
+    assert summarize.call_count == 4
+
+
+def test_diff__nested_attributes():
+    old_document = json.loads(json.dumps(_generate_document(('id', 'name', 'members'))))
+    for location in ('request', 'response'):
+        _get_attributes(old_document, location)['settings'] = {
+            'type': 'object', 'properties': {'color': {'type': 'string'}, 'tags': {'type': 'array', 'items': {}}},
+        }
+    new_document = copy.deepcopy(old_document)
+    for location in ('request', 'response'):
+        attributes = _get_attributes(new_document, location)
+        attributes['name'].update(maxLength=50, title='Project name', **{'x-nullable': True})
+        attributes['settings'] = {'type': 'object', 'required': ['size'], 'properties': {
+            'size': {'type': 'integer'}, 'tags': {'type': 'array', 'items': {'type': 'string', 'pattern': '^[a-z]+$'}},
+        }}
+
+    schema_diff = SchemaDiff(old_document, new_document)
+
+    assert schema_diff.changes == [
+        SchemaChange('POST /projects/ request', 'attributes name became nullable', False),
+        SchemaChange('POST /projects/ request', 'attributes name title changed from Name to Project name', False),
+        SchemaChange('POST /projects/ request', 'attributes name maxLength changed from 100 to 50', True),
+        SchemaChange('POST /projects/ request', 'removed attributes settings color', True),
+        SchemaChange('POST /projects/ request', 'attributes settings tags items type changed from None to string',
+                     True),
+        SchemaChange('POST /projects/ request', 'attributes settings tags items pattern changed from None to ^[a-z]+$',
+                     True),
+        SchemaChange('POST /projects/ request', 'added required attributes settings size', True),
+        SchemaChange('GET /projects/{id}/ response 200', 'attributes name became nullable', True),
+        SchemaChange('GET /projects/{id}/ response 200',
+                     'attributes name title changed from Name to Project name', False),
+        SchemaChange('GET /projects/{id}/ response 200', 'attributes name maxLength changed from 100 to 50', True),
+        SchemaChange('GET /projects/{id}/ response 200', 'removed attributes settings color', True),
+        SchemaChange('GET /projects/{id}/ response 200',
+                     'attributes settings tags items type changed from None to string', True),
+        SchemaChange('GET /projects/{id}/ response 200',
+                     'attributes settings tags items pattern changed from None to ^[a-z]+$', True),
+        SchemaChange('GET /projects/{id}/ response 200', 'added attributes settings size', False),
+    ]
+
+
+def test_diff__added_requirements():
+    old_document = json.loads(json.dumps(_generate_document(('id', 'name', 'members'))))
+    new_document = copy.deepcopy(old_document)
+    # Body and params of already existing operation, all non-body params of POST are new
+    post_parameters = old_document['paths']['/projects/']['post']['parameters']
+    old_document['paths']['/projects/']['post']['parameters'] = [
+        parameter for parameter in post_parameters if parameter['name'] == 'include'
+    ]
+    tenant_parameter = {'name': 'tenant', 'in': 'query', 'required': True, 'type': 'string'}
+    new_document['paths']['/projects/']['post']['parameters'].append(tenant_parameter)
+    new_document['paths']['/projects/{id}/']['get']['parameters'].append(tenant_parameter)
+
+    schema_diff = SchemaDiff(old_document, new_document)
+
+    assert SchemaChange('POST /projects/ request', 'added required', True) in schema_diff.changes
+    assert SchemaChange('POST /projects/ parameters', 'added required query tenant', True) in schema_diff.changes
+    assert SchemaChange('POST /projects/ parameters', 'added query fields[projects]', False) in schema_diff.changes
+    assert SchemaChange('GET /projects/{id}/ parameters', 'added required query tenant', True) in \
+        schema_diff.changes
+
+    # New enum narrows accepted values, but not returned ones
+    enum_document = copy.deepcopy(new_document)
+    for location in ('request', 'response'):
+        _get_attributes(enum_document, location)['name']['enum'] = ['First', 'Second']
+    enum_diff = SchemaDiff(new_document, enum_document)
+    assert SchemaChange('POST /projects/ request', 'attributes name enum changed', True) in enum_diff.changes
+    assert SchemaChange('GET /projects/{id}/ response 200', 'attributes name enum changed', False) in \
+        enum_diff.changes
+
+    # Request of new operation is not breaking
+    new_document['paths']['/projects/']['put'] = new_document['paths']['/projects/'].pop('post')
+    assert SchemaChange('PUT /projects/ request', 'added', False) in SchemaDiff(old_document, new_document).changes
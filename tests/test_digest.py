@@ -0,0 +1,26 @@
+import json
+
+from collections import OrderedDict
+
+from drf_yasg import openapi
+
+from drf_yasg_json_api.digest import get_canonical_json
+from drf_yasg_json_api.digest import get_schema_digest
+
+
+def test_schema_digest__stable():
+    schema = openapi.Schema(type=openapi.TYPE_OBJECT, properties=OrderedDict([
+        ('name', openapi.Schema(type=openapi.TYPE_STRING)),
+        ('archived', openapi.Schema(type=openapi.TYPE_BOOLEAN)),
+    ]))
+    reordered_document = {'properties': {
+        'archived': {'type': 'boolean'},
+        'name': {'type': 'string'},
+    }, 'type': 'object'}
+
+    assert get_canonical_json(schema) == get_canonical_json(reordered_document) == \
+        '{"properties":{"archived":{"type":"boolean"},"name":{"type":"string"}},"type":"object"}'
+    assert get_schema_digest(schema) == get_schema_digest(json.loads(json.dumps(reordered_document)))
+
+    reordered_document['required'] = ['name']
+    assert get_schema_digest(schema) != get_schema_digest(reordered_document)
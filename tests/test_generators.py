@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.test import RequestFactory
+from drf_yasg import openapi
+from drf_yasg.views import get_schema_view
+from rest_framework import mixins
+from rest_framework import routers
+from rest_framework import viewsets
+from rest_framework_json_api import parsers
+from rest_framework_json_api import renderers
+from rest_framework_json_api import serializers
+
+from drf_yasg_json_api.generators import PartialSchemaGenerator
+from drf_yasg_json_api.generators import get_referenced_definitions
+from tests import base
+from tests import compatibility
+from tests import models as test_models
+
+
+def _get_router():
+    class MemberSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Member
+            fields = ('id', 'first_name')
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'members')
+
+        included_serializers = {'members': MemberSerializer}
+
+    class BaseViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin,
+                      viewsets.GenericViewSet):
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = base.BasicSwaggerAutoSchema
+
+    class ProjectViewSet(BaseViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+
+    class MemberViewSet(BaseViewSet):
+        queryset = test_models.Member.objects.all()
+        serializer_class = MemberSerializer
+
+    router = routers.DefaultRouter()
+    router.register(r'api/projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+    router.register(r'api/members', MemberViewSet, **compatibility._basename_or_base_name('members'))
+    return router
+
+
+def _get_operations(schema):
+    return sorted(
+        '{} {}'.format(method.upper(), path) for path, path_item in schema['paths'].items() for method in path_item
+        if method != 'parameters'
+    )
+
+
+def test_partial_schema__path_and_method():
+    router = _get_router()
+    generator = PartialSchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+    full_schema = PartialSchemaGenerator(
+        info=openapi.Info(title="", default_version=""), patterns=router.urls
+    ).get_schema(request=None, public=True)
+
+    with mock.patch.object(PartialSchemaGenerator, 'get_operation', autospec=True,
+                           side_effect=PartialSchemaGenerator.get_operation) as get_operation:
+        schema = generator.get_partial_schema(public=True, path='/projects/{id}/', method='GET')
+    assert get_operation.call_count == 1
+
+    assert schema['basePath'] == full_schema['basePath'] == '/api'
+    assert _get_operations(schema) == ['GET /projects/{id}/']
+    assert schema['paths']['/projects/{id}/']['get'] == full_schema['paths']['/projects/{id}/']['get']
+
+
+def test_partial_schema__tags_from_query_params():
+    router = _get_router()
+    schema_view = get_schema_view(
+        openapi.Info(title="", default_version=""), patterns=router.urls, public=True,
+        generator_class=PartialSchemaGenerator,
+    ).without_ui()
+
+    response = schema_view(RequestFactory().get('/swagger.json', {'tag': 'members', 'format': 'openapi'}))
+    response.render()
+
+    assert _get_operations(response.data) == ['GET /members/', 'GET /members/{id}/', 'POST /members/']
+
+
+def test_referenced_definitions():
+    definitions = {
+        'Unused': {'type': 'object'},
+        'Links': {'type': 'object', 'properties': {'self': {'$ref': '#/definitions/Link'}}},
+        'Link': {'type': 'string'},
+    }
+    paths = {'/projects/': {'get': {'responses': {'200': {'schema': {'$ref': '#/definitions/Links'}}}}}}
+
+    assert list(get_referenced_definitions(paths, definitions)) == ['Links', 'Link']
@@ -0,0 +1,61 @@
+import subprocess
+import sys
+
+import drf_yasg_json_api.inspectors
+
+from drf_yasg_json_api.inspectors import field
+from drf_yasg_json_api.inspectors import query
+from drf_yasg_json_api.inspectors import view
+
+SETUP = """
+import sys
+from django.conf import settings
+settings.configure()
+sys.stderr.write('-- setup done --\\n')
+sys.stderr.flush()
+"""
+
+
+def run_python(code, *options):
+    return subprocess.run(
+        [sys.executable] + list(options) + ['-c', code], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True
+    )
+
+
+def get_import_time(statement):
+    """Return cumulative import time in microseconds of modules imported by `statement`, measured by -X importtime."""
+    stderr = run_python(SETUP + statement, '-X', 'importtime').stderr
+    lines = stderr.split('-- setup done --\n', 1)[1].splitlines()
+    total = 0
+    for line in lines:
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        # Top level imports only, nested ones are included in cumulative time of their parents
+        if not name.startswith('  '):
+            total += int(cumulative)
+    return total
+
+
+def test_lazy_names_cover_all_inspectors():
+    assert set(drf_yasg_json_api.inspectors.__all__) == set(field.__all__) | set(query.__all__) | set(view.__all__)
+    assert drf_yasg_json_api.inspectors.SwaggerAutoSchema is view.SwaggerAutoSchema
+
+
+def test_import_does_not_load_inspector_modules():
+    run_python("""
+import sys
+import drf_yasg_json_api.inspectors
+assert 'drf_yasg_json_api.inspectors.field' not in sys.modules
+assert 'drf_yasg.inspectors' not in sys.modules
+assert 'rest_framework_json_api.serializers' not in sys.modules
+""")
+
+
+def test_import_time():
+    lazy_time = get_import_time('import drf_yasg_json_api.inspectors')
+    eager_time = get_import_time('import drf_yasg_json_api.inspectors.field, drf_yasg_json_api.inspectors.query, '
+                                 'drf_yasg_json_api.inspectors.view')
+
+    assert lazy_time * 5 < eager_time
@@ -0,0 +1,77 @@
+import io
+import json
+
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+from rest_framework import mixins
+from rest_framework import routers
+from rest_framework import viewsets
+from rest_framework_json_api import parsers
+from rest_framework_json_api import renderers
+from rest_framework_json_api import serializers
+
+from drf_yasg_json_api.generators import LowMemorySchemaGenerator
+from tests import base
+from tests import compatibility
+from tests import models as test_models
+from tests.utils import measure_peak
+
+
+def _get_router(endpoints_count):
+    router = routers.DefaultRouter()
+    for index in range(endpoints_count):
+        member_serializer = type('MemberSerializer{}'.format(index), (serializers.ModelSerializer,), {
+            'Meta': type('Meta', (), {'model': test_models.Member, 'fields': ('id', 'first_name', 'last_name')}),
+        })
+        project_serializer = type('ProjectSerializer{}'.format(index), (serializers.ModelSerializer,), {
+            'Meta': type('Meta', (), {'model': test_models.Project, 'fields': ('id', 'name', 'archived', 'members')}),
+            'included_serializers': {'members': member_serializer},
+        })
+        view_set = type('ProjectViewSet{}'.format(index), (
+            mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet
+        ), {
+            'queryset': test_models.Project.objects.all(),
+            'serializer_class': project_serializer,
+            'renderer_classes': [renderers.JSONRenderer],
+            'parser_classes': [parsers.JSONParser],
+            'swagger_schema': base.BasicSwaggerAutoSchema,
+        })
+        router.register(r'projects{}'.format(index), view_set,
+                        **compatibility._basename_or_base_name('projects{}'.format(index)))
+    return router
+
+
+class _NullStream:
+    def write(self, text):
+        pass
+
+
+def test_low_memory_generator__same_document():
+    router = _get_router(2)
+    info = openapi.Info(title="", default_version="")
+
+    schema = OpenAPISchemaGenerator(info=info, patterns=router.urls).get_schema(request=None, public=True)
+    low_memory_generator = LowMemorySchemaGenerator(info=info, patterns=router.urls)
+    stream = io.StringIO()
+    low_memory_generator.write_json(stream, request=None, public=True)
+
+    expected = json.loads(json.dumps(schema.as_odict()))
+    assert json.loads(stream.getvalue()) == expected
+    assert json.loads(json.dumps(low_memory_generator.get_schema(request=None, public=True).as_odict())) == expected
+
+
+def test_low_memory_generator__peak_memory():
+    info = openapi.Info(title="", default_version="")
+    peaks = {}
+    for endpoints_count in (5, 20):
+        urls = _get_router(endpoints_count).urls
+        peaks[endpoints_count] = (
+            measure_peak(lambda: OpenAPISchemaGenerator(info=info, patterns=urls).get_schema(None, True)),
+            measure_peak(lambda: LowMemorySchemaGenerator(info=info, patterns=urls).write_json(_NullStream())),
+        )
+
+    full_growth = peaks[20][0] - peaks[5][0]
+    low_memory_growth = peaks[20][1] - peaks[5][1]
+    # Only endpoints themselves and compressed fragments are kept per endpoint
+    assert low_memory_growth < full_growth / 4
+    assert peaks[20][1] < peaks[20][0] / 2
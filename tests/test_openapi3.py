@@ -0,0 +1,150 @@
+import json
+
+from django.test import RequestFactory
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.views import get_schema_view
+from rest_framework import mixins
+from rest_framework import routers
+from rest_framework import viewsets
+from rest_framework_json_api import parsers
+from rest_framework_json_api import relations
+from rest_framework_json_api import renderers
+from rest_framework_json_api import serializers
+
+from drf_yasg_json_api.openapi3 import OpenAPI3Converter
+from drf_yasg_json_api.openapi3 import OpenAPI3JSONRenderer
+from drf_yasg_json_api.openapi3 import to_openapi3
+from tests import base
+from tests import compatibility
+from tests import models as test_models
+
+
+def _get_router(swagger_schema=base.BasicSwaggerAutoSchema):
+    _swagger_schema = swagger_schema
+
+    class MemberSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Member
+            fields = ('id', 'first_name', 'last_name')
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        owner_member = relations.ResourceRelatedField(read_only=True)
+
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'members', 'owner_member')
+
+        included_serializers = {'members': MemberSerializer, 'owner_member': MemberSerializer}
+
+    class ProjectViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin,
+                         viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = _swagger_schema
+
+    router = routers.DefaultRouter()
+    router.register(r'api/projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+    return router
+
+
+def _generate_document(swagger_schema=base.BasicSwaggerAutoSchema):
+    generator = OpenAPISchemaGenerator(
+        info=openapi.Info(title="", default_version=""), patterns=_get_router(swagger_schema).urls,
+    )
+    return generator.get_schema(request=None, public=True)
+
+
+def test_openapi3__resource_components():
+    swagger = _generate_document()
+    document = to_openapi3(swagger)
+
+    assert document['openapi'] == '3.0.3'
+    assert document['servers'] == [{'url': '/api'}]
+
+    create = document['paths']['/projects/']['post']
+    request_schema = create['requestBody']['content']['application/vnd.api+json']['schema']
+    assert request_schema['properties']['data'] == {'$ref': '#/components/schemas/ProjectsRequestResource'}
+    assert create['requestBody']['required'] is True
+
+    list_schema = document['paths']['/projects/']['get']['responses']['200']['content'][
+        'application/vnd.api+json']['schema']
+    retrieve_schema = document['paths']['/projects/{id}/']['get']['responses']['200']['content'][
+        'application/vnd.api+json']['schema']
+    assert list_schema['properties']['data']['items'] == retrieve_schema['properties']['data'] == \
+        {'$ref': '#/components/schemas/ProjectsResource'}
+
+    included = retrieve_schema['properties']['included']
+    assert included['type'] == 'array'
+    assert included['items']['oneOf'] == [{'$ref': '#/components/schemas/MembersResource'}]
+    assert included['items']['discriminator'] == {
+        'propertyName': 'type', 'mapping': {'members': '#/components/schemas/MembersResource'},
+    }
+
+    owner_member = document['components']['schemas']['ProjectsResource']['properties']['relationships'][
+        'properties']['owner-member']
+    assert owner_member['readOnly'] is True
+    assert 'x-readOnly' not in json.dumps(document)
+
+    include = document['paths']['/projects/{id}/']['get']['parameters'][0]
+    assert include['name'] == 'include'
+    assert include['schema'] == {'type': 'array', 'items': {'type': 'string'}}
+    assert (include['style'], include['explode']) == ('form', False)
+
+    # Resources are shared through components instead of being inlined in every operation
+    assert len(json.dumps(document)) < len(json.dumps(swagger.as_odict()))
+
+
+def test_openapi3__nullable():
+    schema = {'type': 'object', 'properties': {'name': {'type': 'string', 'x-nullable': True}}}
+
+    assert OpenAPI3Converter().convert_schema(schema)['properties']['name'] == {'type': 'string', 'nullable': True}
+    assert OpenAPI3Converter(version='3.1.0').convert_schema(schema)['properties']['name'] == \
+        {'type': ['string', 'null']}
+
+
+def test_openapi3__exclusive_limits():
+    schema = {'type': 'integer', 'minimum': 1, 'exclusiveMinimum': True, 'maximum': 10, 'exclusiveMaximum': False}
+
+    assert OpenAPI3Converter().convert_schema(schema) == schema
+    assert OpenAPI3Converter(version='3.1.0').convert_schema(schema) == \
+        {'type': 'integer', 'exclusiveMinimum': 1, 'maximum': 10}
+
+    parameter = {'name': 'page', 'in': 'query', 'type': 'integer', 'minimum': 0, 'exclusiveMinimum': True}
+    assert OpenAPI3Converter(version='3.1.0').convert_parameter(parameter)['schema'] == \
+        {'type': 'integer', 'exclusiveMinimum': 0}
+
+
+def test_openapi3__unreferenced_components():
+    class IncludedDefinitionsSwaggerAutoSchema(base.BasicSwaggerAutoSchema):
+        included_definitions = True
+
+    swagger = _generate_document(IncludedDefinitionsSwaggerAutoSchema)
+    assert 'IncludedMembers' in swagger['definitions']
+
+    document = to_openapi3(swagger)
+    schemas = document['components']['schemas']
+    # Union of included resources is replaced by `oneOf` of their components
+    assert 'IncludedMembers' not in schemas
+    assert 'MembersIncludedResource' in schemas
+
+    retrieve_schema = document['paths']['/projects/{id}/']['get']['responses']['200']['content'][
+        'application/vnd.api+json']['schema']
+    assert retrieve_schema['properties']['included']['items']['oneOf'] == \
+        [{'$ref': '#/components/schemas/MembersIncludedResource'}]
+    assert '#/components/schemas/IncludedMembers' not in json.dumps(document)
+
+
+def test_openapi3__renderer():
+    schema_view = get_schema_view(
+        openapi.Info(title="", default_version=""), patterns=_get_router().urls, public=True,
+    ).as_cached_view(renderer_classes=[OpenAPI3JSONRenderer])
+
+    response = schema_view(RequestFactory().get('/swagger.json', {'format': 'openapi3'}))
+    response.render()
+
+    document = json.loads(response.content.decode('utf-8'))
+    assert document['openapi'] == '3.0.3'
+    assert 'ProjectsResource' in document['components']['schemas']
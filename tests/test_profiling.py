@@ -0,0 +1,100 @@
+from unittest import mock
+
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+from rest_framework import mixins
+from rest_framework import routers
+from rest_framework import viewsets
+from rest_framework_json_api import parsers
+from rest_framework_json_api import renderers
+from rest_framework_json_api import serializers
+
+from drf_yasg_json_api.profiling import OperationProfile
+from drf_yasg_json_api.profiling import SchemaProfiler
+from tests import base
+from tests import compatibility
+from tests import models as test_models
+
+
+class ProfiledMemberSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = test_models.Member
+        fields = ['first_name', 'last_name']
+
+
+class ProfiledProjectSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = test_models.Project
+        fields = ('id', 'name', 'archived', 'members')
+
+    included_serializers = {
+        'members': ProfiledMemberSerializer,
+    }
+
+
+def _get_swagger(profiler):
+    class ProfiledSwaggerAutoSchema(base.BasicSwaggerAutoSchema):
+        pass
+
+    ProfiledSwaggerAutoSchema.profiler = profiler
+
+    class ProjectViewSet(mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProfiledProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = ProfiledSwaggerAutoSchema
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+    return generator.get_schema(request=None, public=True)
+
+
+def test_profiler():
+    profiler = SchemaProfiler()
+    _get_swagger(profiler)
+
+    profiles = {(profile.method, profile.path): profile for profile in profiler.get_report()}
+    assert set(profiles) == {('POST', '/projects/'), ('GET', '/projects/{id}/')}
+
+    post_profile = profiles[('POST', '/projects/')]
+    assert set(post_profile.timings) == {
+        'get_request_body_schema', 'get_default_responses', 'get_included_schema_for_response', 'get_query_parameters'
+    }
+    assert post_profile.total_time >= sum(post_profile.timings.values())
+    assert post_profile.size > 0
+    assert post_profile.included_count == 1
+
+    get_profile = profiles[('GET', '/projects/{id}/')]
+    assert 'get_request_body_schema' not in get_profile.timings
+    assert [profile.size for profile in profiler.get_report(sort_by='size')] == sorted(
+        [post_profile.size, get_profile.size], reverse=True
+    )
+
+    report = profiler.format_report().splitlines()
+    assert len(report) == 3
+    assert report[0].startswith('method\tpath\ttotal [ms]')
+
+
+@mock.patch('drf_yasg_json_api.profiling.logger')
+def test_profiler__budgets(logger):
+    _get_swagger(SchemaProfiler(size_budget=1, included_budget=0))
+
+    warnings = [call[1][0] for call in logger.warning.mock_calls]
+    assert len(warnings) == 4
+    assert any(warning.startswith('POST /projects/ exceeds size budget') for warning in warnings)
+    assert any(warning.startswith('GET /projects/{id}/ exceeds included resources budget: 1 > 0')
+               for warning in warnings)
+
+
+@mock.patch('drf_yasg_json_api.profiling.time.perf_counter', side_effect=[0.0, 1.0, 3.0, 4.0, 4.5, 6.0])
+def test_operation_profile__exclusive_timings(perf_counter):
+    profile = OperationProfile('GET', '/projects/')
+    with profile.measure('get_default_responses'):
+        for _ in range(2):
+            with profile.measure('get_included_schema_for_response'):
+                pass
+
+    assert profile.timings == {'get_default_responses': 3.5, 'get_included_schema_for_response': 2.5}
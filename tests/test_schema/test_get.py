@@ -1,16 +1,23 @@
+import json
 import operator
 
+from collections import OrderedDict
 from unittest import mock
 
 import drf_yasg.inspectors
+import pytest
 
+from django.test import override_settings
 from drf_yasg import openapi
 from drf_yasg.generators import OpenAPISchemaGenerator
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import mixins
+from rest_framework import pagination as rest_pagination
 from rest_framework import routers
 from rest_framework import views
 from rest_framework import viewsets
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
 from rest_framework_json_api import django_filters
 from rest_framework_json_api import filters
 from rest_framework_json_api import pagination
@@ -19,7 +26,9 @@ from rest_framework_json_api import renderers
 from rest_framework_json_api import serializers
 
 import drf_yasg_json_api.inspectors
+import drf_yasg_json_api.utils
 
+from drf_yasg_json_api.validation import compile_validator
 from tests import base
 from tests import compatibility
 from tests import models as test_models
@@ -65,6 +74,59 @@ def test_get():
     assert members_schema['data']['items']['properties']['type']['pattern'] == 'members'
 
 
+def test_view_decisions_cached():
+    class SwaggerAutoSchemaWithPagination(base.BasicSwaggerAutoSchema):
+        paginator_inspectors = [
+            drf_yasg_json_api.inspectors.DjangoRestResponsePagination,
+            drf_yasg.inspectors.CoreAPICompatInspector,
+        ]
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'members')
+
+        included_serializers = {'members': 'tests.test_schema.test_get.MemberSerializer'}
+
+    class ProjectViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = SwaggerAutoSchemaWithPagination
+        pagination_class = pagination.JsonApiPageNumberPagination
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+
+    auto_schema_cls = drf_yasg_json_api.inspectors.SwaggerAutoSchema
+    with mock.patch.object(auto_schema_cls, 'get_default_responses', autospec=True,
+                           side_effect=auto_schema_cls.get_default_responses) as get_default_responses, \
+            mock.patch('drf_yasg_json_api.inspectors.view.is_json_api_response',
+                       side_effect=drf_yasg_json_api.utils.is_json_api_response) as is_json_api_response, \
+            mock.patch.object(ProjectViewSet, 'get_serializer', autospec=True,
+                              side_effect=ProjectViewSet.get_serializer) as get_serializer:
+        swagger = generator.get_schema(request=None, public=True)
+
+    # Once per operation
+    assert get_default_responses.call_count == 2
+    assert is_json_api_response.call_count == 2
+    assert get_serializer.call_count == 2
+    list_parameters = [parameter['name'] for parameter in swagger['paths']['/projects/']['get']['parameters']]
+    assert {'page[number]', 'include', 'fields[members]'} <= set(list_parameters)
+    list_response_schema = swagger['paths']['/projects/']['get']['responses']['200']['schema']['properties']
+    assert list_response_schema['data']['type'] == 'array'
+    assert 'included' in list_response_schema
+
+
+class MemberSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = test_models.Member
+        fields = ('id', 'first_name', 'last_name')
+
+
 def test_pagination():
     class SwaggerAutoSchemaWithPagination(base.BasicSwaggerAutoSchema):
         paginator_inspectors = [
@@ -94,7 +156,9 @@ def test_pagination():
     swagger = generator.get_schema(request=None, public=True)
 
     request_parameters_schema = swagger['paths']['/projects/']['get']['parameters']
-    assert set(map(operator.itemgetter('name'), request_parameters_schema)) == {'page[number]', 'page[size]'}
+    assert set(map(operator.itemgetter('name'), request_parameters_schema)) == {
+        'page[number]', 'page[size]', 'fields[projects]'
+    }
 
     response_schema = swagger['paths']['/projects/']['get']['responses']['200']['schema']['properties']
     assert 'id' in response_schema['data']['items']['properties']
@@ -109,6 +173,143 @@ def test_pagination():
     assert set(pagination_response_schema.keys()) == {'page', 'pages', 'count'}
 
 
+def test_pagination__definitions():
+    class SwaggerAutoSchemaWithPagination(base.BasicSwaggerAutoSchema):
+        paginator_inspectors = [
+            drf_yasg_json_api.inspectors.ReferencingDjangoRestResponsePagination,
+            drf_yasg.inspectors.DjangoRestResponsePagination,
+            drf_yasg.inspectors.CoreAPICompatInspector,
+        ]
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'members')
+
+    class MemberSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Member
+            fields = ('id', 'first_name', 'last_name')
+
+    class ProjectViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = SwaggerAutoSchemaWithPagination
+        pagination_class = pagination.JsonApiPageNumberPagination
+
+    class MemberViewSet(ProjectViewSet):
+        queryset = test_models.Member.objects.all()
+        serializer_class = MemberSerializer
+        pagination_class = pagination.JsonApiLimitOffsetPagination
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+    router.register(r'members', MemberViewSet, **compatibility._basename_or_base_name('members'))
+
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+
+    swagger = generator.get_schema(request=None, public=True)
+
+    projects_schema = swagger['paths']['/projects/']['get']['responses']['200']['schema']['properties']
+    members_schema = swagger['paths']['/members/']['get']['responses']['200']['schema']['properties']
+    assert projects_schema['links']['$ref'] == '#/definitions/JSONAPIPaginationLinks'
+    assert members_schema['links']['$ref'] == '#/definitions/JSONAPIPaginationLinks'
+    assert projects_schema['meta']['$ref'] == '#/definitions/JSONAPIPageNumberPaginationMeta'
+    assert members_schema['meta']['$ref'] == '#/definitions/JSONAPILimitOffsetPaginationMeta'
+
+    definitions = swagger['definitions']
+    assert set(definitions['JSONAPIPaginationLinks']['properties'].keys()) == {'first', 'next', 'last', 'prev'}
+    assert set(definitions['JSONAPIPageNumberPaginationMeta']['properties']['pagination']['properties'].keys()) == \
+        {'page', 'pages', 'count'}
+    assert set(definitions['JSONAPILimitOffsetPaginationMeta']['properties']['pagination']['properties'].keys()) == \
+        {'limit', 'offset', 'count'}
+
+
+def _get_cursor_paginated_view_sets():
+    class SwaggerAutoSchemaWithPagination(base.BasicSwaggerAutoSchema):
+        paginator_inspectors = [
+            drf_yasg_json_api.inspectors.DjangoRestResponsePagination,
+            drf_yasg.inspectors.DjangoRestResponsePagination,
+            drf_yasg.inspectors.CoreAPICompatInspector,
+        ]
+
+    class CursorPagination(rest_pagination.CursorPagination):
+        cursor_query_param = 'page[cursor]'
+        ordering = 'id'
+        page_size = 1
+
+    class JsonApiCursorPagination(CursorPagination):
+        def get_paginated_response(self, data):
+            return Response(OrderedDict([
+                ('results', data),
+                ('links', OrderedDict([('next', self.get_next_link()), ('prev', self.get_previous_link())])),
+            ]))
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'members')
+
+    class ProjectViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = SwaggerAutoSchemaWithPagination
+        pagination_class = CursorPagination
+
+    class LinkedProjectViewSet(ProjectViewSet):
+        pagination_class = JsonApiCursorPagination
+
+    return OrderedDict([('projects', ProjectViewSet), ('linked-projects', LinkedProjectViewSet)])
+
+
+def _generate_cursor_paginated_swagger(view_sets):
+    router = routers.DefaultRouter()
+    for prefix, view_set in view_sets.items():
+        router.register(prefix, view_set, **compatibility._basename_or_base_name(prefix))
+
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+    return json.loads(json.dumps(generator.get_schema(request=None, public=True)))
+
+
+def test_pagination__cursor():
+    swagger = _generate_cursor_paginated_swagger(_get_cursor_paginated_view_sets())
+
+    request_parameters_schema = swagger['paths']['/projects/']['get']['parameters']
+    assert 'page[cursor]' in set(map(operator.itemgetter('name'), request_parameters_schema))
+
+    # DRF cursor paginator responds with "next" and "previous", which JSON API renderer drops
+    response_schema = swagger['paths']['/projects/']['get']['responses']['200']['schema']['properties']
+    assert response_schema['data']['type'] == 'array'
+    assert 'links' not in response_schema
+    assert 'meta' not in response_schema
+
+    response_schema = swagger['paths']['/linked-projects/']['get']['responses']['200']['schema']['properties']
+    assert set(response_schema['links']['properties'].keys()) == {'next', 'prev'}
+    assert 'meta' not in response_schema
+
+
+@pytest.mark.django_db
+def test_pagination__cursor_response():
+    view_sets = _get_cursor_paginated_view_sets()
+    swagger = _generate_cursor_paginated_swagger(view_sets)
+    member = test_models.Member.objects.create(first_name='Jane', last_name='Doe')
+    for name in ('First', 'Second'):
+        test_models.Project.objects.create(name=name, archived=False, owner_member=member)
+
+    for prefix, view_set in view_sets.items():
+        response = view_set.as_view({'get': 'list'})(APIRequestFactory().get('/{}/'.format(prefix)))
+        response.render()
+        content = json.loads(response.content.decode())
+
+        schema = swagger['paths']['/{}/'.format(prefix)]['get']['responses']['200']['schema']
+        assert compile_validator(schema, swagger.get('definitions'))(content) == []
+        assert set(content.keys()) == set(schema['properties'].keys()) - {'included'}
+
+
 @mock.patch('drf_yasg_json_api.inspectors.view.logger')
 def test_list_missing_serializer_warning(logger):
     class ProjectView(views.APIView):
@@ -128,7 +329,8 @@ def test_list_missing_serializer_warning(logger):
     swagger = generator.get_schema(request=None, public=True)
 
     assert swagger['paths']['/projects/']['get']
-    assert len(logger.warning.mock_calls) == 2
+    # Default response is built once per operation
+    assert len(logger.warning.mock_calls) == 1
     logger.warning.assert_called_with('Missing schema definition for list action of ProjectView, '
                                       'have you defined get_serializer?')
 
@@ -229,6 +431,209 @@ def test_filter():
     assert request_parameters_schema[0]['name'] == 'filter[archived]'
 
 
+@mock.patch('drf_yasg.inspectors.base.logger')
+def test_filter__failing_get_queryset(logger):
+    class FilterSwaggerAutoSchema(base.BasicSwaggerAutoSchema):
+        filter_inspectors = [drf_yasg_json_api.inspectors.DjangoFilterInspector]
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'members')
+
+    class ProjectViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = FilterSwaggerAutoSchema
+
+        filter_backends = (django_filters.DjangoFilterBackend,)
+        filterset_fields = {
+            'archived': ('exact',),
+        }
+
+        def get_queryset(self):
+            # Not short-circuited with swagger_fake_view, fails without request
+            return self.queryset.filter(owner_member__first_name=self.request.user.first_name)
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+
+    swagger = generator.get_schema(request=None, public=True)
+
+    # Falls back to queryset attribute of view and logs failure with traceback
+    request_parameters_schema = swagger['paths']['/projects/']['get']['parameters']
+    assert request_parameters_schema[0]['name'] == 'filter[archived]'
+    assert logger.warning.call_args[1]['exc_info'] is True
+
+
+def test_filter__filterset_params_cached():
+    import django_filters as filters_lib
+
+    class FilterSwaggerAutoSchema(base.BasicSwaggerAutoSchema):
+        filter_inspectors = [drf_yasg_json_api.inspectors.DjangoFilterInspector]
+
+    class CoreAPIFilterInspector(drf_yasg_json_api.inspectors.DjangoFilterInspector):
+        coreapi_compat = True
+
+    class ProjectFilterSet(filters_lib.FilterSet):
+        name = filters_lib.CharFilter(lookup_expr='icontains', help_text='Part of name')
+        id__gt = filters_lib.NumberFilter(field_name='id', lookup_expr='gt')
+
+        class Meta:
+            model = test_models.Project
+            fields = ['archived']
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'members')
+
+    class ProjectViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = FilterSwaggerAutoSchema
+        filter_backends = (django_filters.DjangoFilterBackend,)
+        filterset_class = ProjectFilterSet
+
+    class ArchivedProjectViewSet(ProjectViewSet):
+        pass
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+    router.register(r'archived-projects', ArchivedProjectViewSet,
+                    **compatibility._basename_or_base_name('archived-projects'))
+
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+
+    with mock.patch.object(drf_yasg_json_api.inspectors.DjangoFilterInspector, 'filter_to_parameter', autospec=True,
+                           side_effect=drf_yasg_json_api.inspectors.DjangoFilterInspector.filter_to_parameter) as build:
+        swagger = generator.get_schema(request=None, public=True)
+        generator.get_schema(request=None, public=True)
+    assert build.call_count == 3
+
+    parameters = [parameter for parameter in swagger['paths']['/projects/']['get']['parameters']
+                  if parameter['name'].startswith('filter[')]
+    assert [parameter['name'] for parameter in parameters] == ['filter[archived]', 'filter[name]', 'filter[id__gt]']
+    assert parameters[1]['description'] == 'Part of name'
+    assert parameters[2]['type'] == 'number'
+    assert swagger['paths']['/archived-projects/']['get']['parameters'][:3] == parameters
+    assert swagger['paths']['/archived-projects/']['get']['parameters'][0] is not parameters[0]
+
+    with mock.patch.object(FilterSwaggerAutoSchema, 'filter_inspectors', [CoreAPIFilterInspector]):
+        coreapi_swagger = generator.get_schema(request=None, public=True)
+    assert coreapi_swagger['paths']['/projects/']['get']['parameters'][:3] == parameters
+
+
+def test_filter__resolved_filterset():
+    import django_filters as filters_lib
+
+    class FilterSwaggerAutoSchema(base.BasicSwaggerAutoSchema):
+        filter_inspectors = [drf_yasg_json_api.inspectors.DjangoFilterInspector]
+
+    class NameFilterSet(filters_lib.FilterSet):
+        class Meta:
+            model = test_models.Project
+            fields = ['name']
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'members')
+
+    class ProjectViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = FilterSwaggerAutoSchema
+        filter_backends = (django_filters.DjangoFilterBackend,)
+        filterset_fields = {'archived': ('exact',)}
+
+    class ArchivedProjectViewSet(ProjectViewSet):
+        filterset_fields = {'archived': ('exact',), 'name': ('exact',)}
+
+    class NameFilterBackend(django_filters.DjangoFilterBackend):
+        def get_filterset_class(self, view, queryset=None):
+            return NameFilterSet
+
+    class NamedProjectViewSet(ProjectViewSet):
+        filter_backends = (NameFilterBackend,)
+
+    router = routers.DefaultRouter()
+    for prefix, view_set in (('projects', ProjectViewSet), ('archived-projects', ArchivedProjectViewSet),
+                             ('named-projects', NamedProjectViewSet)):
+        router.register(prefix, view_set, **compatibility._basename_or_base_name(prefix))
+
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+    swagger = generator.get_schema(request=None, public=True)
+
+    def get_filter_names(path):
+        return [parameter['name'] for parameter in swagger['paths'][path]['get']['parameters']
+                if parameter['name'].startswith('filter[')]
+
+    assert get_filter_names('/projects/') == ['filter[archived]']
+    assert get_filter_names('/archived-projects/') == ['filter[archived]', 'filter[name]']
+    assert get_filter_names('/named-projects/') == ['filter[name]']
+
+    with mock.patch.object(drf_yasg_json_api.inspectors.DjangoFilterInspector, 'filter_to_parameter', autospec=True,
+                           side_effect=drf_yasg_json_api.inspectors.DjangoFilterInspector.filter_to_parameter) as build:
+        generator.get_schema(request=None, public=True)
+        assert not build.called
+        with override_settings(FILTERS_DEFAULT_LOOKUP_EXPR='exact'):
+            generator.get_schema(request=None, public=True)
+        assert build.called
+
+
+def test_sparse_fieldsets_and_sort():
+    class SortSwaggerAutoSchema(base.BasicSwaggerAutoSchema):
+        filter_inspectors = [drf_yasg_json_api.inspectors.OrderingFilterInspector]
+
+    class MemberSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Member
+            fields = ('id', 'first_name', 'last_name')
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'members', 'owner_member')
+
+        included_serializers = {
+            'members': MemberSerializer,
+            'owner_member': MemberSerializer,
+        }
+
+    class ProjectViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = SortSwaggerAutoSchema
+        filter_backends = (filters.OrderingFilter,)
+        ordering_fields = ('name', 'owner_member__first_name')
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+
+    swagger = generator.get_schema(request=None, public=True)
+
+    parameters = OrderedDict(
+        (parameter['name'], parameter) for parameter in swagger['paths']['/projects/']['get']['parameters']
+    )
+    assert list(parameters.keys()) == ['sort', 'include', 'fields[projects]', 'fields[members]']
+    assert parameters['sort']['description'].endswith(': name, owner-member.first-name')
+    assert parameters['fields[projects]']['description'].endswith(': name, archived, members, owner_member')
+    assert parameters['fields[members]']['description'].endswith(': first_name, last_name')
+
+
 def test_non_model():
     class ProjectSerializer(serializers.Serializer):
         id = serializers.IntegerField()
@@ -1,3 +1,8 @@
+import json
+
+from collections import OrderedDict
+from unittest import mock
+
 from drf_yasg import openapi
 from drf_yasg.generators import OpenAPISchemaGenerator
 from rest_framework import mixins
@@ -7,11 +12,20 @@ from rest_framework_json_api import parsers
 from rest_framework_json_api import renderers
 from rest_framework_json_api import serializers
 
+import drf_yasg_json_api.inspectors
+
 from tests import base
 from tests import compatibility
 from tests import models as test_models
 
 
+def _get_included_resources(included_schema):
+    assert included_schema['type'] == 'array'
+    return OrderedDict(
+        (resource['properties']['type']['pattern'], resource) for resource in included_schema['items']['x-oneOf']
+    )
+
+
 class IncludedStringPathMemberSerializer(serializers.ModelSerializer):
     # projects = serializers.ResourceRelatedField(many=True, read_only=True)
 
@@ -46,7 +60,8 @@ def test_included__string_path():
 
     response_schema = swagger['paths']['/projects/{id}/']['get']['responses']['200']['schema']['properties']
     assert 'included' in response_schema
-    assert 'members' in response_schema['included']['properties']
+    assert list(_get_included_resources(response_schema['included'])) == ['members']
+    assert response_schema['included']['items']['properties']['type']['enum'] == ['members']
 
     request_parameters_schema = swagger['paths']['/projects/{id}/']['get']['parameters']
     assert request_parameters_schema[0]['name'] == 'include'
@@ -92,17 +107,175 @@ def test_included__recursive():
     swagger = generator.get_schema(request=None, public=True)
 
     response_schema = swagger['paths']['/projects/{id}/']['get']['responses']['200']['schema']['properties']
-    assert 'included' in response_schema
-    assert 'members' in response_schema['included']['properties']
-    assert 'projects' in response_schema['included']['properties']
-    included_members_schema = response_schema['included']['properties']['members']['properties']
+    included_resources = _get_included_resources(response_schema['included'])
+    assert list(included_resources) == ['members', 'projects']
+    included_members_schema = included_resources['members']['properties']
     assert 'projects' in included_members_schema['relationships']['properties']
-    included_projects_schema = response_schema['included']['properties']['projects']['properties']
+    included_projects_schema = included_resources['projects']['properties']
     assert 'sub-projects' in included_projects_schema['relationships']['properties']
     assert 'members' in included_projects_schema['relationships']['properties']
+    # Identical relationship schemas are shared
+    assert included_projects_schema['relationships']['properties']['members'] is \
+        response_schema['data']['properties']['relationships']['properties']['members']
 
     request_parameters_schema = swagger['paths']['/projects/{id}/']['get']['parameters']
     assert request_parameters_schema[0]['name'] == 'include'
     assert request_parameters_schema[0]['description'].endswith(
         ': sub-projects [recursive], members, members.projects [recursive through: members.projects]'
     )
+
+
+def test_included__canonical_ordering():
+    class MemberSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Member
+            fields = ('id', 'last_name', 'first_name')
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'sub_projects', 'members')
+
+        included_serializers = {
+            'sub_projects': 'self',
+            'members': MemberSerializer,
+        }
+
+    class CanonicalSerializerInspector(drf_yasg_json_api.inspectors.JSONAPISerializerSmartInspector):
+        canonical_ordering = True
+
+    class CanonicalSwaggerAutoSchema(base.BasicSwaggerAutoSchema):
+        canonical_ordering = True
+        field_inspectors = [
+            CanonicalSerializerInspector if inspector is drf_yasg_json_api.inspectors.JSONAPISerializerSmartInspector
+            else inspector for inspector in base.BasicSwaggerAutoSchema.field_inspectors
+        ]
+
+    def get_schema(swagger_schema):
+        class ProjectViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+            queryset = test_models.Project.objects.all()
+            serializer_class = ProjectSerializer
+            renderer_classes = [renderers.JSONRenderer]
+            parser_classes = [parsers.JSONParser]
+
+        ProjectViewSet.swagger_schema = swagger_schema
+        router = routers.DefaultRouter()
+        router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+        generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+        return generator.get_schema(request=None, public=True)['paths']['/projects/{id}/']['get']
+
+    operation = get_schema(base.BasicSwaggerAutoSchema)
+    included_resources = _get_included_resources(operation['responses']['200']['schema']['properties']['included'])
+    assert list(included_resources) == ['projects', 'members']
+    assert list(included_resources['members']['properties']['attributes']['properties']) == \
+        ['last-name', 'first-name']
+
+    operation = get_schema(CanonicalSwaggerAutoSchema)
+    included_resources = _get_included_resources(operation['responses']['200']['schema']['properties']['included'])
+    assert list(included_resources) == ['members', 'projects']
+    assert list(included_resources['members']['properties']['attributes']['properties']) == \
+        ['first-name', 'last-name']
+    assert list(operation['responses']['200']['schema']['properties']['data']['properties']['relationships'][
+        'properties'
+    ]) == ['members', 'sub-projects']
+    assert operation['parameters'][0]['description'].endswith(': members, sub-projects [recursive]')
+
+
+def test_included__definitions_shared_by_closure():
+    class MemberSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Member
+            fields = ('id', 'first_name')
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'members')
+
+        included_serializers = {'members': MemberSerializer}
+
+    class DefinitionsSwaggerAutoSchema(base.BasicSwaggerAutoSchema):
+        included_definitions = True
+
+    class ProjectViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = DefinitionsSwaggerAutoSchema
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+
+    with mock.patch.object(DefinitionsSwaggerAutoSchema, 'build_included_schema', autospec=True,
+                           side_effect=DefinitionsSwaggerAutoSchema.build_included_schema) as build_included_schema:
+        swagger = json.loads(json.dumps(generator.get_schema(request=None, public=True)))
+    assert build_included_schema.call_count == 1
+
+    list_included = swagger['paths']['/projects/']['get']['responses']['200']['schema']['properties']['included']
+    retrieve_included = \
+        swagger['paths']['/projects/{id}/']['get']['responses']['200']['schema']['properties']['included']
+    assert list_included == retrieve_included == {
+        'type': 'array', 'items': {'$ref': '#/definitions/IncludedMembers'},
+    }
+    assert swagger['definitions']['IncludedMembers']['x-oneOf'] == [
+        {'$ref': '#/definitions/MembersIncludedResource'},
+    ]
+    assert swagger['definitions']['IncludedMembers']['discriminator'] == 'type'
+    assert swagger['definitions']['MembersIncludedResource']['properties']['type']['pattern'] == 'members'
+
+
+def test_included__shared_by_include_closure():
+    class MemberSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Member
+            fields = ('id', 'first_name')
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'members')
+
+        included_serializers = {'members': MemberSerializer}
+
+    class OwnedProjectSerializer(ProjectSerializer):
+        class Meta(ProjectSerializer.Meta):
+            fields = ('id', 'name', 'members', 'owner_member')
+
+        included_serializers = {'owner_member': MemberSerializer, 'members': MemberSerializer}
+
+    class ProjectViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = base.BasicSwaggerAutoSchema
+
+    class OwnedProjectViewSet(ProjectViewSet):
+        serializer_class = OwnedProjectSerializer
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+    router.register(r'owned-projects', OwnedProjectViewSet, **compatibility._basename_or_base_name('owned-projects'))
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+
+    swagger_schema = base.BasicSwaggerAutoSchema
+    with mock.patch.object(swagger_schema, '_get_included_paths_and_serializers', autospec=True,
+                           side_effect=swagger_schema._get_included_paths_and_serializers) as get_closure, \
+            mock.patch.object(swagger_schema, 'build_included_schema', autospec=True,
+                              side_effect=swagger_schema.build_included_schema) as build_included_schema:
+        swagger = generator.get_schema(request=None, public=True)
+
+    # Closure is computed once per serializer and included schema once for both serializers with the same closure
+    assert get_closure.call_count == 2
+    assert build_included_schema.call_count == 1
+
+    included_schemas = [
+        swagger['paths'][path]['get']['responses']['200']['schema']['properties']['included']
+        for path in ('/projects/', '/projects/{id}/', '/owned-projects/', '/owned-projects/{id}/')
+    ]
+    assert all(included_schema is included_schemas[0] for included_schema in included_schemas)
+    assert swagger['paths']['/owned-projects/{id}/']['get']['parameters'][0]['description'].endswith(
+        ': members, owner-member'
+    )
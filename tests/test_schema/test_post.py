@@ -1,3 +1,7 @@
+import json
+
+from unittest import mock
+
 import drf_yasg.inspectors
 
 from drf_yasg import openapi
@@ -185,3 +189,99 @@ def test_post__x_properties():
     # assert 'x-readOnly' in response_schema['data']['properties']['attributes']
     assert 'readOnly' in response_schema['data']['properties']['attributes']['properties']['name']
     assert 'readOnly' in response_schema['data']['properties']['attributes']['properties']['archived']
+
+
+def test_post__format_names_while_building():
+    class FormattingSerializerInspector(drf_yasg_json_api.inspectors.JSONAPISerializerSmartInspector):
+        format_names = True
+
+    class FormattingSwaggerAutoSchema(base.BasicSwaggerAutoSchema):
+        field_inspectors = [
+            drf_yasg_json_api.inspectors.NamesFormatFilter,
+            drf_yasg_json_api.inspectors.XPropertiesFilter,
+            FormattingSerializerInspector,
+        ] + base.BasicSwaggerAutoSchema.field_inspectors[2:]
+
+    class PostFilterSwaggerAutoSchema(FormattingSwaggerAutoSchema):
+        field_inspectors = [
+            drf_yasg_json_api.inspectors.NamesFormatFilter,
+            drf_yasg_json_api.inspectors.XPropertiesFilter,
+            drf_yasg_json_api.inspectors.JSONAPISerializerSmartInspector,
+        ] + base.BasicSwaggerAutoSchema.field_inspectors[2:]
+
+    class MemberSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Member
+            fields = ('first_name', 'last_name')
+
+    class ProjectSerializer(serializers.ModelSerializer):
+        lead_member = MemberSerializer(source='owner_member', read_only=True)
+
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'lead_member', 'owner_member', 'sub_projects')
+            extra_kwargs = {'sub_projects': {'write_only': True}}
+
+    def generate(swagger_schema):
+        class ProjectViewSet(mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
+            queryset = test_models.Project.objects.all()
+            serializer_class = ProjectSerializer
+            renderer_classes = [renderers.JSONRenderer]
+            parser_classes = [parsers.JSONParser]
+
+        ProjectViewSet.swagger_schema = swagger_schema
+        router = routers.DefaultRouter()
+        router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+        generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+        return json.loads(json.dumps(generator.get_schema(request=None, public=True)))
+
+    with mock.patch.object(drf_yasg_json_api.inspectors.NamesFormatFilter, 'format_schema', autospec=True,
+                           side_effect=drf_yasg_json_api.inspectors.NamesFormatFilter.format_schema) as format_schema:
+        swagger = generate(FormattingSwaggerAutoSchema)
+    # Filter formats only schemas of fields (e.g. nested serializer), resources are built with formatted names
+    formatted_properties = [set(call[0][1].get('properties') or ()) for call in format_schema.call_args_list]
+    assert {'first-name', 'last-name'} in formatted_properties
+    assert not any(properties & {'type', 'data'} for properties in formatted_properties)
+
+    assert swagger == generate(PostFilterSwaggerAutoSchema)
+    request_schema = swagger['paths']['/projects/']['post']['parameters'][0]['schema']['properties']['data']
+    assert request_schema['properties']['relationships']['required'] == ['owner-member', 'sub-projects']
+    response_schema = swagger['paths']['/projects/{id}/']['get']['responses']['200']['schema']['properties']['data']
+    assert list(response_schema['properties']['relationships']['properties']) == ['lead-member', 'owner-member']
+
+
+def test_post__field_schemas_shared_between_request_and_response():
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'members')
+
+    class ProjectViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = base.BasicSwaggerAutoSchema
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+
+    swagger = generator.get_schema(request=None, public=True)
+
+    operation = swagger['paths']['/projects/']['post']
+    request_data_schema = operation['parameters'][0]['schema']['properties']['data']['properties']
+    response_data_schema = operation['responses']['201']['schema']['properties']['data']['properties']
+    assert request_data_schema['attributes']['properties']['name'] is \
+        response_data_schema['attributes']['properties']['name']
+    assert request_data_schema['relationships']['properties']['members']['properties']['data']['items']['properties'][
+        'id'] is response_data_schema['relationships']['properties']['members']['properties']['data']['items'][
+        'properties']['id']
+    # Variant specific nodes are not shared
+    assert request_data_schema['attributes']['required'] == ['name', 'archived']
+    assert 'required' not in response_data_schema['attributes']
+
+    with mock.patch.object(drf_yasg_json_api.inspectors.JSONAPISerializerInspector, 'share_variant_schemas', False):
+        unshared_swagger = generator.get_schema(request=None, public=True)
+    assert json.dumps(unshared_swagger) == json.dumps(swagger)
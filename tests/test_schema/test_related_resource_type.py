@@ -1,6 +1,10 @@
+from unittest import mock
+
 import pytest
 
+from django.apps import apps
 from django.db import models
+from django.test import override_settings
 from drf_yasg import openapi
 from drf_yasg.generators import OpenAPISchemaGenerator
 from rest_framework import mixins
@@ -10,7 +14,12 @@ from rest_framework_json_api import parsers
 from rest_framework_json_api import relations
 from rest_framework_json_api import renderers
 from rest_framework_json_api import serializers
+from rest_framework_json_api.utils import get_resource_type_from_model
+
+import drf_yasg_json_api.inspectors
 
+from drf_yasg_json_api.utils import ResourceTypeRegistry
+from drf_yasg_json_api.utils import get_serializer_resource_type
 from tests import base
 from tests import compatibility
 
@@ -241,3 +250,81 @@ def test_id_based_on_pk():
     assert 'type' in response_schema['data']['properties']
     assert 'attributes' in response_schema['data']['properties']
     assert list(response_schema['data']['properties']['attributes']['properties'].keys()) == ['name']
+
+
+def test_related_resource__cached_resolution():
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = ProjectWithCustomID
+            fields = ('custom_id', 'name', 'archived', 'members', 'owner_member')
+
+    class ProjectViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+        queryset = ProjectWithCustomID.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = base.BasicSwaggerAutoSchema
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+
+    inspector_cls = drf_yasg_json_api.inspectors.JSONAPISerializerInspector
+    original_resolve = inspector_cls.get_resource_name_from_related_id_field
+    with mock.patch.object(inspector_cls, 'get_resource_name_from_related_id_field', autospec=True,
+                           side_effect=original_resolve) as resolve:
+        generator.get_schema(request=None, public=True)
+        swagger = generator.get_schema(request=None, public=True)
+
+        # Once per relationship field of serializer class
+        assert resolve.call_count == 2
+        relationships_schema = swagger['paths']['/projects/{custom_id}/']['get']['responses']['200']['schema'][
+            'properties']['data']['properties']['relationships']['properties']
+        assert relationships_schema['members']['properties']['data']['items']['properties']['type']['pattern'] == \
+            'member-with-custom-ids'
+
+        with override_settings(JSON_API_PLURALIZE_TYPES=False, JSON_API_PLURALIZE_RELATION_TYPE=False):
+            swagger = generator.get_schema(request=None, public=True)
+
+        assert resolve.call_count == 4
+        relationships_schema = swagger['paths']['/projects/{custom_id}/']['get']['responses']['200']['schema'][
+            'properties']['data']['properties']['relationships']['properties']
+        assert relationships_schema['members']['properties']['data']['items']['properties']['type']['pattern'] == \
+            'member-with-custom-id'
+
+
+def test_resource_type_registry():
+    class MemberSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = MemberWithCustomID
+            fields = ('custom_id', 'first_name')
+
+    class RenamedMemberSerializer(MemberSerializer):
+        class Meta(MemberSerializer.Meta):
+            resource_name = 'people'
+
+    class PersonSerializer(serializers.Serializer):
+        class Meta:
+            resource_name = 'member-with-custom-ids'
+
+    registry = ResourceTypeRegistry()
+    with mock.patch('drf_yasg_json_api.utils.get_resource_type_from_model',
+                    side_effect=get_resource_type_from_model) as resolve:
+        assert registry.get_model_type(MemberWithCustomID) == 'member-with-custom-ids'
+        assert registry.get_serializer_type(MemberSerializer()) == 'member-with-custom-ids'
+        registry.register_serializers([RenamedMemberSerializer, PersonSerializer, serializers.Serializer])
+        assert registry.get_serializer_type(RenamedMemberSerializer) == 'people'
+        # Types of all models resolved at once
+        assert resolve.call_count == len(apps.get_models())
+
+    with pytest.raises(AttributeError):
+        registry.get_serializer_type(serializers.Serializer)
+    assert registry.get_collisions()['member-with-custom-ids'] == [
+        'tests.MemberWithCustomID', '{}.{}'.format(__name__, PersonSerializer.__qualname__)
+    ]
+    assert 'people' not in registry.get_collisions()
+
+    with override_settings(JSON_API_PLURALIZE_TYPES=False):
+        assert get_serializer_resource_type(MemberSerializer) == 'member-with-custom-id'
+    assert get_serializer_resource_type(MemberSerializer) == 'member-with-custom-ids'
@@ -0,0 +1,64 @@
+import json
+
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+from tests import stress
+from tests.utils import measure_peak
+
+# Endpoints of first models only, all stress models take part through relationships and included serializers;
+# every combination of paginator and filter backends is covered
+ENDPOINTS_COUNT = 24
+OPERATIONS_COUNT = ENDPOINTS_COUNT * 3
+
+# Budgets of regression gates, generous enough for slow machines, lower them along with optimizations. Compare
+# timings of runs more precisely with `--benchmark-autosave` and `--benchmark-compare-fail=mean:10%`.
+MAX_SECONDS_PER_OPERATION = 0.05
+MAX_PEAK_BYTES = 8 * 1024 * 1024
+# Output is deterministic, so its size only changes with schema shape
+MAX_DOCUMENT_BYTES = 1800 * 1000
+
+
+def _get_generator():
+    return OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""),
+                                  patterns=stress.get_stress_router(endpoints_count=ENDPOINTS_COUNT).urls)
+
+
+def test_stress__document():
+    document = json.loads(json.dumps(_get_generator().get_schema(request=None, public=True)))
+
+    operations = [method for path in document['paths'].values() for method in path if method != 'parameters']
+    assert len(operations) == OPERATIONS_COUNT
+
+    # First model closes cycle of owners through the last one, referenced by dotted path, and includes itself
+    parameters = {parameter['name']: parameter for parameter in document['paths']['/stress0/']['get']['parameters']}
+    assert {'filter[name]', 'page[number]', 'include', 'fields[stress-model0s]'} <= set(parameters)
+    assert 'parent [recursive]' in parameters['include']['description']
+    response_schema = document['paths']['/stress0/']['get']['responses']['200']['schema']['properties']
+    included_types = response_schema['included']['items']['properties']['type']['enum']
+    assert {'stress-model0s', 'stress-model{}s'.format(stress.MODELS_COUNT - 1)} <= set(included_types)
+
+    cursor_parameters = [parameter['name'] for parameter in document['paths']['/stress2/']['get']['parameters']]
+    assert 'page[cursor]' in cursor_parameters
+    assert 'sort' in [parameter['name'] for parameter in document['paths']['/stress1/']['get']['parameters']]
+
+
+def test_stress__generation_time(benchmark):
+    generator = _get_generator()
+    # Warm up process-wide caches, which are filled once per process
+    generator.get_schema(request=None, public=True)
+
+    document = benchmark.pedantic(generator.get_schema, kwargs={'request': None, 'public': True}, rounds=3)
+    size = len(json.dumps(document))
+    benchmark.extra_info['document_bytes'] = size
+
+    assert size < MAX_DOCUMENT_BYTES
+    if not benchmark.disabled:
+        assert benchmark.stats.stats.mean < MAX_SECONDS_PER_OPERATION * OPERATIONS_COUNT
+
+
+def test_stress__peak_memory():
+    generator = _get_generator()
+    generator.get_schema(request=None, public=True)
+
+    assert measure_peak(lambda: generator.get_schema(request=None, public=True)) < MAX_PEAK_BYTES
@@ -0,0 +1,263 @@
+import json
+
+from unittest import mock
+
+import pytest
+
+from django.db import models
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test import override_settings
+from django.urls import path
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+from rest_framework import mixins
+from rest_framework import routers
+from rest_framework import viewsets
+from rest_framework.test import APIRequestFactory
+from rest_framework_json_api import parsers
+from rest_framework_json_api import renderers
+from rest_framework_json_api import serializers
+
+from drf_yasg_json_api.middleware import ConformanceStats
+from drf_yasg_json_api.middleware import RequestValidationMiddleware
+from drf_yasg_json_api.middleware import ResponseConformanceMiddleware
+from drf_yasg_json_api.validation import RequestValidators
+from drf_yasg_json_api.validation import ResponseValidators
+from drf_yasg_json_api.validation import compile_validator
+from tests import base
+from tests import compatibility
+from tests import models as test_models
+
+
+def _generate_document():
+    class ProjectSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = test_models.Project
+            fields = ('id', 'name', 'archived', 'members')
+
+    class ProjectViewSet(mixins.RetrieveModelMixin, mixins.CreateModelMixin, mixins.UpdateModelMixin,
+                         viewsets.GenericViewSet):
+        queryset = test_models.Project.objects.all()
+        serializer_class = ProjectSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = base.BasicSwaggerAutoSchema
+
+    router = routers.DefaultRouter()
+    router.register(r'projects', ProjectViewSet, **compatibility._basename_or_base_name('projects'))
+
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+    return generator.get_schema(request=None, public=True)
+
+
+def _project_payload(**attributes):
+    return {
+        'data': {
+            'type': 'projects',
+            'attributes': dict({'name': 'Project', 'archived': False}, **attributes),
+            'relationships': {'members': {'data': [{'id': '1', 'type': 'members'}]}},
+        }
+    }
+
+
+def test_compile_validator():
+    document = _generate_document()
+    validate = compile_validator(document['paths']['/projects/']['post']['parameters'][0]['schema'])
+
+    assert validate(_project_payload()) == []
+    assert validate(_project_payload(archived='no')) == [('/data/attributes/archived', 'expected boolean')]
+
+    payload = _project_payload()
+    del payload['data']['attributes']['name']
+    payload['data']['relationships']['members']['data'][0]['type'] = 'users'
+    assert validate(payload) == [
+        ('/data/attributes/name', 'required'),
+        ('/data/relationships/members/data/0/type', 'does not match members'),
+    ]
+    assert validate([]) == [('/', 'expected object')]
+
+    payload = _project_payload()
+    payload['data']['type'] = 'sub-projects-x'
+    assert validate(payload) == [('/data/type', 'does not match projects')]
+
+
+def test_compile_validator__recursive_definition():
+    definitions = {'Node': {
+        'type': 'object',
+        'required': ['name'],
+        'properties': {
+            'name': {'type': 'string'},
+            'children': {'type': 'array', 'items': {'$ref': '#/definitions/Node'}},
+        },
+    }}
+    validate = compile_validator({'$ref': '#/definitions/Node'}, definitions)
+
+    assert validate({'name': 'root', 'children': [{'name': 'child', 'children': [{}]}]}) == [
+        ('/children/0/children/0/name', 'required'),
+    ]
+
+
+def test_request_validators__per_operation():
+    validators = RequestValidators(json.loads(json.dumps(_generate_document())))
+
+    assert validators.match_path('/projects/12/') == '/projects/{id}/'
+    assert validators.get_validator('PATCH', '/projects/{id}/') is validators.get_validator('patch', '/projects/{id}/')
+    assert validators.validate('PATCH', '/projects/12/', _project_payload(name=1)) == [
+        ('/data/id', 'required'),
+        ('/data/attributes/name', 'expected string'),
+    ]
+    assert validators.validate('GET', '/projects/12/', _project_payload(name=1)) == []
+    # Partial update, only type and id are required
+    partial_payload = {'data': {'type': 'projects', 'id': '12', 'attributes': {'name': 'x'}}}
+    assert validators.validate('PATCH', '/projects/12/', partial_payload) == []
+    assert validators.validate('PUT', '/projects/12/', partial_payload) == [
+        ('/data/relationships', 'required'),
+        ('/data/attributes/archived', 'required'),
+    ]
+    assert validators.validate('POST', '/unknown/', {}) == []
+
+
+def test_request_validation_middleware():
+    get_response = mock.Mock(return_value=HttpResponse())
+    middleware = RequestValidationMiddleware(get_response)
+    request_factory = RequestFactory()
+
+    with mock.patch.object(RequestValidationMiddleware, 'get_document', return_value=_generate_document()):
+        response = middleware(request_factory.post(
+            '/projects/', json.dumps(_project_payload(archived='no')), content_type='application/vnd.api+json'
+        ))
+        assert response.status_code == 400
+        assert json.loads(response.content) == {'errors': [
+            {'status': '400', 'detail': 'expected boolean', 'source': {'pointer': '/data/attributes/archived'}}
+        ]}
+        assert not get_response.called
+
+        response = middleware(request_factory.post(
+            '/projects/', json.dumps(_project_payload()), content_type='application/vnd.api+json'
+        ))
+        assert response.status_code == 200
+        assert get_response.call_count == 1
+
+        response = middleware(request_factory.patch(
+            '/projects/12/', json.dumps({'data': {'type': 'projects', 'id': '12', 'attributes': {'name': 'x'}}}),
+            content_type='application/vnd.api+json'
+        ))
+        assert response.status_code == 200
+        assert get_response.call_count == 2
+
+
+def test_response_conformance_middleware():
+    class SampledResponseConformanceMiddleware(ResponseConformanceMiddleware):
+        sample_rate = 1
+        stats = ConformanceStats()
+
+    payload = _project_payload()
+    payload['data']['id'] = '12'
+    invalid_payload = _project_payload(archived='no')
+    invalid_payload['data']['id'] = '12'
+    contents = [json.dumps(payload), json.dumps(invalid_payload), json.dumps(invalid_payload), 'null']
+    get_response = mock.Mock(side_effect=[
+        HttpResponse(content, content_type='application/vnd.api+json') for content in contents
+    ] + [HttpResponse('{}', content_type='application/json')])
+    middleware = SampledResponseConformanceMiddleware(get_response)
+
+    with mock.patch.object(SampledResponseConformanceMiddleware, 'get_document', return_value=_generate_document()):
+        for _ in range(len(contents) + 1):
+            middleware(RequestFactory().get('/projects/12/'))
+        middleware.join()
+
+    assert middleware.stats.snapshot() == {
+        'GET /projects/{id}/ 200': {
+            'sampled': 4,
+            'mismatched': 3,
+            'pointers': {'/data/attributes/archived': 2, '/': 1},
+        }
+    }
+
+
+def test_conformance_stats__bounded():
+    stats = ConformanceStats(max_operations=1, max_pointers=1)
+
+    assert stats.record('GET /a/ 200', [('/data/id', 'required'), ('/data/type', 'required')]) == ['/data/id']
+    assert stats.record('GET /a/ 200', [('/data/id', 'required')]) == []
+    assert stats.record('GET /b/ 200', [('/data/id', 'required')]) == []
+
+    assert stats.snapshot() == {'GET /a/ 200': {'sampled': 2, 'mismatched': 2, 'pointers': {'/data/id': 2}}}
+    assert stats.untracked == 1
+
+
+class Task(models.Model):
+    name = models.CharField(max_length=100)
+    owner = models.ForeignKey(test_models.Member, null=True, on_delete=models.DO_NOTHING, related_name='+')
+
+
+def _not_called(request, *args, **kwargs):
+    raise AssertionError('links are only reversed')
+
+
+urlpatterns = [
+    path('tasks/<pk>/relationships/<related_field>/', _not_called, name='task-relationships'),
+    path('tasks/<pk>/<related_field>/', _not_called, name='task-related'),
+]
+
+
+def _get_task_view_set():
+    class TaskSerializer(serializers.ModelSerializer):
+        code = serializers.RegexField(r'[a-z]+', write_only=True, required=False)
+        owner = serializers.ResourceRelatedField(
+            queryset=test_models.Member.objects.all(), allow_null=True, required=False,
+            related_link_view_name='task-related', self_link_view_name='task-relationships',
+        )
+
+        class Meta:
+            model = Task
+            fields = ('id', 'name', 'code', 'owner')
+
+    class TaskViewSet(mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
+        queryset = Task.objects.all()
+        serializer_class = TaskSerializer
+        renderer_classes = [renderers.JSONRenderer]
+        parser_classes = [parsers.JSONParser]
+        swagger_schema = base.BasicSwaggerAutoSchema
+
+    return TaskViewSet
+
+
+def _generate_task_document(view_set):
+    router = routers.DefaultRouter()
+    router.register(r'tasks', view_set, **compatibility._basename_or_base_name('tasks'))
+
+    generator = OpenAPISchemaGenerator(info=openapi.Info(title="", default_version=""), patterns=router.urls)
+    return json.loads(json.dumps(generator.get_schema(request=None, public=True)))
+
+
+@pytest.mark.django_db
+@override_settings(ROOT_URLCONF=__name__)
+def test_response_validators__rendered_responses():
+    view_set = _get_task_view_set()
+    validators = ResponseValidators(_generate_task_document(view_set))
+    member = test_models.Member.objects.create(first_name='Jane', last_name='Doe')
+    tasks = [Task.objects.create(name='Owned', owner=member), Task.objects.create(name='Not owned')]
+
+    for task in tasks:
+        response = view_set.as_view({'get': 'retrieve'})(APIRequestFactory().get('/tasks/{}/'.format(task.pk)),
+                                                         pk=task.pk)
+        response.render()
+        content = json.loads(response.content.decode())
+
+        assert set(content['data']['relationships']['owner']['links']) == {'self', 'related'}
+        assert validators.validate('GET', '/tasks/{}/'.format(task.pk), 200, content) == []
+    assert content['data']['relationships']['owner']['data'] is None
+
+
+def test_request_validators__partial_match_pattern():
+    validators = RequestValidators(_generate_task_document(_get_task_view_set()))
+
+    def payload(code, resource_type='tasks'):
+        return {'data': {'type': resource_type, 'attributes': {'name': 'Task', 'code': code}}}
+
+    # JSON Schema patterns are not anchored, unlike resource types
+    assert validators.validate('POST', '/tasks/', payload('Task 1')) == []
+    assert validators.validate('POST', '/tasks/', payload('1')) == [('/data/attributes/code', 'does not match [a-z]+')]
+    assert validators.validate('POST', '/tasks/', payload('a', 'all-tasks')) == [('/data/type', 'does not match tasks')]
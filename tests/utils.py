@@ -1,6 +1,17 @@
 import json
 import pprint
+import tracemalloc
 
 
 def print_swagger(swagger):
     pprint.pprint(json.loads(json.dumps(swagger)))
+
+
+def measure_peak(generate):
+    """Return peak size of memory allocated by Python while running `generate`."""
+    tracemalloc.start()
+    try:
+        generate()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()